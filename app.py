@@ -134,12 +134,26 @@ if 'api_key' not in st.session_state:
     st.session_state.api_key = None
 if 'data' not in st.session_state:
     st.session_state.data = None
+if 'upload_cache' not in st.session_state:
+    st.session_state.upload_cache = None
 if 'processed_data' not in st.session_state:
     st.session_state.processed_data = None
 if 'forecast_results' not in st.session_state:
     st.session_state.forecast_results = None
+if 'forecast_views' not in st.session_state:
+    st.session_state.forecast_views = None
+if 'forecast_cubes' not in st.session_state:
+    st.session_state.forecast_cubes = None
+if 'backtest_results' not in st.session_state:
+    st.session_state.backtest_results = None
+if 'data_fingerprint' not in st.session_state:
+    st.session_state.data_fingerprint = None
 if 'api_calls_count' not in st.session_state:
     st.session_state.api_calls_count = 0
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = []
+if 'finished_job' not in st.session_state:
+    st.session_state.finished_job = None
 
 # Sidebar navigation
 st.sidebar.markdown("""
@@ -160,6 +174,12 @@ if st.session_state.api_calls_count > 0:
     st.sidebar.markdown("---")
     st.sidebar.metric("API Calls Used", st.session_state.api_calls_count)
 
+# Background forecast jobs of this session
+if st.session_state.jobs:
+    from pages import forecasting
+    with st.sidebar:
+        forecasting.render_job_panel()
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("""
 <div style='font-size: 0.8rem; color: #666; padding: 1rem;'>
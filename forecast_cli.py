@@ -0,0 +1,167 @@
+"""Headless fleet forecasts from a config file, e.g. nightly from cron
+
+    python forecast_cli.py forecast_config.example.toml
+    python forecast_cli.py nightly.json --run company_a --output-dir /data/forecasts
+
+Every [[runs]] entry (one per business unit, say) is filtered, forecast and exported
+in turn. A [sweep] table instead forecasts every combination of its listed settings in
+parallel, preprocessing the data once, and writes all forecasts to one CSV with an
+index of the runs. The TimeGPT API key is read from the NIXTLA_API_KEY environment
+variable.
+Exit code: 0 if every run succeeded, 1 if any failed, 2 for config or data errors.
+"""
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+from utils.engine import (
+    load_config, expand_runs, expand_grid, filter_data, load_data, run_headless, ScenarioSweep
+)
+from utils.export import format_dates
+
+logger = logging.getLogger('fleet_forecast')
+
+
+class ProgressLogger:
+    """Progress callback that logs every new step of a run"""
+
+    def __init__(self, name):
+        self.name = name
+        self.last_message = None
+
+    def __call__(self, progress, message):
+        if message != self.last_message:
+            self.last_message = message
+            logger.info("[%s] %3.0f%% %s", self.name, 100 * min(max(progress, 0.0), 1.0), message)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run fleet forecasts without the web app")
+    parser.add_argument('config', help="JSON or TOML run configuration")
+    parser.add_argument('--run', action='append', dest='runs', metavar='NAME',
+                        help="Only run this entry of [[runs]] (repeatable)")
+    parser.add_argument('--data', help="Input CSV/Excel file, overrides `data` in the config")
+    parser.add_argument('--output-dir', help="Export directory, overrides `output_dir` in the config")
+    parser.add_argument('--workers', type=int, help="Sweep runs forecast at the same time")
+    parser.add_argument('--quiet', action='store_true', help="Only log warnings and errors")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.INFO,
+        format='%(asctime)s %(levelname)-7s %(message)s',
+        stream=sys.stdout
+    )
+
+    # Relative paths in the config are relative to the config file
+    config_dir = os.path.dirname(os.path.abspath(args.config))
+
+    try:
+        config = load_config(args.config)
+        sweep = config.get('sweep')
+        if sweep:
+            if args.runs:
+                raise ValueError("--run selects [[runs]] entries and cannot be used with [sweep]")
+            runs = expand_runs({'defaults': config.get('defaults', {}), 'runs': expand_grid(sweep)})
+        else:
+            runs = expand_runs(config)
+
+        if args.runs:
+            unknown = set(args.runs) - {run['name'] for run in runs}
+            if unknown:
+                raise ValueError(f"No run named {', '.join(sorted(unknown))} in {args.config}")
+            runs = [run for run in runs if run['name'] in args.runs]
+
+        data_path = args.data or config.get('data')
+        if not data_path:
+            raise ValueError("No input data: set `data` in the config or pass --data")
+        if not args.data:
+            data_path = os.path.join(config_dir, data_path)
+
+        output_dir = args.output_dir or os.path.join(config_dir, config.get('output_dir', 'forecasts'))
+        for run in runs:
+            run['checkpoint_dir'] = os.path.join(config_dir, run['checkpoint_dir'])
+
+        logger.info("Loading %s", data_path)
+        df = load_data(data_path)
+    except (OSError, ValueError) as e:
+        logger.error("%s", e)
+        return 2
+
+    logger.info("%s rows from %s to %s", f"{len(df):,}", df['date'].min().date(), df['date'].max().date())
+
+    api_key = os.environ.get('NIXTLA_API_KEY')
+    if sweep:
+        return run_sweep(config, runs, df, output_dir, api_key, args.workers)
+
+    failed = []
+    for settings in runs:
+        name = settings['name']
+        logger.info(
+            "[%s] %s forecast with %s at %s, %s periods ahead",
+            name, settings['timeframe'], settings['model'], settings['aggregation_level'], settings['horizon']
+        )
+
+        try:
+            summary = run_headless(settings, df, output_dir, api_key=api_key, progress_callback=ProgressLogger(name))
+        except Exception as e:
+            logger.error("[%s] failed: %s", name, e)
+            failed.append(name)
+            continue
+
+        for warning in summary['warnings']:
+            logger.warning("[%s] %s", name, warning)
+        logger.info(
+            "[%s] done with %s: %s series, %d TimeGPT calls",
+            name, summary['model_used'], f"{summary['n_series']:,}", summary['api_calls']
+        )
+        for path in summary['files']:
+            logger.info("[%s] wrote %s", name, path)
+
+    if failed:
+        logger.error("%d of %d runs failed: %s", len(failed), len(runs), ", ".join(failed))
+        return 1
+
+    logger.info("All %d runs finished", len(runs))
+    return 0
+
+
+def run_sweep(config, runs, df, output_dir, api_key, workers=None):
+    """Forecast every run of a [sweep] on shared preprocessing and write one result set"""
+    try:
+        df = filter_data(df, config.get('defaults', {}).get('filters', {}))
+    except ValueError as e:
+        logger.error("%s", e)
+        return 2
+    for run in runs:
+        run['filters'] = {}
+
+    sweep = ScenarioSweep(df, api_key=api_key, n_jobs=runs[0]['n_jobs'], max_workers=workers)
+    logger.info("Sweeping %d configurations, %d at a time", len(runs), min(sweep.max_workers, len(runs)))
+
+    def report(progress, message):
+        logger.info("%3.0f%% %s", 100 * progress, message)
+
+    index_df, results_df = sweep.run(runs, progress_callback=report)
+
+    stamp = datetime.now().strftime('%Y%m%d_%H%M')
+    os.makedirs(output_dir, exist_ok=True)
+    for prefix, frame in (('sweep_index', index_df), ('sweep_forecasts', results_df)):
+        path = os.path.join(output_dir, f"{prefix}_{stamp}.csv")
+        format_dates(frame).to_csv(path, index=False)
+        logger.info("Wrote %s", path)
+
+    failed = index_df[index_df['status'] != 'done']
+    for _, row in failed.iterrows():
+        logger.error("[%s] failed: %s", row['name'], row['message'])
+
+    logger.info(
+        "%d of %d runs done in %.1fs (%.1fs of shared preprocessing)",
+        len(index_df) - len(failed), len(index_df), sweep.timings['total'], sweep.timings['preprocessing']
+    )
+    return 1 if len(failed) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
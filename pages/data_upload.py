@@ -2,6 +2,214 @@ import streamlit as st
 import pandas as pd
 from utils.data_processor import DataProcessor
 from utils.visualization import Visualizer
+from utils.explorer import ExplorerIndex
+import plotly.graph_objects as go
+
+# Tabs of the Data Explorer charts
+EXPLORER_TABS = ["📈 Over Time", "🚚 By Fleet Type & Region", "🛣️ Top Routes"]
+
+
+@st.fragment
+def render_explorer(explorer):
+    """Filters and charts of the upload; changing them reruns this section only"""
+    
+    st.markdown("### 🔍 Data Explorer")
+    
+    with st.expander("📊 Apply Filters", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            selected_companies = st.multiselect(
+                "Company",
+                options=explorer.options('company'),
+                help="Filter by company"
+            )
+        
+        with col2:
+            selected_origins = st.multiselect(
+                "Origin",
+                options=explorer.options('origin'),
+                help="Filter by origin warehouse"
+            )
+        
+        with col3:
+            selected_fleet_types = st.multiselect(
+                "Fleet Type",
+                options=explorer.options('fleet_type'),
+                help="Filter by fleet type"
+            )
+        
+        # Date range filter
+        min_date = explorer.dates[0]
+        max_date = explorer.dates[-1]
+        
+        selected_date_range = st.date_input(
+            "Date Range",
+            value=(min_date, max_date),
+            min_value=min_date,
+            max_value=max_date,
+            help="Select date range to analyze"
+        )
+    
+    # Apply filters: positions of the matching rows (None = all rows)
+    positions = explorer.select(
+        {
+            'company': selected_companies,
+            'origin': selected_origins,
+            'fleet_type': selected_fleet_types
+        },
+        date_range=selected_date_range if len(selected_date_range) == 2 else None
+    )
+    n_filtered = explorer.n_rows if positions is None else len(positions)
+    
+    st.info(f"📊 Showing {n_filtered:,} rows after filtering")
+    
+    if n_filtered == 0:
+        return
+    
+    # Visualizations: only the open tab is drawn
+    st.markdown("### 📈 Visualizations")
+    
+    # Initialize visualizer
+    visualizer = Visualizer()
+    
+    tab = st.radio("Chart", options=EXPLORER_TABS, horizontal=True, label_visibility="collapsed", key='explorer_chart_tab')
+    
+    if tab == "📈 Over Time":
+        # Time series plot
+        st.markdown("#### Total Fleet Usage Over Time")
+        daily_agg = explorer.daily_totals(positions)
+        fig = visualizer.plot_time_series(
+            daily_agg,
+            date_col='date',
+            value_col='qty',
+            title='Total Fleet Usage',
+            height=400,
+            cache_key=(
+                explorer.key, tuple(selected_companies), tuple(selected_origins),
+                tuple(selected_fleet_types), tuple(selected_date_range)
+            )
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    elif tab == "🚚 By Fleet Type & Region":
+        # Additional charts in columns
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("#### Fleet Usage by Type")
+            fleet_summary = explorer.totals_by('fleet_type', positions)
+            fleet_summary = fleet_summary.sort_values('qty', ascending=True)
+            
+            fig = go.Figure(go.Bar(
+                x=fleet_summary['qty'],
+                y=fleet_summary['fleet_type'],
+                orientation='h',
+                marker=dict(color='#66BB6A')
+            ))
+            fig.update_layout(
+                xaxis_title='Total Quantity',
+                yaxis_title='Fleet Type',
+                height=300,
+                plot_bgcolor='white',
+                showlegend=False
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            st.markdown("#### Fleet Usage by Region")
+            region_summary = explorer.totals_by('region', positions)
+            region_summary = region_summary.sort_values('qty', ascending=True)
+            
+            fig = go.Figure(go.Bar(
+                x=region_summary['qty'],
+                y=region_summary['region'],
+                orientation='h',
+                marker=dict(color='#2E7D32')
+            ))
+            fig.update_layout(
+                xaxis_title='Total Quantity',
+                yaxis_title='Region',
+                height=300,
+                plot_bgcolor='white',
+                showlegend=False
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    
+    else:
+        # Top routes
+        st.markdown("#### Top 10 Routes by Volume")
+        route_summary = explorer.totals_by('route', positions)
+        route_summary = route_summary.sort_values('qty', ascending=True).tail(10)
+        
+        fig = go.Figure(go.Bar(
+            x=route_summary['qty'],
+            y=route_summary['route'],
+            orientation='h',
+            marker=dict(color='#1B5E20')
+        ))
+        fig.update_layout(
+            xaxis_title='Total Quantity',
+            yaxis_title='Route',
+            height=400,
+            plot_bgcolor='white',
+            showlegend=False
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+def render_preprocessing(processor, parsed_df, freq_code):
+    """Preprocessing options of the upload; changing them reruns this section only"""
+    
+    st.markdown("### ⚙️ Data Preprocessing")
+    
+    with st.expander("🔧 Preprocessing Options", expanded=False):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            handle_outliers = st.checkbox(
+                "Handle Outliers",
+                value=False,
+                help="Cap extreme values at 99th percentile"
+            )
+            
+            if handle_outliers:
+                outlier_threshold = st.slider(
+                    "Outlier Threshold (percentile)",
+                    min_value=90,
+                    max_value=99,
+                    value=99,
+                    help="Values above this percentile will be capped"
+                )
+        
+        with col2:
+            auto_fill_dates = st.checkbox(
+                "Auto-fill Missing Dates",
+                value=True,
+                help="Automatically fill missing dates with zero qty"
+            )
+        
+        if st.button("Apply Preprocessing", type="primary"):
+            processed_df = parsed_df.copy()
+            
+            with st.spinner("Processing..."):
+                if handle_outliers:
+                    processed_df = processor.handle_outliers(
+                        processed_df,
+                        method='cap',
+                        threshold=outlier_threshold
+                    )
+                    st.success(f"✅ Outliers capped at {outlier_threshold}th percentile")
+                
+                if auto_fill_dates:
+                    # This will be done automatically in forecasting
+                    st.success("✅ Missing dates will be filled during forecasting")
+                
+                st.session_state.processed_data = processed_df
+                st.session_state.freq = freq_code
+                st.success("✅ Data preprocessing completed!")
+
 
 def render():
     """Render the Data Upload & Explorer page"""
@@ -38,23 +246,41 @@ def render():
     if uploaded_file is not None:
         # Process uploaded file
         try:
-            # Read file
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            
-            st.success(f"✅ File uploaded successfully! ({len(df)} rows)")
-            
             # Initialize data processor
             processor = DataProcessor()
             
-            # Parse and validate data
-            with st.spinner("Validating data..."):
-                parsed_df, message = processor.parse_uploaded_data(df)
-            
+            # The file is read, validated and indexed once per upload; reruns from
+            # the explorer widgets reuse the cached upload
+            upload_id = getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{uploaded_file.size}"
+            upload = st.session_state.upload_cache
+            
+            if upload is None or upload['id'] != upload_id:
+                # Read file
+                if uploaded_file.name.endswith('.csv'):
+                    df = pd.read_csv(uploaded_file)
+                else:
+                    df = pd.read_excel(uploaded_file)
+                
+                # Parse and validate data
+                with st.spinner("Validating data..."):
+                    parsed_df, message = processor.parse_uploaded_data(df)
+                
+                upload = {'id': upload_id, 'n_rows': len(df), 'data': parsed_df, 'message': message}
+                if parsed_df is not None:
+                    with st.spinner("Indexing data..."):
+                        # Detect frequency
+                        upload['freq'] = processor.detect_frequency(parsed_df)
+                        upload['report'] = processor.validate_data_quality(parsed_df, freq=upload['freq'][0])
+                        upload['index'] = ExplorerIndex(parsed_df)
+                st.session_state.upload_cache = upload
+                # New data: its checkpoint fingerprint is computed again when a run needs it
+                st.session_state.data_fingerprint = None
+            
+            st.success(f"✅ File uploaded successfully! ({upload['n_rows']} rows)")
+            
+            parsed_df = upload['data']
             if parsed_df is None:
-                st.error(f"❌ Data validation failed: {message}")
+                st.error(f"❌ Data validation failed: {upload['message']}")
                 return
             
             st.success("✅ Data validation passed!")
@@ -62,15 +288,15 @@ def render():
             # Store in session state
             st.session_state.data = parsed_df
             
-            # Detect frequency
-            freq_code, freq_name = processor.detect_frequency(parsed_df)
+            freq_code, freq_name = upload['freq']
+            explorer = upload['index']
             
             st.markdown("---")
             
             # Data Quality Report
             st.markdown("### 📊 Data Quality Report")
             
-            report = processor.validate_data_quality(parsed_df, freq=freq_code)
+            report = upload['report']
             
             # Display metrics
             col1, col2, col3, col4 = st.columns(4)
@@ -158,200 +384,13 @@ def render():
             
             st.markdown("---")
             
-            # Interactive Filters
-            st.markdown("### 🔍 Data Explorer")
-            
-            with st.expander("📊 Apply Filters", expanded=True):
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    selected_companies = st.multiselect(
-                        "Company",
-                        options=sorted(parsed_df['company'].unique()),
-                        help="Filter by company"
-                    )
-                
-                with col2:
-                    selected_origins = st.multiselect(
-                        "Origin",
-                        options=sorted(parsed_df['origin'].unique()),
-                        help="Filter by origin warehouse"
-                    )
-                
-                with col3:
-                    selected_fleet_types = st.multiselect(
-                        "Fleet Type",
-                        options=sorted(parsed_df['fleet_type'].unique()),
-                        help="Filter by fleet type"
-                    )
-                
-                # Date range filter
-                min_date = parsed_df['date'].min()
-                max_date = parsed_df['date'].max()
-                
-                selected_date_range = st.date_input(
-                    "Date Range",
-                    value=(min_date, max_date),
-                    min_value=min_date,
-                    max_value=max_date,
-                    help="Select date range to analyze"
-                )
-            
-            # Apply filters
-            filtered_df = parsed_df.copy()
-            
-            if selected_companies:
-                filtered_df = filtered_df[filtered_df['company'].isin(selected_companies)]
-            
-            if selected_origins:
-                filtered_df = filtered_df[filtered_df['origin'].isin(selected_origins)]
-            
-            if selected_fleet_types:
-                filtered_df = filtered_df[filtered_df['fleet_type'].isin(selected_fleet_types)]
-            
-            if len(selected_date_range) == 2:
-                start_date, end_date = selected_date_range
-                filtered_df = filtered_df[
-                    (filtered_df['date'] >= pd.Timestamp(start_date)) &
-                    (filtered_df['date'] <= pd.Timestamp(end_date))
-                ]
-            
-            st.info(f"📊 Showing {len(filtered_df):,} rows after filtering")
-            
-            # Visualizations
-            if len(filtered_df) > 0:
-                st.markdown("### 📈 Visualizations")
-                
-                # Initialize visualizer
-                visualizer = Visualizer()
-                
-                # Time series plot
-                st.markdown("#### Total Fleet Usage Over Time")
-                daily_agg = filtered_df.groupby('date')['qty'].sum().reset_index()
-                fig = visualizer.plot_time_series(
-                    daily_agg,
-                    date_col='date',
-                    value_col='qty',
-                    title='Total Fleet Usage',
-                    height=400
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Additional charts in columns
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown("#### Fleet Usage by Type")
-                    fleet_summary = filtered_df.groupby('fleet_type')['qty'].sum().reset_index()
-                    fleet_summary = fleet_summary.sort_values('qty', ascending=True)
-                    
-                    import plotly.graph_objects as go
-                    fig = go.Figure(go.Bar(
-                        x=fleet_summary['qty'],
-                        y=fleet_summary['fleet_type'],
-                        orientation='h',
-                        marker=dict(color='#66BB6A')
-                    ))
-                    fig.update_layout(
-                        xaxis_title='Total Quantity',
-                        yaxis_title='Fleet Type',
-                        height=300,
-                        plot_bgcolor='white',
-                        showlegend=False
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    st.markdown("#### Fleet Usage by Region")
-                    region_summary = filtered_df.groupby('region')['qty'].sum().reset_index()
-                    region_summary = region_summary.sort_values('qty', ascending=True)
-                    
-                    fig = go.Figure(go.Bar(
-                        x=region_summary['qty'],
-                        y=region_summary['region'],
-                        orientation='h',
-                        marker=dict(color='#2E7D32')
-                    ))
-                    fig.update_layout(
-                        xaxis_title='Total Quantity',
-                        yaxis_title='Region',
-                        height=300,
-                        plot_bgcolor='white',
-                        showlegend=False
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Top routes
-                st.markdown("#### Top 10 Routes by Volume")
-                filtered_df['route'] = filtered_df['origin'] + ' → ' + filtered_df['destination']
-                route_summary = filtered_df.groupby('route')['qty'].sum().reset_index()
-                route_summary = route_summary.sort_values('qty', ascending=True).tail(10)
-                
-                fig = go.Figure(go.Bar(
-                    x=route_summary['qty'],
-                    y=route_summary['route'],
-                    orientation='h',
-                    marker=dict(color='#1B5E20')
-                ))
-                fig.update_layout(
-                    xaxis_title='Total Quantity',
-                    yaxis_title='Route',
-                    height=400,
-                    plot_bgcolor='white',
-                    showlegend=False
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            # Interactive Filters and Data Preprocessing rerun on their own when their widgets change
+            render_explorer(explorer)
             
             st.markdown("---")
             
             # Data Preprocessing Options
-            st.markdown("### ⚙️ Data Preprocessing")
-            
-            with st.expander("🔧 Preprocessing Options", expanded=False):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    handle_outliers = st.checkbox(
-                        "Handle Outliers",
-                        value=False,
-                        help="Cap extreme values at 99th percentile"
-                    )
-                    
-                    if handle_outliers:
-                        outlier_threshold = st.slider(
-                            "Outlier Threshold (percentile)",
-                            min_value=90,
-                            max_value=99,
-                            value=99,
-                            help="Values above this percentile will be capped"
-                        )
-                
-                with col2:
-                    auto_fill_dates = st.checkbox(
-                        "Auto-fill Missing Dates",
-                        value=True,
-                        help="Automatically fill missing dates with zero qty"
-                    )
-                
-                if st.button("Apply Preprocessing", type="primary"):
-                    processed_df = parsed_df.copy()
-                    
-                    with st.spinner("Processing..."):
-                        if handle_outliers:
-                            processed_df = processor.handle_outliers(
-                                processed_df,
-                                method='cap',
-                                threshold=outlier_threshold
-                            )
-                            st.success(f"✅ Outliers capped at {outlier_threshold}th percentile")
-                        
-                        if auto_fill_dates:
-                            # This will be done automatically in forecasting
-                            st.success("✅ Missing dates will be filled during forecasting")
-                        
-                        st.session_state.processed_data = processed_df
-                        st.session_state.freq = freq_code
-                        st.success("✅ Data preprocessing completed!")
+            render_preprocessing(processor, parsed_df, freq_code)
             
             # Next steps
             st.markdown("---")
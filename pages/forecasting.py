@@ -1,7 +1,119 @@
+import os
 import streamlit as st
 import pandas as pd
 from utils.data_processor import DataProcessor
-from utils.forecaster import FleetForecaster
+from utils.forecaster import (
+    FleetForecaster, LOCAL_MODELS, INTERMITTENT_MODELS, GLOBAL_MODELS, AUTO_MODEL, ENSEMBLE_MODEL,
+    INTERVAL_LEVELS
+)
+from utils.hierarchy import HierarchicalForecaster
+from utils.backtest import ModelTournament, ModelEnsemble
+from utils.checkpoint import RunCheckpoint, DEFAULT_BATCH_SIZE, data_fingerprint
+from utils.engine import run_backtest, run_full_forecast
+from utils.export import format_dates
+from utils.jobs import get_job_manager, QUEUED as JOB_QUEUED, DONE as JOB_DONE, CANCELLED as JOB_CANCELLED
+
+# Seconds between status polls of running forecast jobs
+JOB_POLL_SECONDS = 1.0
+
+
+def collect_job(job):
+    """Attach a finished job's result to the session and keep its outcome for the forecasting page"""
+    st.session_state.jobs.remove(job.id)
+    get_job_manager().forget(job.id)
+    
+    outcome = {'label': job.label, 'status': job.status, 'elapsed': job.elapsed}
+    if job.status == JOB_DONE:
+        result = job.result
+        st.session_state.forecast_results = result['forecast_results']
+        st.session_state.forecast_views = result['forecast_views']
+        st.session_state.forecast_cubes = result['forecast_cubes']
+        st.session_state.forecast_metadata = result['forecast_metadata']
+        st.session_state.api_calls_count += result['api_calls']
+        
+        outcome.update(
+            model_used=result['forecast_metadata']['model_used'],
+            captions=result['captions'],
+            warnings=result['warnings'],
+            preview=format_dates(result['forecast_results'].head(20))
+        )
+        st.toast(f"✅ Forecast ready: {job.label}")
+    else:
+        outcome['error'] = job.error
+        st.toast(f"❌ Forecast {job.status}: {job.label}")
+    
+    st.session_state.finished_job = outcome
+
+
+def render_job_outcome(outcome):
+    """Success or failure report of a finished forecast job"""
+    if outcome['status'] == JOB_CANCELLED:
+        st.warning(f"⏹️ Forecast cancelled: {outcome['label']}")
+        return
+    
+    if outcome['status'] != JOB_DONE:
+        st.error(f"❌ Forecast failed: {outcome['error']}")
+        
+        if "API" in outcome['error']:
+            st.info("💡 Try using Moving Average (MA-6) as a fallback, or check your API key configuration.")
+        return
+    
+    st.success(
+        f"✅ Forecast completed successfully using {outcome['model_used']}! "
+        f"({outcome['label']}, {outcome['elapsed']:.0f}s)"
+    )
+    for caption in outcome['captions']:
+        st.caption(caption)
+    for warning in outcome['warnings']:
+        st.warning(f"⚠️ {warning}")
+    st.balloons()
+    
+    # Show preview
+    st.markdown("### 👀 Forecast Preview")
+    st.dataframe(outcome['preview'], use_container_width=True)
+    
+    st.markdown("---")
+    st.info("📊 Go to **Results & Download** page to view charts and export your forecast!")
+
+
+def render_job_panel():
+    """Sidebar status of the session's forecast jobs, polled while any of them is running"""
+    manager = get_job_manager()
+    st.session_state.jobs = [job_id for job_id in st.session_state.jobs if manager.get(job_id)]
+    if not st.session_state.jobs:
+        return
+    
+    any_active = any(manager.get(job_id).active for job_id in st.session_state.jobs)
+    st.fragment(run_every=JOB_POLL_SECONDS if any_active else None)(_job_panel)()
+
+
+def _job_panel():
+    manager = get_job_manager()
+    st.markdown("---")
+    st.markdown("**⏳ Forecast jobs**")
+    
+    collected = False
+    for job_id in list(st.session_state.jobs):
+        job = manager.get(job_id)
+        if job is None:
+            st.session_state.jobs.remove(job_id)
+            continue
+        
+        if not job.active:
+            collect_job(job)
+            collected = True
+            continue
+        
+        status, progress, message = job.snapshot()
+        st.caption(f"{job.label} · {'queued' if status == JOB_QUEUED else f'{job.elapsed:.0f}s'}")
+        st.progress(progress, text=message)
+        if st.button("⏹️ Cancel", key=f"cancel_job_{job.id}"):
+            job.cancel()
+    
+    # Full rerun so every page sees the new results
+    if collected:
+        st.rerun()
+
 
 def render():
     """Render the Forecasting Engine page"""
@@ -21,7 +133,7 @@ def render():
     
     # Check if API key is configured
     if not st.session_state.api_key:
-        st.warning("⚠️ API key not configured. TimeGPT forecasting will not be available. You can still use Moving Average (MA-6).")
+        st.warning("⚠️ API key not configured. TimeGPT forecasting will not be available. You can still use the local statistical models.")
     
     # Initialize processor
     processor = DataProcessor()
@@ -61,21 +173,29 @@ def render():
         st.markdown("<br>", unsafe_allow_html=True)
         st.info(f"Source data: **{'Daily' if source_freq == 'D' else 'Monthly'}**")
     
+    # Multi-resolution: one daily run, weekly and monthly views derived from it
+    multi_resolution = False
+    reconcile_timeframes = False
+    if source_freq == 'D' and freq_code == 'D':
+        multi_resolution = st.checkbox(
+            "Also produce Weekly and Monthly views from this daily run",
+            value=False,
+            help="Daily forecasts are summed into weeks (ending Monday) and months, so all three "
+                 "timeframes are available on the results page without extra runs."
+        )
+        if multi_resolution:
+            reconcile_timeframes = st.checkbox(
+                "Reconcile with separate weekly and monthly forecasts",
+                value=False,
+                help="Runs two extra (coarser, cheaper) forecasts and adjusts the daily forecast towards them "
+                     "for every complete week and month."
+            )
+    
     # Aggregation Level
     st.markdown("#### 1️⃣ Aggregation Level")
     st.markdown("Choose how to group your data for forecasting")
     
-    aggregation_options = [
-        'Most Granular',
-        'By Company',
-        'By Route',
-        'By Fleet Type',
-        'By Region',
-        'By Province',
-        'By Company & Route',
-        'By Company & Fleet Type',
-        'By Route & Fleet Type'
-    ]
+    aggregation_options = list(DataProcessor.AGGREGATION_LEVELS.keys())
     
     col1, col2 = st.columns([2, 1])
     
@@ -108,6 +228,74 @@ def render():
     if series_summary['total_series'] > 50:
         st.warning(f"⚠️ You're forecasting {series_summary['total_series']} series. This may take a few minutes and consume API quota if using TimeGPT.")
     
+    # Hierarchical mode: every level in one run, reconciled so the levels add up
+    with st.expander("🏗️ Hierarchical Mode (all levels in one run)"):
+        hierarchical_mode = st.checkbox(
+            "Forecast all aggregation levels at once and reconcile them",
+            value=False,
+            help="Produces coherent forecasts for every aggregation level: granular numbers add up to "
+                 "company, route, region and total forecasts."
+        )
+        
+        reconciliation_method = None
+        if hierarchical_mode:
+            method_options = {name: key for key, name in HierarchicalForecaster.RECONCILIATION_METHODS.items()}
+            reconciliation_name = st.selectbox(
+                "Reconciliation method",
+                options=list(method_options.keys()),
+                index=list(method_options.values()).index('mint'),
+                help="Bottom-up sums granular forecasts. Top-down splits the total forecast by historical shares. "
+                     "MinT forecasts every level and combines them with minimum-variance weights."
+            )
+            reconciliation_method = method_options[reconciliation_name]
+            st.info(f"All levels will be available on the results page; **{aggregation_level}** is shown by default.")
+    
+    # Top-down disaggregation: forecast a coarser parent level and allocate down
+    agg_levels = DataProcessor.AGGREGATION_LEVELS
+    parent_options = [
+        level for level, cols in agg_levels.items()
+        if set(cols) < set(agg_levels[aggregation_level])
+    ]
+    
+    disaggregate = False
+    parent_level = None
+    proportion_method = 'historical'
+    proportion_window = None
+    if parent_options and not hierarchical_mode:
+        with st.expander("⬇️ Top-down Disaggregation (fewer model calls)"):
+            disaggregate = st.checkbox(
+                f"Forecast at a parent level and allocate down to {aggregation_level}",
+                value=False,
+                help="Only the parent series are sent to the model; child forecasts are split by historical shares."
+            )
+            
+            if disaggregate:
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    parent_level = st.selectbox(
+                        "Parent level",
+                        options=parent_options,
+                        index=len(parent_options) - 1
+                    )
+                with col_b:
+                    proportion_label = st.radio(
+                        "Allocation shares",
+                        options=['Whole history', 'Recent periods'],
+                        horizontal=True
+                    )
+                
+                if proportion_label == 'Recent periods':
+                    proportion_method = 'recent'
+                    proportion_window = st.number_input(
+                        "Number of recent periods for shares",
+                        min_value=1,
+                        value=28 if source_freq == 'D' else 6
+                    )
+                
+                parent_df, parent_cols = processor.aggregate_data(df, parent_level)
+                n_parents = parent_df.groupby(parent_cols).ngroups
+                st.info(f"**{n_parents}** parent series will be forecast instead of **{series_summary['total_series']}**.")
+    
     st.markdown("---")
     
     # Forecast Horizon
@@ -178,12 +366,21 @@ def render():
     
     col1, col2 = st.columns([2, 1])
     
+    # Local statistical models run offline, no API key required
+    local_model_options = {
+        'Auto (best model per series)': AUTO_MODEL,
+        'Ensemble (blend of models)': ENSEMBLE_MODEL
+    }
+    local_model_options.update({name: key for key, (name, _) in LOCAL_MODELS.items()})
+    local_model_options.update({name: key for key, name in GLOBAL_MODELS.items()})
+    local_model_options['Moving Average (MA-6)'] = 'ma6'
+    
     with col1:
         if st.session_state.api_key:
             model_options = {
                 'TimeGPT-1-long-horizon (Recommended)': 'timegpt-1-long-horizon',
                 'TimeGPT-1': 'timegpt-1',
-                'Moving Average (MA-6)': 'ma6'
+                **local_model_options
             }
             
             selected_model_name = st.selectbox(
@@ -192,14 +389,19 @@ def render():
                 index=0,
                 help="TimeGPT-1-long-horizon recommended for datasets with 3+ years"
             )
-            
-            selected_model = model_options[selected_model_name]
-            use_timegpt = selected_model != 'ma6'
         else:
-            st.warning("API key not configured - only Moving Average available")
-            selected_model = 'ma6'
-            selected_model_name = 'Moving Average (MA-6)'
-            use_timegpt = False
+            st.warning("API key not configured - only local statistical models available")
+            model_options = local_model_options
+            
+            selected_model_name = st.selectbox(
+                "Select Model",
+                options=list(model_options.keys()),
+                index=list(model_options.values()).index('ets_weekly'),
+                help="Local models are fitted on all series at once and run offline"
+            )
+        
+        selected_model = model_options[selected_model_name]
+        use_timegpt = selected_model.startswith('timegpt')
     
     with col2:
         st.markdown("<br>", unsafe_allow_html=True)
@@ -226,14 +428,151 @@ def render():
             """)
         else:
             st.markdown("""
+            **Auto:** every local model is scored on the most recent periods of each series, and each
+            series is forecast with its winner (optionally letting TimeGPT compete on a sample)
+            
+            **Ensemble:** a weighted blend of Seasonal Naive, Theta, ETS and Croston SBA (plus TimeGPT
+            if enabled), weighted by each model's accuracy on the most recent periods
+            
+            **Local statistical models** (no API required, all series fitted at once):
+            - **Seasonal Naive:** repeats the last seasonal cycle
+            - **Simple Exponential Smoothing:** weighted recent level
+            - **Holt's Linear Trend:** level plus trend
+            - **Theta:** exponential smoothing with drift on seasonally adjusted data
+            - **ETS (Weekly Seasonal):** level plus weekly pattern (yearly for monthly data)
+            - **Croston / Croston SBA / TSB:** for sparse, mostly-zero series
+            - **Global Gradient Boosting:** one model trained on all series with lag, rolling-mean and holiday features (needs scikit-learn, uses LightGBM if installed)
+            
             **Moving Average (MA-6):**
             - Simple statistical method
             - Uses average of last 6 periods
-            - Fast and reliable
-            - No API required
             - Works as fallback when API quota exceeded
             """)
     
+    # Auto model selection
+    auto_selection = 'series'
+    auto_timegpt_sample = 0
+    if selected_model == AUTO_MODEL:
+        with st.expander("🏆 Auto Model Selection", expanded=True):
+            selection_options = {name: key for key, name in ModelTournament.SELECTION_MODES.items()}
+            selection_name = st.radio(
+                "Pick the winning model",
+                options=list(selection_options.keys()),
+                horizontal=True,
+                help="Per series: every series gets its own best model. Per demand class: one model for all "
+                     "smooth, erratic, intermittent and lumpy series respectively (more stable on noisy data)."
+            )
+            auto_selection = selection_options[selection_name]
+            
+            if st.session_state.api_key:
+                timegpt_competes = st.checkbox(
+                    "Let TimeGPT compete on a sample of series",
+                    value=False,
+                    help="TimeGPT is scored on the sample only and used where it beats the best local model "
+                         f"by at least {ModelTournament.API_WIN_MARGIN:.0%}. Uses one extra API call."
+                )
+                if timegpt_competes:
+                    auto_timegpt_sample = st.number_input(
+                        "Sample size (series)",
+                        min_value=1,
+                        max_value=max(1, series_summary['total_series']),
+                        value=min(100, max(1, series_summary['total_series']))
+                    )
+    
+    # Ensemble blending
+    ensemble_weighting = 'demand_class'
+    if selected_model == ENSEMBLE_MODEL:
+        with st.expander("🧬 Ensemble", expanded=True):
+            weighting_options = {name: key for key, name in ModelEnsemble.WEIGHTING_MODES.items()}
+            weighting_name = st.radio(
+                "Weight the models",
+                options=list(weighting_options.keys()),
+                horizontal=True,
+                help="Weights come from each model's error over the most recent backtest windows. Per demand class "
+                     "pools the errors of smooth, erratic, intermittent and lumpy series (more stable); "
+                     "per series lets every series weight the models on its own."
+            )
+            ensemble_weighting = weighting_options[weighting_name]
+            
+            if st.session_state.api_key:
+                use_timegpt = st.checkbox(
+                    "Blend in TimeGPT",
+                    value=False,
+                    help="TimeGPT runs in the background while the local models are fitted. "
+                         "Uses one API call per backtest window to score it, plus one to forecast."
+                )
+    
+    # Intermittent demand routing
+    intermittent_model = None
+    if selected_model not in INTERMITTENT_MODELS and selected_model not in (AUTO_MODEL, ENSEMBLE_MODEL):
+        with st.expander("🧩 Sparse Series Handling", expanded=aggregation_level == 'Most Granular'):
+            route_sparse = st.checkbox(
+                "Route intermittent and lumpy series to a fast intermittent-demand model",
+                value=aggregation_level == 'Most Granular',
+                help="Series are classified by ADI/CV² into smooth, erratic, intermittent or lumpy. "
+                     "Only smooth and erratic series are sent to the selected model."
+            )
+            
+            if route_sparse:
+                intermittent_options = {LOCAL_MODELS[key][0]: key for key in INTERMITTENT_MODELS}
+                intermittent_name = st.selectbox(
+                    "Intermittent-demand model",
+                    options=list(intermittent_options.keys()),
+                    index=list(intermittent_options.values()).index('sba')
+                )
+                intermittent_model = intermittent_options[intermittent_name]
+    
+    # Parallel execution of local models
+    with st.expander("⚡ Performance"):
+        max_workers = os.cpu_count() or 1
+        if max_workers > 1:
+            n_jobs = st.slider(
+                "CPU workers for local models",
+                min_value=1,
+                max_value=max_workers,
+                value=max_workers,
+                help="Series are split across this many processes. Use 1 to run in a single process."
+            )
+        else:
+            n_jobs = 1
+            st.info("Single CPU detected - local models run in one process.")
+    
+    # Prediction intervals
+    with st.expander("📏 Prediction Intervals"):
+        interval_levels = st.multiselect(
+            "Interval coverage (%)",
+            options=[50, 80, 90, 95, 99],
+            default=INTERVAL_LEVELS,
+            help="Lower and upper bounds that should contain the actual value this often. TimeGPT returns "
+                 "its own intervals; other models are calibrated on their errors over recent history."
+        )
+        if not interval_levels:
+            st.info("Only point forecasts will be produced.")
+    
+    # Context window (TimeGPT only)
+    input_size = None
+    if use_timegpt:
+        with st.expander("⚙️ Advanced: TimeGPT Context Window"):
+            auto_input_size = FleetForecaster().get_input_size(selected_model, horizon, freq_code)
+            
+            context_mode = st.radio(
+                "History sent per series",
+                options=['Auto (based on model and horizon)', 'Custom'],
+                index=0,
+                horizontal=True,
+                help="Only the most recent observations of each series are uploaded to TimeGPT"
+            )
+            
+            if context_mode == 'Custom':
+                input_size = st.number_input(
+                    f"Number of recent {freq_name.lower()} periods",
+                    min_value=horizon,
+                    value=max(auto_input_size, horizon),
+                    help="Larger windows send more data and take longer"
+                )
+            else:
+                st.info(f"Each series will be trimmed to its last **{auto_input_size}** {freq_name.lower()} periods.")
+    
     st.markdown("---")
     
     # Summary
@@ -275,6 +614,153 @@ def render():
     
     st.markdown("---")
     
+    # Backtest: rolling-origin evaluation before committing to a model
+    with st.expander("🧪 Backtest Models (rolling-origin evaluation)"):
+        st.markdown(
+            f"Each model forecasts the last few {horizon}-period windows of the history from the data before them, "
+            "and is scored against what actually happened."
+        )
+        
+        col_a, col_b = st.columns([3, 1])
+        with col_a:
+            backtest_names = st.multiselect(
+                "Models to compare",
+                options=list(model_options.keys()),
+                default=[name for name in model_options if model_options[name] in ('seasonal_naive', 'theta', 'ets_weekly')],
+                help="TimeGPT models use one API call per fold"
+            )
+        with col_b:
+            n_folds = st.number_input("Folds", min_value=1, max_value=10, value=5)
+        
+        if st.button("🧪 Run Backtest", disabled=not backtest_names):
+            backtest_progress = st.progress(0)
+            backtest_status = st.empty()
+            
+            def update_backtest_progress(progress, message):
+                backtest_progress.progress(min(max(progress, 0.0), 1.0))
+                backtest_status.text(message)
+            
+            backtest_forecaster = FleetForecaster(api_key=st.session_state.api_key, n_jobs=n_jobs)
+            backtester, message = run_backtest(
+                processor,
+                backtest_forecaster,
+                df,
+                source_freq,
+                freq_code,
+                horizon,
+                aggregation_level,
+                models=[model_options[name] for name in backtest_names],
+                n_folds=n_folds,
+                include_holidays=include_holidays,
+                input_size=input_size,
+                intermittent_model=intermittent_model,
+                progress_callback=update_backtest_progress
+            )
+            
+            backtest_progress.empty()
+            backtest_status.empty()
+            st.session_state.api_calls_count += backtest_forecaster.api_calls
+            
+            if backtester is None:
+                st.error(f"❌ Backtest failed: {message}")
+            else:
+                if message != "Success":
+                    st.warning(f"⚠️ Some models could not be backtested: {message}")
+                
+                st.session_state.backtest_results = {
+                    'summary': backtester.summary(),
+                    'series': pd.concat(
+                        [backtester.series_metrics(model) for model in backtester.forecasts],
+                        ignore_index=True
+                    ),
+                    'aggregation_level': aggregation_level,
+                    'freq': freq_name,
+                    'horizon': horizon,
+                    'n_folds': len(backtester.cutoffs)
+                }
+        
+        backtest_results = st.session_state.get('backtest_results')
+        if backtest_results:
+            st.caption(
+                f"{backtest_results['n_folds']} folds of {backtest_results['horizon']} "
+                f"{backtest_results['freq'].lower()} periods at {backtest_results['aggregation_level']}. "
+                "Full per-series results are on the results page."
+            )
+            summary = backtest_results['summary']
+            st.dataframe(
+                summary[summary['level'] == backtest_results['aggregation_level']].round(2),
+                use_container_width=True,
+                hide_index=True
+            )
+    
+    forecast_options = dict(
+        model=selected_model,
+        use_timegpt=use_timegpt,
+        include_holidays=include_holidays,
+        input_size=input_size,
+        intermittent_model=intermittent_model,
+        auto_selection=auto_selection,
+        auto_timegpt_sample=auto_timegpt_sample,
+        ensemble_weighting=ensemble_weighting,
+        levels=sorted(interval_levels) or None
+    )
+    pipeline_options = dict(
+        source_freq=source_freq,
+        aggregation_level=aggregation_level,
+        forecast_options=forecast_options,
+        hierarchical_mode=hierarchical_mode,
+        reconciliation_method=reconciliation_method,
+        parent_level=parent_level if disaggregate else None,
+        proportion_method=proportion_method,
+        proportion_window=proportion_window
+    )
+    
+    # Checkpoints: batches are saved as they finish so an interrupted run can resume
+    checkpoint = None
+    with st.expander("💾 Checkpoints"):
+        save_progress = st.checkbox(
+            "Save progress in batches so an interrupted run can resume",
+            value=True,
+            help="Each batch of series is written to disk as soon as it is forecast. Running the same "
+                 "configuration again reuses the saved batches, so no TimeGPT batch is requested twice."
+        )
+        
+        if save_progress:
+            batch_size = st.number_input(
+                "Series per batch",
+                min_value=10,
+                value=DEFAULT_BATCH_SIZE,
+                step=50,
+                help="Smaller batches lose less work when a run is interrupted. With TimeGPT every batch is one API call."
+            )
+            
+            if st.session_state.data_fingerprint is None:
+                st.session_state.data_fingerprint = data_fingerprint(st.session_state.data)
+            
+            run_config = dict(
+                pipeline_options,
+                forecast_options=dict(forecast_options),
+                freq_code=freq_code,
+                horizon=horizon,
+                multi_resolution=multi_resolution,
+                reconcile_timeframes=reconcile_timeframes,
+                batch_size=batch_size
+            )
+            checkpoint = RunCheckpoint(run_config, st.session_state.data_fingerprint, batch_size=batch_size)
+            
+            if checkpoint.n_batches:
+                run_state = 'finished' if checkpoint.status == 'complete' else 'interrupted'
+                st.info(
+                    f"Found {checkpoint.n_batches} saved batches from an earlier {run_state} run "
+                    "with these settings - they will be reused."
+                )
+                if st.button("🗑️ Discard saved batches"):
+                    checkpoint.clear()
+                    st.rerun()
+    
+    if checkpoint is not None:
+        forecast_options['checkpoint'] = checkpoint
+    
     # Run Forecast Button
     st.markdown("### 🚀 Run Forecast")
     
@@ -293,95 +779,33 @@ def render():
             st.error("❌ No data available for selected aggregation level")
             return
         
-        # Run forecast progress indicators
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        # Prepare data
-        with st.spinner("Preparing data..."):
-            # Resample data if target freq != source freq
-            if freq_code != source_freq:
-                status_text.text(f"Resampling data to {freq_name}...")
-                data_to_agg = processor.resample_data(
-                    df,
-                    target_freq=freq_code,
-                    aggregation_cols=['company', 'origin', 'destination', 'province', 'region', 'fleet_type']
-                )
-            else:
-                data_to_agg = df.copy()
-                
-            # Aggregate data based on selected level
-            status_text.text("Aggregating data...")
-            agg_df, agg_cols = processor.aggregate_data(data_to_agg, aggregation_level)
-            
-            # Fill missing dates
-            status_text.text("Filling missing dates...")
-            filled_df = processor.fill_missing_dates(agg_df, freq=freq_code, aggregation_cols=agg_cols)
-            
-            # Add holiday features if enabled
-            if include_holidays:
-                status_text.text("Adding holiday features...")
-                filled_df = processor.add_holiday_features(filled_df, freq=freq_code)
-            
-            # Prepare for TimeGPT format
-            timegpt_df = processor.prepare_for_timegpt(filled_df, agg_cols)
-        
-        def update_progress(progress, message):
-            progress_bar.progress(progress)
-            status_text.text(message)
-        
-        # Initialize forecaster
-        forecaster = FleetForecaster(api_key=st.session_state.api_key)
-        
-        # Run forecast
-        forecast_result, model_used, message = forecaster.run_forecast(
-            df=timegpt_df,
+        # The run goes to a background job; the sidebar polls it and collects the result
+        forecaster = FleetForecaster(api_key=st.session_state.api_key, n_jobs=n_jobs)
+        job = get_job_manager().submit(
+            f"{selected_model_name.split(' (')[0]} · {aggregation_level} · {horizon} {freq_name.lower()} periods",
+            run_full_forecast,
+            processor, forecaster, df,
+            freq_code=freq_code,
+            freq_name=freq_name,
             horizon=horizon,
-            freq=freq_code,
-            model=selected_model,
-            use_timegpt=use_timegpt,
-            include_holidays=include_holidays,
-            progress_callback=update_progress
+            pipeline_options=pipeline_options,
+            multi_resolution=multi_resolution,
+            reconcile_timeframes=reconcile_timeframes,
+            checkpoint=checkpoint
         )
-        
-        if forecast_result is not None:
-            # Merge with metadata
-            final_forecast = forecaster.merge_forecast_with_metadata(
-                forecast_result,
-                filled_df,
-                agg_cols
-            )
-            
-            # Store in session state
-            st.session_state.forecast_results = final_forecast
-            st.session_state.forecast_metadata = {
-                'model_used': model_used,
-                'aggregation_level': aggregation_level,
-                'aggregation_cols': agg_cols,
-                'horizon': horizon,
-                'freq': freq_name,
-                'freq_code': freq_code,
-                'include_holidays': include_holidays,
-                'n_series': series_summary['total_series']
-            }
-            
-            progress_bar.progress(1.0)
-            status_text.empty()
-            
-            st.success(f"✅ Forecast completed successfully using {model_used}!")
-            st.balloons()
-            
-            # Show preview
-            st.markdown("### 👀 Forecast Preview")
-            st.dataframe(final_forecast.head(20), use_container_width=True)
-            
-            st.markdown("---")
-            st.info("📊 Go to **Results & Download** page to view charts and export your forecast!")
-        
-        else:
-            progress_bar.empty()
-            status_text.empty()
-            st.error(f"❌ Forecast failed: {message}")
-            
-            if "API" in message:
-                st.info("💡 Try using Moving Average (MA-6) as a fallback, or check your API key configuration.")
+        st.session_state.jobs.append(job.id)
+        st.rerun()
+    
+    manager = get_job_manager()
+    active_jobs = [manager.get(job_id) for job_id in st.session_state.jobs]
+    n_active = sum(1 for job in active_jobs if job is not None and job.active)
+    if n_active:
+        st.info(
+            f"⏳ {n_active} forecast job{'s' if n_active > 1 else ''} running - progress is shown in the sidebar. "
+            "You can change settings, start another run or switch pages meanwhile."
+        )
+    
+    # Outcome of the last finished job
+    if st.session_state.finished_job:
+        render_job_outcome(st.session_state.finished_job)
+        st.session_state.finished_job = None
@@ -79,6 +79,8 @@ def render():
                 st.session_state.api_key = api_key_input
                 st.success(f"✅ {message}")
             else:
+                for notice in forecaster.notices:
+                    st.error(notice)
                 st.error(f"❌ {message}")
                 st.session_state.api_key = None
     
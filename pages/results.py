@@ -1,9 +1,299 @@
 import streamlit as st
 import pandas as pd
 from utils.visualization import Visualizer
-from utils.export import ExportManager
+from utils.export import ExportManager, DATE_FORMAT, format_dates
+from utils.hierarchy import TemporalAggregator
+from utils.cube import ResultsCube, history_totals
+from utils.search import SearchIndex
+from utils.table import TablePages, PAGE_SIZES
+from utils.drilldown import SeriesIndex
+from utils.data_processor import DataProcessor
 from datetime import datetime
 
+# Tabs of the forecast charts
+CHART_TABS = ["📈 Historical vs Forecast", "🚚 By Fleet Type & Region", "🛣️ Top Routes", "📊 Distribution"]
+
+
+def get_cube(timeframe, aggregation_level, forecast_df, historical_df):
+    """ResultsCube of the selected view, built by the forecast run (or now, once, if missing)"""
+    cubes = st.session_state.get('forecast_cubes')
+    if cubes is None:
+        cubes = st.session_state.forecast_cubes = {}
+    
+    levels = cubes.setdefault(timeframe, {})
+    if aggregation_level not in levels:
+        levels[aggregation_level] = ResultsCube(forecast_df, history_totals(historical_df))
+    return levels[aggregation_level]
+
+
+def cached_export(cube, name, build):
+    """Export file of the view, built on its first render and reused by later reruns"""
+    if name not in cube.exports:
+        cube.exports[name] = build()
+    return cube.exports[name]
+
+
+@st.fragment
+def render_charts(historical_df, forecast_df, cube):
+    """Chart tabs; only the open tab is drawn, and its widgets rerun this section only"""
+    
+    st.markdown("### 📊 Forecast Visualizations")
+    
+    # Initialize visualizer
+    visualizer = Visualizer()
+    
+    tabs = list(CHART_TABS)
+    if 'route' not in cube.by_dimension or not (cube.has('origin') or cube.has('destination')):
+        tabs.remove("🛣️ Top Routes")
+    
+    tab = st.radio("Chart", options=tabs, horizontal=True, label_visibility="collapsed", key='results_chart_tab')
+    
+    if tab == "📈 Historical vs Forecast":
+        # Main chart: Historical vs Forecast
+        st.markdown("#### Historical Data vs Forecast")
+        
+        # Long charts are downsampled; a narrower range is redrawn with full detail
+        chart_start = min(historical_df['date'].min(), cube.start_date).to_pydatetime()
+        chart_end = cube.end_date.to_pydatetime()
+        date_range = st.slider(
+            "📅 Chart range",
+            min_value=chart_start,
+            max_value=chart_end,
+            value=(chart_start, chart_end),
+            format="DD/MM/YYYY",
+            help="Narrow the range to see every point: long histories are thinned out to keep the chart fast"
+        )
+        
+        fig_main = visualizer.plot_historical_vs_forecast(
+            historical_df,
+            forecast_df,
+            aggregation='total',
+            height=500,
+            cube=cube,
+            date_range=(pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]))
+        )
+        st.plotly_chart(fig_main, use_container_width=True)
+    
+    elif tab == "🚚 By Fleet Type & Region":
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("#### Forecast by Fleet Type")
+            if cube.has('fleet_type'):
+                fig_fleet = visualizer.plot_by_dimension(
+                    forecast_df,
+                    dimension='fleet_type',
+                    top_n=10,
+                    height=400,
+                    cube=cube
+                )
+                st.plotly_chart(fig_fleet, use_container_width=True)
+            else:
+                st.info("Single fleet type - no comparison available")
+        
+        with col2:
+            st.markdown("#### Forecast by Region")
+            if cube.has('region'):
+                fig_region = visualizer.plot_by_dimension(
+                    forecast_df,
+                    dimension='region',
+                    top_n=10,
+                    height=400,
+                    cube=cube
+                )
+                st.plotly_chart(fig_region, use_container_width=True)
+            else:
+                st.info("Single region - no comparison available")
+    
+    elif tab == "🛣️ Top Routes":
+        st.markdown("#### Top 10 Routes by Forecast Volume")
+        fig_routes = visualizer.plot_top_routes(forecast_df, top_n=10, height=450, cube=cube)
+        st.plotly_chart(fig_routes, use_container_width=True)
+    
+    else:
+        st.markdown("#### Forecast Distribution")
+        fig_dist = visualizer.plot_forecast_distribution(forecast_df, height=350, cube=cube)
+        st.plotly_chart(fig_dist, use_container_width=True)
+
+
+@st.fragment
+def render_drilldown(historical_df, forecast_df, cube, aggregation_level, freq):
+    """History and forecast of one series or slice of the view, chosen by key column"""
+    
+    st.markdown("### 🔎 Series Drill-down")
+    
+    key_cols = DataProcessor.AGGREGATION_LEVELS.get(aggregation_level, [])
+    if not key_cols:
+        st.info("This view is a single total series - see Historical Data vs Forecast above")
+    else:
+        # Both frames are indexed by series once per view; any selection is then a few row slices
+        if cube.series_index is None:
+            cube.series_index = SeriesIndex(
+                forecast_df,
+                historical_df,
+                key_cols,
+                freq=freq
+            )
+        series_index = cube.series_index
+        
+        # Each choice narrows the options of the next ones
+        filters = {}
+        for col, key_col in zip(st.columns(len(key_cols)), key_cols):
+            with col:
+                value = st.selectbox(
+                    key_col.replace('_', ' ').title(),
+                    options=[None] + series_index.options(key_col, filters),
+                    format_func=lambda value: "All" if value is None else value,
+                    key=f'drilldown_{key_col}'
+                )
+            if value is not None:
+                filters[key_col] = value
+        
+        codes = series_index.match(filters)
+        if len(codes) == 0:
+            st.info("No series match this selection")
+        else:
+            title = " / ".join(filters.values()) if filters else "All series"
+            fig_series = Visualizer().plot_series(
+                series_index.history_of(codes),
+                series_index.forecast_of(codes),
+                title=title,
+                cache_key=(cube.key, tuple(filters.items()))
+            )
+            st.plotly_chart(fig_series, use_container_width=True)
+            st.caption(
+                f"{len(codes):,} of {series_index.n_series:,} series"
+                + (" (summed; intervals combine their errors as independent)" if len(codes) > 1 else "")
+            )
+
+
+@st.fragment
+def render_table(forecast_df, cube):
+    """Searchable, sorted and paginated forecast table; typing reruns this section only"""
+    
+    st.markdown("### 📋 Forecast Data Table")
+    
+    # Search/filter
+    search_term = st.text_input(
+        "🔍 Search in data",
+        placeholder='e.g. Jakarta CDD, origin:Jakarta or company:"PT ABC"',
+        help="Rows must match every term; a term matches the start of words in text columns and dates, "
+             "`column:text` searches one column, quotes keep a phrase together"
+    )
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    
+    with col1:
+        sort_by = st.selectbox(
+            "Sort by",
+            options=[None] + list(forecast_df.columns),
+            format_func=lambda col: "Forecast order" if col is None else col,
+            key='table_sort_by'
+        )
+    
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        descending = st.checkbox("Descending", value=False, key='table_descending', disabled=sort_by is None)
+    
+    with col3:
+        page_size = st.selectbox("Rows per page", options=PAGE_SIZES, index=1, key='table_page_size')
+    
+    # Filter data if search term provided (dates are searched as displayed)
+    mask = None
+    if search_term:
+        if cube.search_index is None:
+            cube.search_index = SearchIndex(forecast_df)
+        try:
+            mask = cube.search_index.search(search_term)
+        except ValueError as e:
+            st.warning(f"⚠️ {e}")
+    
+    # Sort and page on the server: only the visible page is sent to the browser
+    if cube.table_pages is None:
+        cube.table_pages = TablePages(forecast_df)
+    n_rows = len(forecast_df) if mask is None else int(mask.sum())
+    n_pages = max(1, -(-n_rows // page_size))
+    
+    page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1)
+    page_df, n_rows, n_pages = cube.table_pages.page(
+        mask=mask,
+        sort_by=sort_by,
+        ascending=not descending,
+        page=page,
+        page_size=page_size
+    )
+    
+    # Display table, formatting dates of the shown rows only
+    st.dataframe(format_dates(page_df), use_container_width=True, height=400, hide_index=True)
+    if n_rows:
+        first_row = (min(page, n_pages) - 1) * page_size + 1
+        st.caption(f"Rows {first_row:,}–{first_row + len(page_df) - 1:,} of {n_rows:,}")
+    else:
+        st.caption("No matching rows")
+
+
+@st.fragment
+def render_backtest():
+    """Backtest accuracy (from the Forecasting Engine page), if a backtest was run"""
+    
+    backtest_results = st.session_state.get('backtest_results')
+    if backtest_results:
+        st.markdown("### 🧪 Backtest Accuracy")
+        st.markdown(
+            f"Rolling-origin backtest: **{backtest_results['n_folds']}** folds of **{backtest_results['horizon']}** "
+            f"{backtest_results['freq'].lower()} periods, evaluated at **{backtest_results['aggregation_level']}** "
+            "and summed up to every coarser level."
+        )
+        
+        summary = backtest_results['summary']
+        series_metrics = backtest_results['series']
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            level_options = list(summary['level'].unique())
+            backtest_level = st.selectbox(
+                "Level",
+                options=level_options,
+                index=level_options.index(backtest_results['aggregation_level']),
+                key='backtest_level'
+            )
+        
+        with col2:
+            sort_metric = st.selectbox(
+                "Rank models by",
+                options=['WAPE %', 'MAE', 'RMSE', 'sMAPE %', 'Bias %'],
+                key='backtest_metric'
+            )
+        
+        level_summary = summary[summary['level'] == backtest_level].copy()
+        level_summary = level_summary.sort_values(sort_metric, key=lambda values: values.abs())
+        st.dataframe(level_summary.round(2), use_container_width=True, hide_index=True)
+        
+        best_model = level_summary.iloc[0]['model']
+        st.success(f"🏆 Best at {backtest_level} by {sort_metric}: **{best_model}**")
+        
+        with st.expander("🔍 Per-series backtest metrics"):
+            model_filter = st.selectbox(
+                "Model",
+                options=list(series_metrics['model'].unique()),
+                key='backtest_model'
+            )
+            model_series = series_metrics[series_metrics['model'] == model_filter]
+            st.markdown(f"Worst 20 series by {sort_metric}:")
+            worst = model_series.sort_values(sort_metric, key=lambda values: values.abs(), ascending=False)
+            st.dataframe(worst.head(20).round(2), use_container_width=True, hide_index=True)
+            
+            st.download_button(
+                label="⬇️ Download per-series metrics (CSV)",
+                data=series_metrics.round(4).to_csv(index=False),
+                file_name=f"backtest_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+        
+        st.markdown("---")
+
+
 def render():
     """Render the Results & Download page"""
     
@@ -24,6 +314,39 @@ def render():
     forecast_df = st.session_state.forecast_results
     metadata = st.session_state.forecast_metadata
     historical_df = st.session_state.data
+    aggregation_level = metadata['aggregation_level']
+    timeframe = metadata['freq']
+    
+    # Multi-resolution and hierarchical runs hold several views of the forecast
+    forecast_views = st.session_state.get('forecast_views')
+    if forecast_views:
+        timeframe_options = list(forecast_views.keys())
+        level_options = list(forecast_views[timeframe].keys())
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if len(timeframe_options) > 1:
+                timeframe = st.selectbox(
+                    "🗓️ Timeframe",
+                    options=timeframe_options,
+                    index=timeframe_options.index(metadata['freq']),
+                    help="Weekly and monthly views are sums of the daily forecast"
+                )
+        
+        with col2:
+            if len(level_options) > 1:
+                aggregation_level = st.selectbox(
+                    "🏗️ Aggregation level",
+                    options=level_options,
+                    index=level_options.index(metadata['aggregation_level']),
+                    help="Forecasts were reconciled, so every level adds up to the same total"
+                )
+        
+        forecast_df = forecast_views[timeframe][aggregation_level]
+    
+    # Totals of this view, computed once per forecast run
+    cube = get_cube(timeframe, aggregation_level, forecast_df, historical_df)
     
     st.markdown("---")
     
@@ -31,15 +354,10 @@ def render():
     st.markdown("### 📈 Forecast Summary")
     
     # Calculate metrics
-    total_forecast = forecast_df['forecast_qty'].sum()
-    avg_daily_forecast = forecast_df['forecast_qty'].mean()
+    total_forecast = cube.total
     n_series = metadata['n_series']
-    
-    # Parse dates for range
-    forecast_df_temp = forecast_df.copy()
-    forecast_df_temp['date_parsed'] = pd.to_datetime(forecast_df_temp['date'], format='%d/%m/%Y')
-    start_date = forecast_df_temp['date_parsed'].min().strftime('%d/%m/%Y')
-    end_date = forecast_df_temp['date_parsed'].max().strftime('%d/%m/%Y')
+    start_date = cube.start_date.strftime(DATE_FORMAT)
+    end_date = cube.end_date.strftime(DATE_FORMAT)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -75,110 +393,29 @@ def render():
         </div>
         """, unsafe_allow_html=True)
     
-    st.markdown("---")
-    
-    # Visualizations
-    st.markdown("### 📊 Forecast Visualizations")
-    
-    # Initialize visualizer
-    visualizer = Visualizer()
-    
-    # Main chart: Historical vs Forecast
-    st.markdown("#### Historical Data vs Forecast")
-    
-    # Prepare historical data for comparison
-    historical_df_viz = historical_df.copy()
-    historical_df_viz['date'] = historical_df_viz['date'].dt.strftime('%d/%m/%Y')
-
-    # Debug: check data
-    print("Historical df shape:", historical_df_viz.shape)
-    print("Historical df columns:", historical_df_viz.columns.tolist())
-    print("Forecast df shape:", forecast_df.shape)
-    print("Forecast df columns:", forecast_df.columns.tolist())
-
-    # Call plot
-    fig_main = visualizer.plot_historical_vs_forecast(
-        historical_df_viz,
-        forecast_df,
-        aggregation='total',
-        height=500
-    )
-
-    print("fig_main type:", type(fig_main))
-
-    st.plotly_chart(fig_main, use_container_width=True)
+    # Prediction interval on the total
+    if cube.interval_cols:
+        total_interval = cube.total_interval
+        st.caption("📏 Total forecast intervals: " + ", ".join(
+            f"{col.rsplit('_', 1)[1]}%: {total_interval[col]:,.0f} – {total_interval[col.replace('_lo_', '_hi_')]:,.0f}"
+            for col in cube.interval_cols
+        ))
     
     st.markdown("---")
     
-    # Additional visualizations
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("#### Forecast by Fleet Type")
-        if 'fleet_type' in forecast_df.columns and forecast_df['fleet_type'].nunique() > 1:
-            fig_fleet = visualizer.plot_by_dimension(
-                forecast_df,
-                dimension='fleet_type',
-                top_n=10,
-                height=400
-            )
-            st.plotly_chart(fig_fleet, use_container_width=True)
-        else:
-            st.info("Single fleet type - no comparison available")
-    
-    with col2:
-        st.markdown("#### Forecast by Region")
-        if 'region' in forecast_df.columns and forecast_df['region'].nunique() > 1:
-            fig_region = visualizer.plot_by_dimension(
-                forecast_df,
-                dimension='region',
-                top_n=10,
-                height=400
-            )
-            st.plotly_chart(fig_region, use_container_width=True)
-        else:
-            st.info("Single region - no comparison available")
-    
-    # Top Routes
-    if 'origin' in forecast_df.columns and 'destination' in forecast_df.columns:
-        if forecast_df['origin'].nunique() > 1 or forecast_df['destination'].nunique() > 1:
-            st.markdown("#### Top 10 Routes by Forecast Volume")
-            fig_routes = visualizer.plot_top_routes(forecast_df, top_n=10, height=450)
-            st.plotly_chart(fig_routes, use_container_width=True)
-    
-    # Distribution
-    st.markdown("#### Forecast Distribution")
-    fig_dist = visualizer.plot_forecast_distribution(forecast_df, height=350)
-    st.plotly_chart(fig_dist, use_container_width=True)
+    # Charts, drill-down and table rerun on their own when their widgets change
+    render_charts(historical_df, forecast_df, cube)
     
     st.markdown("---")
     
-    # Data Table
-    st.markdown("### 📋 Forecast Data Table")
-    
-    col1, col2 = st.columns([3, 1])
-    
-    with col1:
-        # Add search/filter
-        search_term = st.text_input("🔍 Search in data", placeholder="Search by company, origin, destination...")
-    
-    with col2:
-        st.markdown("<br>", unsafe_allow_html=True)
-        show_all = st.checkbox("Show all rows", value=False)
+    render_drilldown(
+        historical_df, forecast_df, cube, aggregation_level,
+        freq=TemporalAggregator.TIMEFRAMES.get(timeframe, metadata['freq_code'])
+    )
     
-    # Filter data if search term provided
-    display_df = forecast_df.copy()
-    if search_term:
-        mask = display_df.astype(str).apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
-        display_df = display_df[mask]
+    st.markdown("---")
     
-    # Display table
-    if show_all:
-        st.dataframe(display_df, use_container_width=True, height=600)
-    else:
-        st.dataframe(display_df.head(100), use_container_width=True, height=400)
-        if len(display_df) > 100:
-            st.info(f"Showing first 100 of {len(display_df)} rows. Check 'Show all rows' to see more.")
+    render_table(forecast_df, cube)
     
     st.markdown("---")
     
@@ -192,10 +429,11 @@ def render():
     export_metadata = exporter.create_metadata_dict(
         forecast_df,
         model_used=metadata['model_used'],
-        aggregation_level=metadata['aggregation_level'],
+        aggregation_level=aggregation_level,
         horizon=metadata['horizon'],
-        freq='D' if metadata['freq'] == 'Daily' else 'MS',
-        include_holidays=metadata['include_holidays']
+        freq=TemporalAggregator.TIMEFRAMES.get(timeframe, metadata['freq_code']),
+        include_holidays=metadata['include_holidays'],
+        cube=cube
     )
     
     # Export options
@@ -209,11 +447,12 @@ def render():
         
         with col_a:
             # Excel detailed
-            excel_detailed = exporter.export_detailed_excel(
+            excel_detailed = cached_export(cube, 'detailed_excel', lambda: exporter.export_detailed_excel(
                 forecast_df,
-                historical_df_viz,
-                export_metadata
-            )
+                historical_df,
+                export_metadata,
+                cube=cube
+            ))
             
             st.download_button(
                 label="📥 Download Detailed (Excel)",
@@ -225,7 +464,7 @@ def render():
         
         with col_b:
             # CSV detailed
-            csv_detailed = exporter.export_detailed_csv(forecast_df)
+            csv_detailed = cached_export(cube, 'detailed_csv', lambda: exporter.export_detailed_csv(forecast_df))
             
             st.download_button(
                 label="📥 Download Detailed (CSV)",
@@ -258,10 +497,11 @@ def render():
         
         with col_a:
             # Excel summary
-            excel_summary = exporter.export_summary_excel(
+            excel_summary = cached_export(cube, 'summary_excel', lambda: exporter.export_summary_excel(
                 forecast_df,
-                export_metadata
-            )
+                export_metadata,
+                cube=cube
+            ))
             
             st.download_button(
                 label="📥 Download Summary (Excel)",
@@ -273,7 +513,7 @@ def render():
         
         with col_b:
             # CSV summary
-            csv_summary = exporter.export_summary_csv(forecast_df)
+            csv_summary = cached_export(cube, 'summary_csv', lambda: exporter.export_summary_csv(forecast_df, cube=cube))
             
             st.download_button(
                 label="📥 Download Summary (CSV)",
@@ -304,14 +544,14 @@ def render():
     
     with col1:
         # Peak day
-        daily_total = forecast_df.groupby('date')['forecast_qty'].sum()
+        daily_total = cube.by_date.set_index('date')['forecast_qty']
         peak_day = daily_total.idxmax()
         peak_value = daily_total.max()
         
         st.markdown(f"""
         <div class='metric-card'>
             <h3>Peak Day</h3>
-            <div class='value' style='font-size: 1.2rem;'>{peak_day}</div>
+            <div class='value' style='font-size: 1.2rem;'>{peak_day.strftime(DATE_FORMAT)}</div>
             <p style='margin: 0.5rem 0 0 0; color: #666;'>{peak_value:.0f} fleets</p>
         </div>
         """, unsafe_allow_html=True)
@@ -324,15 +564,15 @@ def render():
         st.markdown(f"""
         <div class='metric-card'>
             <h3>Lowest Day</h3>
-            <div class='value' style='font-size: 1.2rem;'>{low_day}</div>
+            <div class='value' style='font-size: 1.2rem;'>{low_day.strftime(DATE_FORMAT)}</div>
             <p style='margin: 0.5rem 0 0 0; color: #666;'>{low_value:.0f} fleets</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
         # Most active fleet type
-        if 'fleet_type' in forecast_df.columns:
-            fleet_total = forecast_df.groupby('fleet_type')['forecast_qty'].sum()
+        if 'fleet_type' in cube.by_dimension:
+            fleet_total = cube.by_dimension['fleet_type'].set_index('fleet_type')['forecast_qty']
             top_fleet = fleet_total.idxmax()
             top_fleet_value = fleet_total.max()
             
@@ -346,6 +586,8 @@ def render():
     
     st.markdown("---")
     
+    render_backtest()
+    
     # Action buttons
     col1, col2, col3 = st.columns([1, 1, 1])
     
@@ -356,7 +598,12 @@ def render():
     with col2:
         if st.button("📤 Upload New Data", use_container_width=True):
             st.session_state.data = None
+            st.session_state.upload_cache = None
+            st.session_state.data_fingerprint = None
             st.session_state.forecast_results = None
+            st.session_state.forecast_views = None
+            st.session_state.forecast_cubes = None
+            st.session_state.backtest_results = None
             st.switch_page("pages/data_upload.py")
     
     with col3:
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The app imports its modules as `utils.*` from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def fleet_data(rng):
+    """Dimension-level daily data in the upload schema, some dimension values missing"""
+    n_rows = 3000
+    origins = rng.choice(['Jakarta', 'Surabaya', 'Jakarta Utara'], n_rows)
+    return pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, n_rows), unit='D'),
+        'company': rng.choice(['PT Abadi', 'PT Bumi-Jaya', 'CV Cahaya'], n_rows),
+        'origin': origins,
+        'destination': rng.choice(['Bandung', 'Medan', None], n_rows),
+        'province': 'Jawa',
+        'region': np.where(origins == 'Surabaya', 'East', 'West'),
+        'fleet_type': rng.choice(['CDD', 'Fuso', 'Wingbox'], n_rows),
+        'qty': rng.integers(0, 10, n_rows)
+    })
+
+
+@pytest.fixture
+def forecast_frame(rng):
+    """Forecast frame of 12 series over 14 days, with interval bounds"""
+    dates = pd.date_range('2024-04-01', periods=14)
+    keys = pd.MultiIndex.from_product(
+        [['PT Abadi', 'PT Bumi-Jaya', 'CV Cahaya'], ['Jakarta', 'Surabaya'], ['CDD', 'Fuso']],
+        names=['company', 'origin', 'fleet_type']
+    ).to_frame(index=False)
+    frame = keys.loc[keys.index.repeat(len(dates))].reset_index(drop=True)
+    frame.insert(0, 'date', np.tile(dates.values, len(keys)))
+    frame['unique_id'] = frame[['company', 'origin', 'fleet_type']].agg('_'.join, axis=1)
+    frame['forecast_qty'] = rng.integers(0, 20, len(frame))
+    frame['forecast_qty_lo_80'] = np.maximum(frame['forecast_qty'] - 3, 0)
+    frame['forecast_qty_hi_80'] = frame['forecast_qty'] + 3
+    return frame
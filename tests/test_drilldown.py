@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.drilldown import SeriesIndex
+
+
+KEY_COLS = ['company', 'origin', 'fleet_type']
+
+
+@pytest.fixture
+def history(forecast_frame, rng):
+    dates = pd.date_range('2024-03-01', '2024-03-31')
+    keys = forecast_frame[KEY_COLS].drop_duplicates()
+    history = keys.loc[keys.index.repeat(len(dates))].reset_index(drop=True)
+    history['date'] = np.tile(dates.values, len(keys))
+    history['qty'] = rng.integers(0, 10, len(history))
+    return history
+
+
+@pytest.fixture
+def index(forecast_frame, history):
+    return SeriesIndex(forecast_frame, history, KEY_COLS)
+
+
+def test_options_narrow_with_filters(index):
+    assert index.n_series == 12
+    assert index.options('company') == ['CV Cahaya', 'PT Abadi', 'PT Bumi-Jaya']
+    assert len(index.match({'company': 'PT Abadi', 'origin': 'Jakarta'})) == 2
+
+
+def test_one_series_matches_pandas(index, forecast_frame, history):
+    filters = {'company': 'PT Abadi', 'origin': 'Surabaya', 'fleet_type': 'Fuso'}
+    codes = index.match(filters)
+    selected = forecast_frame[KEY_COLS].eq(pd.Series(filters)).all(axis=1)
+
+    forecast = index.forecast_of(codes)
+    np.testing.assert_array_equal(forecast['forecast_qty'], forecast_frame.loc[selected, 'forecast_qty'])
+    history_selected = history[KEY_COLS].eq(pd.Series(filters)).all(axis=1)
+    np.testing.assert_array_equal(index.history_of(codes)['qty'], history.loc[history_selected, 'qty'])
+
+
+def test_slice_sums_its_series(index, forecast_frame, history):
+    codes = index.match({'origin': 'Jakarta'})
+    selected = forecast_frame['origin'].eq('Jakarta')
+
+    forecast = index.forecast_of(codes)
+    expected = forecast_frame[selected].groupby('date')['forecast_qty'].sum()
+    np.testing.assert_array_equal(forecast['forecast_qty'], expected)
+    assert (forecast['forecast_qty_lo_80'] <= forecast['forecast_qty']).all()
+
+    expected_history = history[history['origin'].eq('Jakarta')].groupby('date')['qty'].sum()
+    np.testing.assert_array_equal(index.history_of(codes)['qty'], expected_history)
+
+
+def test_history_is_bucketed_to_the_view_timeframe(forecast_frame, history):
+    weekly = SeriesIndex(forecast_frame, history, KEY_COLS, freq='W-MON')
+    totals = weekly.history_of(weekly.match())
+
+    assert totals['date'].dt.dayofweek.eq(0).all()
+    assert totals['qty'].sum() == history['qty'].sum()
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.explorer import ExplorerIndex
+
+
+@pytest.fixture
+def index(fleet_data):
+    return ExplorerIndex(fleet_data)
+
+
+@pytest.mark.parametrize('filters, date_range', [
+    ({'company': ['PT Abadi']}, None),
+    ({'company': ['PT Abadi', 'CV Cahaya'], 'fleet_type': ['Fuso']}, None),
+    ({'origin': ['Surabaya']}, ('2024-02-01', '2024-02-29')),
+    ({}, ('2024-01-10', '2024-01-20'))
+])
+def test_select_matches_pandas_mask(index, fleet_data, filters, date_range):
+    mask = np.ones(len(fleet_data), dtype=bool)
+    for col, values in filters.items():
+        mask &= fleet_data[col].isin(values).to_numpy()
+    if date_range is not None:
+        mask &= fleet_data['date'].between(*date_range).to_numpy()
+
+    np.testing.assert_array_equal(index.select(filters, date_range), np.flatnonzero(mask))
+
+
+def test_no_filter_selects_all_rows(index):
+    assert index.select({'company': []}) is None
+
+
+def test_totals_match_groupby(index, fleet_data):
+    positions = index.select({'fleet_type': ['CDD']})
+    selected = fleet_data.iloc[positions]
+
+    daily = index.daily_totals(positions)
+    np.testing.assert_array_equal(daily['qty'], selected.groupby('date')['qty'].sum())
+
+    regions = index.totals_by('region', positions)
+    np.testing.assert_array_equal(regions['qty'], selected.groupby('region')['qty'].sum())
+
+
+def test_missing_values_are_a_value(index, fleet_data):
+    assert any(route.endswith('→ Unknown') for route in index.options('route'))
+
+    routes = index.totals_by('route')
+    assert routes['qty'].sum() == fleet_data['qty'].sum()
+    unknown = routes[routes['route'].str.endswith('→ Unknown')]
+    assert unknown['qty'].sum() == fleet_data.loc[fleet_data['destination'].isna(), 'qty'].sum()
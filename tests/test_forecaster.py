@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.forecaster import (
+    FleetForecaster, INTERMITTENT_ALPHA, _croston, _sba, _tsb, classify_demand, conformal_half_widths
+)
+
+
+@pytest.fixture
+def intermittent_panel():
+    """Constant demand, demand every other period, and no demand at all"""
+    n_periods = 40
+    return np.array([
+        np.full(n_periods, 6.0),
+        np.tile([0.0, 6.0], n_periods // 2),
+        np.zeros(n_periods)
+    ])
+
+
+def test_croston_rate_is_size_over_interval(intermittent_panel):
+    forecast = _croston(intermittent_panel, 5)
+
+    assert forecast.shape == (3, 5)
+    np.testing.assert_allclose(forecast[:, 0], [6.0, 3.0, 0.0])
+    np.testing.assert_allclose(forecast, forecast[:, :1].repeat(5, axis=1))
+
+
+def test_sba_deflates_croston(intermittent_panel):
+    np.testing.assert_allclose(
+        _sba(intermittent_panel, 5),
+        (1 - INTERMITTENT_ALPHA / 2) * _croston(intermittent_panel, 5)
+    )
+
+
+def test_tsb_is_probability_times_size(intermittent_panel):
+    forecast = _tsb(intermittent_panel, 3)[:, 0]
+
+    assert forecast[0] == pytest.approx(6.0)
+    assert 0 < forecast[1] < 6.0
+    assert forecast[2] == 0.0
+
+
+def test_classify_demand(intermittent_panel):
+    classes, adi, _ = classify_demand(intermittent_panel)
+
+    assert classes[0] == 'smooth'
+    assert adi[1] == pytest.approx(2.0)
+    assert classes[1] == 'intermittent'
+
+
+def test_conformal_half_widths_scale_per_series():
+    errors = np.stack([np.full((3, 4), 2.0), np.full((3, 4), -5.0), np.zeros((3, 4))])
+    half_widths = conformal_half_widths(errors, horizon=6, levels=[80, 95])
+
+    for level in (80, 95):
+        assert half_widths[level].shape == (3, 6)
+        np.testing.assert_allclose(half_widths[level][0], 2.0)
+        np.testing.assert_allclose(half_widths[level][1], 5.0)
+        np.testing.assert_allclose(half_widths[level][2], 0.0)
+
+
+def test_conformal_half_widths_widen_with_level(rng):
+    errors = rng.normal(size=(50, 3, 7))
+    half_widths = conformal_half_widths(errors, horizon=7, levels=[80, 95])
+
+    assert (half_widths[95] >= half_widths[80]).all()
+
+
+def test_moving_average_matches_per_series_mean(rng):
+    dates = pd.date_range('2024-01-01', periods=30)
+    df = pd.DataFrame({
+        'unique_id': np.repeat(['a', 'b', 'c'], len(dates)),
+        'ds': np.tile(dates.values, 3),
+        'y': rng.poisson(5, 3 * len(dates)).astype(float)
+    })
+
+    result, message = FleetForecaster().forecast_moving_average(df, 7, 'D', levels=[80])
+
+    assert message == "Success"
+    expected = df.groupby('unique_id')['y'].apply(lambda y: round(y.tail(6).mean()))
+    assert (result.groupby('unique_id')['forecast'].first() == expected).all()
+    assert result['ds'].min() == dates[-1] + pd.Timedelta(days=1)
+    assert (result['forecast_lo_80'] <= result['forecast']).all()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.forecaster import FleetForecaster
+from utils.hierarchy import HierarchicalForecaster, TemporalAggregator
+
+
+@pytest.fixture
+def hierarchy(fleet_data):
+    return HierarchicalForecaster(FleetForecaster()).build(fleet_data.fillna({'destination': 'Solo'}))
+
+
+@pytest.mark.parametrize('method', ['mint', 'bottom_up', 'top_down'])
+def test_reconciled_levels_sum_to_the_total(hierarchy, method):
+    frames, _, message = hierarchy.forecast(7, method=method, model='ses', use_timegpt=False)
+
+    assert message == "Success"
+    total = frames[HierarchicalForecaster.TOTAL_LEVEL].groupby('date')['forecast_qty'].sum()
+    for level, frame in frames.items():
+        pd.testing.assert_series_equal(frame.groupby('date')['forecast_qty'].sum(), total, check_names=False)
+
+
+@pytest.mark.parametrize('dense_solve_limit', [HierarchicalForecaster.DENSE_SOLVE_LIMIT, 0])
+def test_mint_keeps_coherent_forecasts(hierarchy, rng, dense_solve_limit):
+    # A forecast that already adds up is its own reconciliation (dense and iterative solve)
+    hierarchy.DENSE_SOLVE_LIMIT = dense_solve_limit
+    bottom = rng.uniform(0, 10, size=(hierarchy.S.shape[1], 5))
+
+    solution = hierarchy._mint_bottom(np.asarray(hierarchy.S @ bottom))
+    np.testing.assert_allclose(solution, bottom, atol=1e-4 if dense_solve_limit else 1e-2)
+
+
+def test_rounding_preserves_totals(hierarchy, rng):
+    F = rng.uniform(0, 5, size=(40, 6))
+    rounded = hierarchy._round_preserving_totals(F)
+
+    np.testing.assert_array_equal(rounded, np.round(rounded))
+    np.testing.assert_array_equal(rounded.sum(axis=0), np.round(F.sum(axis=0)))
+    assert (np.abs(rounded - F) < 1).all()
+
+
+@pytest.fixture
+def daily_forecast():
+    # Tuesday 2 Jan to Monday 15 Jan: two complete weeks (labelled by their Monday)
+    dates = pd.date_range('2024-01-02', '2024-01-15')
+    return pd.DataFrame({
+        'date': np.tile(dates.values, 2),
+        'unique_id': np.repeat(['a', 'b'], len(dates)),
+        'forecast_qty': 10,
+        'forecast_qty_lo_80': 8,
+        'forecast_qty_hi_80': 12
+    })
+
+
+def test_temporal_aggregate_sums_buckets(daily_forecast):
+    weekly = TemporalAggregator().aggregate(daily_forecast, 'W-MON')
+
+    assert list(weekly.columns) == list(daily_forecast.columns)
+    assert weekly['date'].dt.dayofweek.eq(0).all()
+    assert (weekly['forecast_qty'] == 70).all()
+
+
+def test_temporal_reconcile_moves_towards_coarse_forecast(daily_forecast):
+    weekly = TemporalAggregator().aggregate(daily_forecast, 'W-MON').assign(forecast_qty=140)
+    reconciled = TemporalAggregator().reconcile(daily_forecast, {'W-MON': weekly})
+
+    # Target of every week is the even blend of 70 (daily) and 140 (weekly)
+    assert (reconciled['forecast_qty'] == 15).all()
+    assert (reconciled['forecast_qty_lo_80'] == 12).all()
+    assert (reconciled['forecast_qty_hi_80'] == 18).all()
+
+
+def test_temporal_aggregator_requires_datetimes(daily_forecast):
+    with pytest.raises(ValueError, match="datetime64"):
+        TemporalAggregator().aggregate(daily_forecast.assign(date=daily_forecast['date'].dt.strftime('%d/%m/%Y')), 'MS')
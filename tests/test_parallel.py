@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from utils.forecaster import _theta, _sba
+from utils.parallel import ParallelBackend
+
+
+def _failing_model(Y, horizon, season_length=None):
+    raise ValueError("model failure")
+
+
+@pytest.fixture
+def panel(rng):
+    return rng.gamma(2.0, 3.0, size=(120, 80))
+
+
+@pytest.fixture(scope='module')
+def parallel_backend():
+    backend = ParallelBackend(n_workers=2, min_series_per_worker=10)
+    yield backend
+    backend.close()
+
+
+def test_serial_for_small_panels(panel):
+    backend = ParallelBackend(n_workers=4, min_series_per_worker=1000)
+    backend.map_panel(_sba, panel, 7, None)
+    assert backend.last_mode == 'serial'
+
+
+@pytest.mark.parametrize('model_func, season_length', [(_theta, 7), (_sba, None)])
+def test_parallel_matches_serial(panel, parallel_backend, model_func, season_length):
+    cutoffs = [50, 65, 80]
+    serial = ParallelBackend(n_workers=1).map_folds(model_func, panel, 7, cutoffs, season_length)
+    parallel = parallel_backend.map_folds(model_func, panel, 7, cutoffs, season_length)
+
+    assert parallel_backend.last_mode.startswith('parallel')
+    assert parallel.shape == (len(cutoffs), panel.shape[0], 7)
+    np.testing.assert_allclose(parallel, serial)
+    np.testing.assert_allclose(parallel_backend.map_panel(model_func, panel, 7, season_length), serial[-1])
+
+
+def test_pool_is_reused_until_closed(panel):
+    with ParallelBackend(n_workers=2, min_series_per_worker=10) as backend:
+        backend.map_panel(_sba, panel, 7, None)
+        pool = backend._pool
+        backend.map_panel(_sba, panel, 7, None)
+        assert backend._pool is pool
+    assert backend._pool is None
+
+
+def test_failure_is_recorded_and_rerun_serially(panel, parallel_backend, caplog):
+    with pytest.raises(ValueError, match="model failure"):
+        parallel_backend.map_panel(_failing_model, panel, 7)
+
+    assert parallel_backend.last_mode == 'serial (fallback)'
+    assert isinstance(parallel_backend.last_error, ValueError)
+    assert "running serially" in caplog.text
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from utils.search import SearchIndex, parse_query, tokenize
+
+
+@pytest.fixture
+def frame(fleet_data):
+    return fleet_data
+
+
+@pytest.fixture
+def index(frame):
+    return SearchIndex(frame)
+
+
+def test_parse_query():
+    assert parse_query('origin:Jakarta "PT A" cdd') == [('origin', 'Jakarta'), (None, 'PT A'), (None, 'cdd')]
+
+
+def test_tokenize_splits_on_punctuation():
+    assert tokenize("PT Bumi-Jaya") == ['pt', 'bumi', 'jaya']
+    assert tokenize("31/01/2024") == ['31', '01', '2024']
+
+
+def test_only_text_and_date_columns_are_searched(index):
+    assert index.fields == ['date', 'company', 'origin', 'destination', 'province', 'region', 'fleet_type']
+    with pytest.raises(ValueError, match="Unknown field 'qty'"):
+        index.search('qty:5')
+
+
+def test_field_query_matches_pandas_filter(index, frame):
+    expected = frame['origin'].str.lower().str.split().map(lambda words: any(w.startswith('jak') for w in words))
+    np.testing.assert_array_equal(index.search('origin:jak'), expected.to_numpy())
+
+
+def test_terms_are_anded(index, frame):
+    expected = frame['company'].eq('PT Bumi-Jaya') & frame['fleet_type'].eq('Fuso')
+    np.testing.assert_array_equal(index.search('company:jaya fleet_type:fuso'), expected.to_numpy())
+
+
+def test_phrase_needs_every_word_in_one_value(index, frame):
+    np.testing.assert_array_equal(index.search('"jakarta utara"'), frame['origin'].eq('Jakarta Utara').to_numpy())
+
+
+def test_dates_are_searched_as_displayed(index, frame):
+    np.testing.assert_array_equal(index.search('date:15/02/2024'), frame['date'].eq('2024-02-15').to_numpy())
+
+
+def test_words_match_from_their_start(index, frame):
+    assert not index.search('karta').any()
+    # Missing values never match
+    assert not index.search('destination:none').any()
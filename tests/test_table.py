@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.table import TablePages
+
+
+@pytest.fixture
+def frame(forecast_frame):
+    frame = forecast_frame.copy()
+    frame.loc[::7, 'forecast_qty'] = np.nan
+    return frame
+
+
+@pytest.mark.parametrize('ascending', [True, False])
+def test_sorted_page_matches_pandas(frame, ascending):
+    rows, n_rows, n_pages = TablePages(frame).page(sort_by='forecast_qty', ascending=ascending, page=2, page_size=50)
+
+    expected = frame.sort_values('forecast_qty', ascending=ascending, kind='stable', na_position='last')
+    pd.testing.assert_frame_equal(rows, expected.iloc[50:100])
+    assert (n_rows, n_pages) == (len(frame), -(-len(frame) // 50))
+
+
+def test_filtered_page_keeps_sort_order(frame):
+    mask = frame['company'].eq('PT Abadi').to_numpy()
+    rows, n_rows, _ = TablePages(frame).page(mask=mask, sort_by='date', ascending=False, page_size=1000)
+
+    expected = frame[mask].sort_values('date', ascending=False, kind='stable')
+    pd.testing.assert_frame_equal(rows, expected)
+    assert n_rows == mask.sum()
+
+
+def test_page_is_clamped(frame):
+    rows, _, n_pages = TablePages(frame).page(page=99, page_size=100)
+
+    pd.testing.assert_frame_equal(rows, frame.iloc[(n_pages - 1) * 100:])
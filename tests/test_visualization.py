@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.visualization import FigureCache, Visualizer, downsample_indices, lttb_indices, minmax_indices
+
+
+def test_lttb_keeps_endpoints_and_peaks(rng):
+    y = rng.normal(size=10_000)
+    y[4321] = 50.0
+    indices = lttb_indices(np.arange(len(y)), y, 500)
+
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert (np.diff(indices) > 0).all()
+    assert 4321 in indices
+
+
+def test_short_lines_are_not_downsampled():
+    np.testing.assert_array_equal(lttb_indices(np.arange(10), np.arange(10), 50), np.arange(10))
+    np.testing.assert_array_equal(downsample_indices(np.arange(10), np.arange(10), max_points=50), np.arange(10))
+
+
+def test_minmax_keeps_every_bucket_extreme(rng):
+    y = rng.normal(size=1000)
+    indices = minmax_indices(y, 100)
+
+    assert y.argmax() in indices and y.argmin() in indices
+    assert (np.diff(indices) > 0).all()
+
+
+def test_downsample_dates():
+    dates = pd.Series(pd.date_range('2020-01-01', periods=5000))
+    indices = downsample_indices(dates, np.sin(np.arange(5000) / 50), max_points=300)
+
+    assert len(indices) == 300
+
+
+def test_figures_are_cached_by_view_key(forecast_frame):
+    visualizer = Visualizer()
+    by_date = forecast_frame.groupby('date')['forecast_qty'].sum().reset_index()
+
+    # Same view key: the cached figure, even though the frame passed along differs
+    first = visualizer.plot_time_series(by_date, value_col='forecast_qty', cache_key='view-1')
+    again = visualizer.plot_time_series(by_date.assign(forecast_qty=0), value_col='forecast_qty', cache_key='view-1')
+    assert json.loads(again.to_json())['data'] == json.loads(first.to_json())['data']
+
+    uncached = visualizer.plot_time_series(by_date.assign(forecast_qty=0), value_col='forecast_qty')
+    assert json.loads(uncached.to_json())['data'] != json.loads(first.to_json())['data']
+
+
+def test_figure_cache_evicts_least_recently_used():
+    cache = FigureCache(max_size=2)
+    figure = Visualizer().plot_time_series(pd.DataFrame({'date': [], 'qty': []}))
+    for key in ['a', 'b', 'a', 'c']:
+        cache.get_or_build(key, lambda: figure)
+
+    assert list(cache._figures) == ['a', 'c']
+    assert cache.hits == 1
@@ -0,0 +1,654 @@
+import time
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy import sparse
+from utils.data_processor import DataProcessor
+from utils.forecaster import LOCAL_MODELS, GLOBAL_MODELS, classify_demand
+
+
+# Accuracy metrics reported by the backtest (column name -> description)
+METRICS = {
+    'MAE': 'Mean absolute error',
+    'RMSE': 'Root mean squared error',
+    'WAPE %': 'Absolute error as a share of actual volume',
+    'sMAPE %': 'Symmetric mean absolute percentage error',
+    'Bias %': 'Over (+) or under (-) forecast as a share of actual volume'
+}
+
+
+def long_to_matrix(result, unique_ids, horizon, col='forecast'):
+    """(n_series x horizon) matrix of a long forecast frame, rows in `unique_ids` order"""
+    matrix = np.zeros((len(unique_ids), horizon))
+    result = result.sort_values(['unique_id', 'ds'])
+    rows = pd.Index(unique_ids).get_indexer(result['unique_id'])
+    steps = result.groupby('unique_id', sort=False).cumcount().to_numpy()
+    keep = (rows >= 0) & (steps < horizon)
+    matrix[rows[keep], steps[keep]] = result[col].to_numpy(dtype=float)[keep]
+    return matrix
+
+
+def error_metrics(actual, forecast):
+    """Accuracy metrics of every row of two (n_rows x n_points) matrices
+
+    Returns a dict of metric name -> array of length n_rows. Ratios are NaN for
+    rows without any actual volume.
+    """
+    error = forecast - actual
+    abs_error = np.abs(error)
+    volume = np.abs(actual).sum(axis=1)
+
+    # sMAPE term is 0 where actual and forecast are both 0
+    denominator = np.abs(actual) + np.abs(forecast)
+    smape_terms = np.divide(2 * abs_error, denominator, out=np.zeros_like(abs_error), where=denominator > 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'MAE': abs_error.mean(axis=1),
+            'RMSE': np.sqrt((error ** 2).mean(axis=1)),
+            'WAPE %': np.where(volume > 0, 100 * abs_error.sum(axis=1) / volume, np.nan),
+            'sMAPE %': 100 * smape_terms.mean(axis=1),
+            'Bias %': np.where(volume > 0, 100 * error.sum(axis=1) / volume, np.nan)
+        }
+
+
+class Backtester:
+    """Rolling-origin evaluation of FleetForecaster models
+
+    The last `n_folds` windows of `horizon` periods (spaced `step` periods apart)
+    are held out in turn; each fold is forecast from the history before it and
+    compared with the actuals. Metrics are computed per series and for every
+    coarser aggregation level that can be summed from the evaluated series.
+    """
+
+    def __init__(self, forecaster, n_folds=5, horizon=7, step=None):
+        self.forecaster = forecaster
+        self.n_folds = int(n_folds)
+        self.horizon = int(horizon)
+        self.step = int(step or horizon)
+
+        self.level = None
+        self.level_cols = None
+        self.keys = None
+        self.unique_ids = None
+        self.dates = None
+        self.Y = None
+        self.cutoffs = None
+        self.actuals = None
+        self.forecasts = {}
+        self.model_names = {}
+
+    def build(self, df, level, freq='D'):
+        """Build the series x time panel of an aggregation level from dimension-level data"""
+        self.level = level
+        self.level_cols = DataProcessor.AGGREGATION_LEVELS[level]
+
+        grouped = df.groupby(self.level_cols, sort=True, dropna=False)
+        series_codes = grouped.ngroup().to_numpy()
+        self.keys = grouped.size().reset_index()[self.level_cols]
+        self.unique_ids = self.keys.astype(str).agg('_'.join, axis=1).to_numpy()
+
+        # Complete date grid, missing periods are zero (as fill_missing_dates does)
+        self.dates = pd.date_range(start=df['date'].min(), end=df['date'].max(), freq=freq)
+        date_codes = self.dates.get_indexer(df['date'])
+        valid = date_codes >= 0
+
+        self.Y = np.zeros((len(self.keys), len(self.dates)))
+        np.add.at(self.Y, (series_codes[valid], date_codes[valid]), df['qty'].to_numpy(dtype=float)[valid])
+
+        self._set_cutoffs()
+        return self
+
+    def set_panel(self, unique_ids, dates, Y):
+        """Use an existing panel (e.g. from FleetForecaster.to_panel) instead of build()"""
+        self.unique_ids = np.asarray(unique_ids)
+        self.keys = pd.DataFrame(index=range(len(self.unique_ids)))
+        self.dates = pd.DatetimeIndex(dates)
+        self.Y = np.asarray(Y, dtype=float)
+
+        self._set_cutoffs()
+        return self
+
+    def _set_cutoffs(self):
+        """Index of the first held-out period of every fold, oldest first"""
+        n_periods = self.Y.shape[1]
+        cutoffs = n_periods - self.horizon - self.step * np.arange(self.n_folds)[::-1]
+
+        # Every fold needs some history to fit on
+        min_history = max(2 * self.horizon, 14)
+        self.cutoffs = cutoffs[cutoffs >= min_history]
+
+        # Actuals of every fold: (n_series, n_folds, horizon)
+        offsets = self.cutoffs[:, None] + np.arange(self.horizon)
+        self.actuals = self.Y[:, offsets]
+        self.forecasts = {}
+
+    def _long_frame(self, cutoff):
+        """Long (unique_id, ds, y) training frame of the history before `cutoff`"""
+        return pd.DataFrame({
+            'unique_id': np.repeat(self.unique_ids, cutoff),
+            'ds': np.tile(self.dates[:cutoff].values, len(self.unique_ids)),
+            'y': self.Y[:, :cutoff].ravel()
+        })
+
+    def run(self, model, freq='D', use_timegpt=False, include_holidays=True,
+            input_size=None, intermittent_model=None, progress_callback=None):
+        """Backtest one model over all folds
+
+        Local models run every fold straight on the panel, with folds and series
+        shards spread over the forecaster's process pool. Other models go through
+        run_forecast once per fold.
+
+        Returns (success, message).
+        """
+        if self.Y is None:
+            return False, "No data: call build() first"
+        if len(self.cutoffs) == 0:
+            return False, "Not enough history for a single backtest fold"
+
+        try:
+            if model in LOCAL_MODELS and not use_timegpt and not intermittent_model:
+                model_name, model_func = LOCAL_MODELS[model]
+
+                if progress_callback:
+                    progress_callback(0.3, f"Backtesting {model_name} on {len(self.cutoffs)} folds...")
+
+                season_length = self.forecaster.SEASON_LENGTHS[self.forecaster._freq_key(freq)]
+                folds = self.forecaster.backend.map_folds(
+                    model_func, self.Y, self.horizon, self.cutoffs, season_length
+                )
+                forecast = np.transpose(folds, (1, 0, 2))
+
+            else:
+                forecast = np.zeros_like(self.actuals)
+                model_name = None
+
+                for fold, cutoff in enumerate(self.cutoffs):
+                    if progress_callback:
+                        progress_callback(
+                            0.1 + 0.8 * fold / len(self.cutoffs),
+                            f"Backtest fold {fold + 1}/{len(self.cutoffs)}..."
+                        )
+
+                    result, model_name, message = self.forecaster.run_forecast(
+                        self._long_frame(cutoff), self.horizon, freq, model, use_timegpt,
+                        include_holidays, input_size=input_size, intermittent_model=intermittent_model
+                    )
+                    if result is None:
+                        return False, message
+
+                    forecast[:, fold] = long_to_matrix(result, self.unique_ids, self.horizon)
+
+                if model_name is None:
+                    model_name = GLOBAL_MODELS.get(model, model)
+
+            # Score what the app would actually publish: rounded, non-negative quantities
+            self.forecasts[model] = np.clip(np.round(forecast), 0, None)
+            self.model_names[model] = model_name
+
+            if progress_callback:
+                progress_callback(1.0, f"{model_name} backtest completed!")
+
+            return True, "Success"
+
+        except Exception as e:
+            return False, f"Backtest error: {str(e)}"
+
+    def series_metrics(self, model):
+        """Metrics of every evaluated series for one model, pooled over all folds"""
+        n_series = len(self.unique_ids)
+        metrics = error_metrics(
+            self.actuals.reshape(n_series, -1),
+            self.forecasts[model].reshape(n_series, -1)
+        )
+
+        result = self.keys.copy()
+        result.insert(0, 'unique_id', self.unique_ids)
+        result['model'] = self.model_names[model]
+        for name, values in metrics.items():
+            result[name] = values
+
+        return result
+
+    def fold_errors(self, model):
+        """MAE of one model on every (series, fold), (n_series x n_folds)"""
+        return np.abs(self.forecasts[model] - self.actuals).mean(axis=2)
+
+    def _coarser_levels(self):
+        """Levels whose series are sums of the evaluated series, plus the grand total"""
+        if self.level_cols is None:
+            return {self.level or 'Series': None, 'Total': []}
+
+        levels = {
+            level: cols for level, cols in DataProcessor.AGGREGATION_LEVELS.items()
+            if set(cols) <= set(self.level_cols)
+        }
+        levels['Total'] = []
+        return levels
+
+    def level_metrics(self, model):
+        """Metrics of one model at every level reachable from the evaluated series
+
+        Actuals and forecasts are summed up to each level; the error cells of all
+        series in a level are pooled into one row.
+        """
+        n_series = len(self.unique_ids)
+        actual = self.actuals.reshape(n_series, -1)
+        forecast = self.forecasts[model].reshape(n_series, -1)
+
+        rows = []
+        for level, cols in self._coarser_levels().items():
+            if cols is None:
+                level_actual, level_forecast = actual, forecast
+            else:
+                codes = (self.keys.groupby(cols, sort=False, dropna=False).ngroup().to_numpy()
+                         if cols else np.zeros(n_series, dtype=int))
+                indicator = sparse.csr_matrix(
+                    (np.ones(n_series), (codes, np.arange(n_series))),
+                    shape=(codes.max() + 1, n_series)
+                )
+                level_actual = indicator @ actual
+                level_forecast = indicator @ forecast
+
+            pooled = error_metrics(level_actual.reshape(1, -1), level_forecast.reshape(1, -1))
+
+            row = {'model': self.model_names[model], 'level': level, 'series': len(level_actual)}
+            row.update({name: values[0] for name, values in pooled.items()})
+            rows.append(row)
+
+        return pd.DataFrame(rows)
+
+    def summary(self):
+        """Compact table of every backtested model at every level"""
+        if not self.forecasts:
+            return pd.DataFrame(columns=['model', 'level', 'series'] + list(METRICS))
+
+        return pd.concat([self.level_metrics(model) for model in self.forecasts], ignore_index=True)
+
+
+class ModelTournament:
+    """Picks the best model per series (or per demand class) on a holdout window
+
+    Every local model is scored on the last `horizon` periods of every series.
+    TimeGPT can join on a random sample of series; it only wins where it beats the
+    best local model on that sample by API_WIN_MARGIN. Per demand class, it takes
+    a whole class only if at least MIN_CLASS_SAMPLE_SHARE of the class was sampled,
+    otherwise just the sampled series it wins. Series are then forecast in one
+    batch per winning model.
+    """
+
+    SELECTION_MODES = {
+        'series': 'Per series',
+        'demand_class': 'Per demand class'
+    }
+
+    TIMEGPT_MODEL = 'timegpt-1-long-horizon'
+
+    # Relative error reduction TimeGPT needs over the best local model to be used
+    API_WIN_MARGIN = 0.05
+
+    # Share of a demand class that must be in the TimeGPT sample for the class to
+    # switch to TimeGPT as a whole (per demand class selection)
+    MIN_CLASS_SAMPLE_SHARE = 0.2
+
+    def __init__(self, forecaster, candidates=None, selection='series', n_folds=1,
+                 timegpt_sample=0, random_state=0):
+        self.forecaster = forecaster
+        self.candidates = list(candidates or LOCAL_MODELS)
+        self.selection = selection
+        self.n_folds = n_folds
+        self.timegpt_sample = int(timegpt_sample or 0)
+        self.random_state = random_state
+
+        self.scores = None
+        self.winners = None
+        self.timegpt_message = None
+
+    def select(self, unique_ids, dates, Y, horizon, freq='D', include_holidays=True,
+               input_size=None, progress_callback=None):
+        """Winning model key of every series, as a Series indexed by unique_id
+
+        If TimeGPT was to compete but could not be scored, timegpt_message says why.
+        """
+        n_series, n_periods = Y.shape
+        self.timegpt_message = None
+
+        # Short histories: keep enough data before the holdout to fit on
+        holdout = max(1, min(horizon, n_periods // 4))
+        backtester = Backtester(self.forecaster, n_folds=self.n_folds, horizon=holdout)
+        backtester.set_panel(unique_ids, dates, Y)
+
+        classes, _, _ = classify_demand(Y)
+        self.winners = pd.Series(self.candidates[0], index=unique_ids, name='model')
+        if len(backtester.cutoffs) == 0:
+            return self.winners
+
+        # Total absolute holdout error of every (series, candidate)
+        actual = backtester.actuals.reshape(n_series, -1)
+        scores = np.full((n_series, len(self.candidates)), np.inf)
+        for idx, model in enumerate(self.candidates):
+            if progress_callback:
+                progress_callback(0.1 + 0.3 * idx / len(self.candidates), f"Tournament: scoring {LOCAL_MODELS[model][0]}...")
+
+            success, _ = backtester.run(model, freq)
+            if success:
+                scores[:, idx] = np.abs(backtester.forecasts[model].reshape(n_series, -1) - actual).sum(axis=1)
+
+        self.scores = pd.DataFrame(scores, index=unique_ids, columns=self.candidates)
+
+        if self.selection == 'demand_class':
+            winners = np.empty(n_series, dtype=object)
+            for demand_class in np.unique(classes):
+                in_class = classes == demand_class
+                winners[in_class] = self.candidates[int(np.argmin(scores[in_class].sum(axis=0)))]
+        else:
+            winners = np.array(self.candidates, dtype=object)[np.argmin(scores, axis=1)]
+
+        # TimeGPT on a sample of series: only where it demonstrably wins
+        if self.timegpt_sample > 0 and self.forecaster.nixtla_client:
+            if progress_callback:
+                progress_callback(0.45, f"Tournament: scoring TimeGPT on {min(self.timegpt_sample, n_series)} series...")
+
+            rng = np.random.default_rng(self.random_state)
+            sample = np.sort(rng.choice(n_series, size=min(self.timegpt_sample, n_series), replace=False))
+
+            sample_backtester = Backtester(self.forecaster, n_folds=self.n_folds, horizon=holdout)
+            sample_backtester.set_panel(unique_ids[sample], dates, Y[sample])
+            success, message = sample_backtester.run(
+                self.TIMEGPT_MODEL, freq, use_timegpt=True,
+                include_holidays=include_holidays, input_size=input_size
+            )
+
+            # A quota fallback comes back as MA-6, which must not count as a TimeGPT win
+            if not success:
+                self.timegpt_message = f"TimeGPT left out of the tournament: {message}"
+            elif sample_backtester.model_names[self.TIMEGPT_MODEL] != "TimeGPT":
+                self.timegpt_message = "TimeGPT left out of the tournament: API limit reached"
+            else:
+                api_error = np.abs(
+                    sample_backtester.forecasts[self.TIMEGPT_MODEL].reshape(len(sample), -1)
+                    - actual[sample]
+                ).sum(axis=1)
+                local_error = scores[sample, [self.candidates.index(model) for model in winners[sample]]]
+
+                api_wins = api_error < (1 - self.API_WIN_MARGIN) * local_error
+                promoted = np.zeros(len(sample), dtype=bool)
+
+                if self.selection == 'demand_class':
+                    # A class goes to TimeGPT only when enough of it was sampled to judge
+                    for demand_class in np.unique(classes[sample]):
+                        in_class = classes[sample] == demand_class
+                        if in_class.sum() < self.MIN_CLASS_SAMPLE_SHARE * (classes == demand_class).sum():
+                            continue
+                        if api_error[in_class].sum() < (1 - self.API_WIN_MARGIN) * local_error[in_class].sum():
+                            winners[classes == demand_class] = self.TIMEGPT_MODEL
+                        promoted |= in_class
+
+                # Elsewhere TimeGPT only takes the sampled series it wins
+                winners[sample[api_wins & ~promoted]] = self.TIMEGPT_MODEL
+
+        self.winners = pd.Series(winners, index=unique_ids, name='model')
+        return self.winners
+
+    def run(self, df, horizon, freq='D', include_holidays=True, input_size=None, progress_callback=None,
+            levels=None):
+        """Select the winners and forecast every series with its own
+
+        Returns (result, model_used, message) like FleetForecaster.run_forecast; the
+        message is not "Success" when TimeGPT was to compete but was not used.
+        """
+        try:
+            unique_ids, dates, Y = self.forecaster.to_panel(df)
+            winners = self.select(
+                unique_ids, dates, Y, horizon, freq, include_holidays, input_size, progress_callback
+            ).to_numpy()
+
+            future_dates = self.forecaster._future_dates(dates.max(), horizon, freq)
+            season_length = self.forecaster.SEASON_LENGTHS[self.forecaster._freq_key(freq)]
+
+            results = []
+            counts = {}
+            messages = [self.timegpt_message] if self.timegpt_message else []
+            models = pd.unique(winners)
+            for idx, model in enumerate(models):
+                rows = np.flatnonzero(winners == model)
+
+                if progress_callback:
+                    progress_callback(0.5 + 0.4 * idx / len(models), f"Forecasting {len(rows)} series with {model}...")
+
+                if model == self.TIMEGPT_MODEL:
+                    result, model_name, message = self.forecaster.run_forecast(
+                        df[df['unique_id'].isin(unique_ids[rows])], horizon, freq, model,
+                        use_timegpt=True, include_holidays=include_holidays, input_size=input_size,
+                        levels=levels
+                    )
+                    if result is None:
+                        return None, model_name, message
+                    if model_name != "TimeGPT":
+                        messages.append(f"TimeGPT replaced by {model_name} on {len(rows)} series: API limit reached")
+                    result = result[['unique_id', 'ds'] + [col for col in result.columns if col.startswith('forecast')]]
+                else:
+                    model_name, model_func = LOCAL_MODELS[model]
+                    forecast = self.forecaster.backend.map_panel(model_func, Y[rows], horizon, season_length)
+                    result = self.forecaster.from_panel(unique_ids[rows], future_dates, forecast)
+
+                    if levels:
+                        half_widths = self.forecaster.panel_intervals(
+                            Y[rows], horizon, model_func, season_length, levels
+                        )
+                        result = self.forecaster.attach_intervals(result, unique_ids[rows], half_widths)
+
+                results.append(result)
+                counts[model_name] = counts.get(model_name, 0) + len(rows)
+
+            if progress_callback:
+                progress_callback(1.0, "Auto forecast completed!")
+
+            ranking = sorted(counts.items(), key=lambda item: -item[1])
+            model_used = "Auto (" + ", ".join(f"{name}: {count}" for name, count in ranking) + ")"
+
+            return pd.concat(results, ignore_index=True), model_used, "; ".join(messages) or "Success"
+
+        except Exception as e:
+            return None, "Failed", f"Auto selection error: {str(e)}"
+
+
+class ModelEnsemble:
+    """Blends local models (and optionally TimeGPT) with backtest-learned weights
+
+    Every member is backtested over `n_folds` rolling holdout windows (see
+    Backtester); its weight is the inverse squared MAE averaged over the folds,
+    per series or pooled per demand class. Members are fitted concurrently: each
+    one is a thread submitting its folds to the forecaster's process pool, and
+    the TimeGPT backtest and final request are two more threads.
+    """
+
+    WEIGHTING_MODES = {
+        'demand_class': 'Per demand class',
+        'series': 'Per series'
+    }
+
+    MEMBERS = ['seasonal_naive', 'theta', 'ets_weekly', 'sba']
+
+    TIMEGPT_MODEL = ModelTournament.TIMEGPT_MODEL
+
+    def __init__(self, forecaster, members=None, weighting='demand_class', n_folds=3):
+        self.forecaster = forecaster
+        self.members = list(members or self.MEMBERS)
+        self.weighting = weighting
+        self.n_folds = n_folds
+
+        self.backtester = None
+        self.weights = None
+        self.timings = {}
+
+    def _inverse_error_weights(self, errors, classes):
+        """Normalised inverse squared-error weights, (n_series x n_members)
+
+        `errors` are the members' MAE per series, averaged over the backtest folds.
+        Squaring them lets the stronger members dominate instead of the blend
+        drifting towards an equal-weight average.
+        """
+        if self.weighting == 'demand_class':
+            pooled = np.empty_like(errors)
+            for demand_class in np.unique(classes):
+                in_class = classes == demand_class
+                pooled[in_class] = errors[in_class].mean(axis=0)
+            errors = pooled
+
+        # A small floor keeps a perfect member from taking an infinite weight
+        floor = max(1e-6, 1e-3 * np.nanmean(errors))
+        inverse = 1 / np.maximum(errors, floor) ** 2
+        return inverse / inverse.sum(axis=1, keepdims=True)
+
+    def _fit_member(self, model, Y, horizon, freq, season_length, levels):
+        """Backtest one local member, then forecast with it: (model_name, forecast, bounds)"""
+        model_name, model_func = LOCAL_MODELS[model]
+
+        if len(self.backtester.cutoffs):
+            success, message = self.backtester.run(model, freq)
+            if not success:
+                raise RuntimeError(f"{model_name}: {message}")
+
+        forecast = self.forecaster.backend.map_panel(model_func, Y, horizon, season_length)
+
+        bounds = {}
+        if levels:
+            half_widths = self.forecaster.panel_intervals(Y, horizon, model_func, season_length, levels) or {}
+            for level, widths in half_widths.items():
+                bounds[f'forecast_lo_{level}'] = forecast - widths
+                bounds[f'forecast_hi_{level}'] = forecast + widths
+        return model_name, forecast, bounds
+
+    def _final_timegpt(self, df, horizon, freq, include_holidays, input_size, levels):
+        """The final TimeGPT request: (run_forecast's result, payload of this request)
+
+        The backtest folds run concurrently on the same forecaster, so the payload is
+        taken from this thread rather than from forecaster.last_payload.
+        """
+        self.forecaster.thread_payload(reset=True)
+        result = self.forecaster.run_forecast(
+            df, horizon, freq, self.TIMEGPT_MODEL, use_timegpt=True,
+            include_holidays=include_holidays, input_size=input_size, levels=levels
+        )
+        return result, self.forecaster.thread_payload()
+
+    def run(self, df, horizon, freq='D', use_timegpt=False, include_holidays=True,
+            input_size=None, progress_callback=None, levels=None):
+        """Forecast with every member and blend them
+
+        Returns (result, model_used, message) like FleetForecaster.run_forecast.
+        """
+        forecaster = self.forecaster
+        started = time.perf_counter()
+
+        try:
+            unique_ids, dates, Y = forecaster.to_panel(df)
+            n_series, n_periods = Y.shape
+            holdout = max(1, min(horizon, n_periods // 4))
+            season_length = forecaster.SEASON_LENGTHS[forecaster._freq_key(freq)]
+            future_dates = forecaster._future_dates(dates.max(), horizon, freq)
+
+            self.backtester = Backtester(forecaster, n_folds=self.n_folds, horizon=holdout)
+            self.backtester.set_panel(unique_ids, dates, Y)
+            n_folds = len(self.backtester.cutoffs)
+
+            use_api = bool(use_timegpt and forecaster.nixtla_client)
+            if use_api and input_size is None:
+                input_size = forecaster.get_input_size(self.TIMEGPT_MODEL, horizon, freq)
+
+            with ThreadPoolExecutor(max_workers=len(self.members) + 2) as pool:
+                local_started = time.perf_counter()
+
+                # TimeGPT: backtest folds and final request in flight with the local members
+                if use_api:
+                    backtest_future = pool.submit(
+                        self.backtester.run, self.TIMEGPT_MODEL, freq, use_timegpt=True,
+                        include_holidays=include_holidays, input_size=input_size
+                    ) if n_folds else None
+                    final_future = pool.submit(
+                        self._final_timegpt, df, horizon, freq, include_holidays, input_size, levels
+                    )
+
+                member_futures = [
+                    pool.submit(self._fit_member, model, Y, horizon, freq, season_length, levels)
+                    for model in self.members
+                ]
+
+                keys, names, forecasts, bounds = [], [], [], []
+                for idx, (model, future) in enumerate(zip(self.members, member_futures)):
+                    model_name, forecast, member_bounds = future.result()
+                    if progress_callback:
+                        progress_callback(0.2 + 0.5 * (idx + 1) / len(self.members), f"Ensemble: fitted {model_name}")
+
+                    keys.append(model)
+                    names.append(model_name)
+                    forecasts.append(forecast)
+                    bounds.append(member_bounds)
+                self.timings['local'] = time.perf_counter() - local_started
+
+                message = "Success"
+                if use_api:
+                    if progress_callback:
+                        progress_callback(0.75, "Ensemble: waiting for TimeGPT...")
+
+                    backtest_success, backtest_message = backtest_future.result() if backtest_future else (True, "Success")
+                    (final_result, final_name, final_message), forecaster.last_payload = final_future.result()
+                    self.timings['timegpt'] = time.perf_counter() - local_started
+
+                    # A quota fallback comes back as MA-6, which must not join as TimeGPT
+                    if not backtest_success:
+                        message = f"TimeGPT left out of the ensemble: {backtest_message}"
+                    elif final_result is None:
+                        message = f"TimeGPT left out of the ensemble: {final_message}"
+                    elif final_name != "TimeGPT" or (n_folds and self.backtester.model_names[self.TIMEGPT_MODEL] != "TimeGPT"):
+                        message = "TimeGPT left out of the ensemble: API limit reached"
+                    else:
+                        keys.append(self.TIMEGPT_MODEL)
+                        names.append("TimeGPT")
+                        forecasts.append(long_to_matrix(final_result, unique_ids, horizon))
+                        bounds.append({
+                            col: long_to_matrix(final_result, unique_ids, horizon, col)
+                            for col in final_result.columns if col.startswith(('forecast_lo_', 'forecast_hi_'))
+                        })
+
+            if progress_callback:
+                progress_callback(0.9, "Ensemble: blending members...")
+
+            if n_folds:
+                # MAE of every member per series, averaged over the backtest folds
+                errors = np.stack([self.backtester.fold_errors(key).mean(axis=1) for key in keys], axis=1)
+                classes, _, _ = classify_demand(Y[:, :self.backtester.cutoffs[0]])
+                weights = self._inverse_error_weights(errors, classes)
+            else:
+                # Too little history for a single fold: equal weights
+                weights = np.full((n_series, len(keys)), 1 / len(keys))
+            self.weights = pd.DataFrame(weights, index=unique_ids, columns=names)
+
+            blended = np.einsum('sm,msh->sh', weights, np.stack(forecasts))
+            result = forecaster.from_panel(unique_ids, future_dates, blended)
+
+            # Bounds: the same weighted average of the members' bounds
+            forecast = result['forecast'].to_numpy()
+            for col in bounds[0]:
+                if not all(col in member_bounds for member_bounds in bounds):
+                    continue
+                bound = np.einsum('sm,msh->sh', weights, np.stack([member_bounds[col] for member_bounds in bounds]))
+                bound = np.round(bound.ravel())
+                if col.startswith('forecast_lo_'):
+                    result[col] = np.clip(bound, 0, forecast).astype(int)
+                else:
+                    result[col] = np.maximum(bound, forecast).astype(int)
+
+            self.timings['total'] = time.perf_counter() - started
+
+            if progress_callback:
+                progress_callback(1.0, "Ensemble forecast completed!")
+
+            mean_weights = self.weights.mean().sort_values(ascending=False)
+            model_used = "Ensemble (" + ", ".join(f"{name}: {weight:.0%}" for name, weight in mean_weights.items()) + ")"
+
+            return result, model_used, message
+
+        except Exception as e:
+            return None, "Failed", f"Ensemble error: {str(e)}"
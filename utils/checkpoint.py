@@ -0,0 +1,148 @@
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+import pandas as pd
+
+
+# Saved runs live here, one directory per run configuration and input data
+RUNS_DIR = 'forecast_runs'
+
+# Series per checkpointed batch; with TimeGPT every batch is one API call
+DEFAULT_BATCH_SIZE = 500
+
+
+def data_fingerprint(df):
+    """Hash of a frame's column names and values (the index is ignored)"""
+    digest = hashlib.sha256(json.dumps([str(col) for col in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def config_fingerprint(config):
+    """Hash of a JSON-like configuration, independent of key order"""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _atomic_write(path, write):
+    """Write through a temporary file so a crash never leaves a half-written file behind"""
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class RunCheckpoint:
+    """Saves the forecast of every batch of series as soon as it finishes
+
+    A run is identified by its configuration and a fingerprint of the input data, so
+    rerunning the same configuration on the same data reopens the same directory.
+    Batches are keyed by their own input rows and forecast options, and a saved batch
+    is only ever reused for exactly the request that produced it. The manifest lists
+    the saved batches and whether the run finished.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, config, data_hash, batch_size=DEFAULT_BATCH_SIZE, root=RUNS_DIR):
+        self.config = config
+        self.batch_size = max(1, int(batch_size))
+        self.run_id = config_fingerprint({'config': config, 'data': data_hash})[:16]
+        self.path = os.path.join(root, self.run_id)
+        self.error = None
+        self.manifest = self._read_manifest() or {
+            'run_id': self.run_id,
+            'config': config,
+            'data_hash': data_hash,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'status': 'new',
+            'batches': {}
+        }
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.path, self.MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self):
+        self.manifest['updated'] = datetime.now().isoformat(timespec='seconds')
+
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(self.manifest, f, indent=2, default=str)
+
+        _atomic_write(os.path.join(self.path, self.MANIFEST), write)
+
+    @property
+    def n_batches(self):
+        """Number of saved batches"""
+        return len(self.manifest['batches'])
+
+    @property
+    def status(self):
+        return self.manifest['status']
+
+    def batch_key(self, df, options):
+        """Key of a batch: its input rows plus every option that affects its forecast"""
+        return config_fingerprint({'options': options, 'data': data_fingerprint(df)})[:24]
+
+    def load_batch(self, key):
+        """Saved (result, model_used, message) of a batch, or None if it has to be run"""
+        entry = self.manifest['batches'].get(key)
+        if entry is None:
+            return None
+
+        try:
+            result = pd.read_pickle(os.path.join(self.path, entry['file']))
+        except Exception:
+            # Missing or unreadable file: forget the batch and run it again
+            del self.manifest['batches'][key]
+            return None
+
+        return result, entry['model_used'], entry['message']
+
+    def save_batch(self, key, result, model_used, message, n_series):
+        """Write a finished batch, then record it in the manifest
+
+        A failed write (read-only disk, ...) never fails the forecast: it is kept in
+        `error` and the run simply continues without that checkpoint.
+        """
+        file_name = f"batch_{key}.pkl"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            _atomic_write(os.path.join(self.path, file_name), result.to_pickle)
+
+            self.manifest['batches'][key] = {
+                'file': file_name,
+                'n_series': int(n_series),
+                'rows': len(result),
+                'model_used': model_used,
+                'message': message,
+                'saved': datetime.now().isoformat(timespec='seconds')
+            }
+            self.manifest['status'] = 'running'
+            self._write_manifest()
+            return True
+        except OSError as e:
+            self.error = str(e)
+            return False
+
+    def mark_complete(self):
+        """Record that the whole run finished; its batches are kept for identical reruns"""
+        if not self.manifest['batches']:
+            return
+
+        self.manifest['status'] = 'complete'
+        try:
+            self._write_manifest()
+        except OSError as e:
+            self.error = str(e)
+
+    def clear(self):
+        """Delete this run's saved batches"""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.manifest['batches'] = {}
+        self.manifest['status'] = 'new'
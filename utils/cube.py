@@ -0,0 +1,103 @@
+import uuid
+
+from utils.forecaster import sum_with_intervals
+
+
+class ResultsCube:
+    """Totals of one forecast frame, computed once when the forecast finishes
+
+    Holds the grand total (with interval bounds), totals by date, by every dimension
+    and by date x dimension, so the results page, its charts and the exports never
+    group the full forecast frame again. Routes are origin x destination pairs.
+    """
+
+    DIMENSIONS = ['fleet_type', 'region', 'company', 'route']
+
+    def __init__(self, forecast_df, history_by_date=None):
+        # Identity of the view in caches shared across sessions (e.g. FIGURE_CACHE)
+        self.key = uuid.uuid4().hex
+        self.n_rows = len(forecast_df)
+        self.total = float(forecast_df['forecast_qty'].sum())
+        self.mean = float(forecast_df['forecast_qty'].mean()) if self.n_rows else 0.0
+        self.n_series = forecast_df['unique_id'].nunique() if 'unique_id' in forecast_df.columns else 1
+        self.interval_cols = [col for col in forecast_df.columns if col.startswith('forecast_qty_lo_')]
+
+        self.total_interval = None
+        if self.interval_cols:
+            self.total_interval = sum_with_intervals(forecast_df.assign(_total='Total'), '_total').iloc[0]
+
+        # Totals by date in chronological order, with interval bounds
+        self.by_date = sum_with_intervals(forecast_df, 'date').sort_values('date').reset_index(drop=True)
+        self.dates = self.by_date['date']
+        self.n_periods = len(self.by_date)
+
+        # Daily history totals for the historical vs forecast chart
+        self.history_by_date = history_by_date
+
+        # SearchIndex and TablePages of the frame, built when the data table first needs them
+        self.search_index = None
+        self.table_pages = None
+
+        # SeriesIndex of the frame and its history, built when the drill-down first needs it
+        self.series_index = None
+
+        # Export files of the frame by format, built when the results page first shows them
+        self.exports = {}
+
+        self.cardinality = {}
+        self.by_dimension = {}
+        self.by_date_dimension = {}
+        for dimension in self.DIMENSIONS:
+            keys = ['origin', 'destination'] if dimension == 'route' else [dimension]
+            if not set(keys) <= set(forecast_df.columns):
+                continue
+
+            by_date_dimension = forecast_df.groupby(['date'] + keys, sort=False)['forecast_qty'].sum().reset_index()
+            totals = by_date_dimension.groupby(keys)['forecast_qty'].sum().reset_index()
+            if dimension == 'route':
+                for frame in (by_date_dimension, totals):
+                    frame['route'] = frame['origin'] + ' → ' + frame['destination']
+
+            self.by_date_dimension[dimension] = by_date_dimension
+            self.by_dimension[dimension] = totals.sort_values('forecast_qty', ascending=False).reset_index(drop=True)
+            self.cardinality[dimension] = len(totals)
+            if dimension == 'route':
+                self.cardinality['origin'] = totals['origin'].nunique()
+                self.cardinality['destination'] = totals['destination'].nunique()
+
+    @property
+    def start_date(self):
+        return self.dates.iloc[0] if self.n_periods else None
+
+    @property
+    def end_date(self):
+        return self.dates.iloc[-1] if self.n_periods else None
+
+    def has(self, dimension):
+        """Whether the forecast has `dimension` with more than one value"""
+        return self.cardinality.get(dimension, 0) > 1
+
+    def pivot(self, dimension):
+        """Date x dimension totals as a wide frame, dates in chronological order"""
+        pivot = self.by_date_dimension[dimension].pivot_table(
+            index='date',
+            columns=dimension,
+            values='forecast_qty',
+            aggfunc='sum',
+            fill_value=0
+        )
+        return pivot.reindex(self.by_date['date'])
+
+
+def history_totals(historical_df):
+    """Total historical qty per date"""
+    return historical_df.groupby('date')['qty'].sum().reset_index()
+
+
+def build_cubes(forecast_views, historical_df=None):
+    """ResultsCube of every timeframe and level of a run's forecast views"""
+    history_by_date = history_totals(historical_df) if historical_df is not None else None
+    return {
+        timeframe: {level: ResultsCube(frame, history_by_date) for level, frame in levels.items()}
+        for timeframe, levels in forecast_views.items()
+    }
@@ -6,6 +6,22 @@ import holidays
 class DataProcessor:
     """Handles all data preprocessing and validation"""
     
+    # Aggregation levels and the columns that define a series at each level
+    AGGREGATION_LEVELS = {
+        'Most Granular': ['company', 'origin', 'destination', 'fleet_type'],
+        'By Company': ['company'],
+        'By Route': ['origin', 'destination'],
+        'By Fleet Type': ['fleet_type'],
+        'By Region': ['region'],
+        'By Province': ['province'],
+        'By Company & Route': ['company', 'origin', 'destination'],
+        'By Company & Fleet Type': ['company', 'fleet_type'],
+        'By Route & Fleet Type': ['origin', 'destination', 'fleet_type']
+    }
+    
+    # All dimension columns of the uploaded data
+    DIMENSION_COLS = ['company', 'origin', 'destination', 'province', 'region', 'fleet_type']
+    
     def __init__(self):
         self.indonesian_holidays = holidays.Indonesia()
     
@@ -192,18 +208,7 @@ class DataProcessor:
     def aggregate_data(self, df, aggregation_level):
         """Aggregate data based on selected level"""
         
-        # Define aggregation mappings
-        agg_mappings = {
-            'Most Granular': ['company', 'origin', 'destination', 'fleet_type'],
-            'By Company': ['company'],
-            'By Route': ['origin', 'destination'],
-            'By Fleet Type': ['fleet_type'],
-            'By Region': ['region'],
-            'By Province': ['province'],
-            'By Company & Route': ['company', 'origin', 'destination'],
-            'By Company & Fleet Type': ['company', 'fleet_type'],
-            'By Route & Fleet Type': ['origin', 'destination', 'fleet_type']
-        }
+        agg_mappings = self.AGGREGATION_LEVELS
         
         if aggregation_level not in agg_mappings:
             return df, ['company', 'origin', 'destination', 'fleet_type']
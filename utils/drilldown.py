@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from utils.forecaster import sum_with_intervals
+from utils.hierarchy import TemporalAggregator
+
+
+class SeriesIndex:
+    """Group-offsets index of a forecast view and its history, by series
+
+    Built once per view. Series are the distinct values of the view's key columns,
+    coded in sorted order. The forecast and the history (summed into the view's
+    timeframe) are sorted by series code and date, with the offset where every
+    series starts, so the rows of a series are one contiguous slice and a slice of
+    several series is the concatenation of theirs: no lookup scans the full frames.
+    """
+
+    def __init__(self, forecast_df, historical_df, key_cols, freq='D'):
+        self.key_cols = list(key_cols)
+
+        if self.key_cols:
+            groups = forecast_df.groupby(self.key_cols, sort=True)
+            codes = groups.ngroup().to_numpy()
+            keys = groups.size().index
+            self.series = keys.to_frame(index=False) if isinstance(keys, pd.MultiIndex) else pd.DataFrame({keys.name: keys})
+        else:
+            codes = np.zeros(len(forecast_df), dtype=np.int64)
+            keys = None
+            self.series = pd.DataFrame(index=range(1))
+        self.n_series = len(self.series)
+
+        value_cols = [col for col in forecast_df.columns if col.startswith('forecast_qty')]
+        self.forecast, self.forecast_offsets = self._sorted(forecast_df[['date'] + value_cols], codes)
+
+        history = historical_df[self.key_cols + ['qty']].copy()
+        history['date'] = TemporalAggregator().bucket_dates(pd.DatetimeIndex(historical_df['date']), freq)
+        history = history.groupby(self.key_cols + ['date'], sort=False)['qty'].sum().reset_index()
+        if keys is not None:
+            key_values = history[self.key_cols[0]] if len(self.key_cols) == 1 else pd.MultiIndex.from_frame(history[self.key_cols])
+            history_codes = keys.get_indexer(key_values)
+        else:
+            history_codes = np.zeros(len(history), dtype=np.int64)
+
+        # History of series that are not in the forecast is dropped
+        known = history_codes >= 0
+        self.history, self.history_offsets = self._sorted(history.loc[known, ['date', 'qty']], history_codes[known])
+
+    def _sorted(self, frame, codes):
+        """`frame` sorted by series code then date, and the start row of every series"""
+        order = np.lexsort((frame['date'].to_numpy(), codes))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=self.n_series))])
+        return frame.iloc[order].reset_index(drop=True), offsets
+
+    def match(self, filters=None):
+        """Codes of the series whose key columns equal every {column: value} of `filters`"""
+        matched = np.ones(self.n_series, dtype=bool)
+        for col, value in (filters or {}).items():
+            matched &= (self.series[col] == value).to_numpy()
+        return np.flatnonzero(matched)
+
+    def options(self, col, filters=None):
+        """Sorted values of `col` among the series matching `filters`"""
+        return sorted(self.series[col].iloc[self.match(filters)].unique())
+
+    def _rows(self, frame, offsets, codes):
+        """Rows of the series `codes`: a slice for one series, else their slices end to end"""
+        if len(codes) == 1:
+            return frame.iloc[offsets[codes[0]]:offsets[codes[0] + 1]]
+
+        starts = offsets[codes]
+        lengths = offsets[codes + 1] - starts
+        # Position i of the result is row starts[k] + (i - first position of series k)
+        firsts = np.cumsum(lengths) - lengths
+        return frame.iloc[np.repeat(starts - firsts, lengths) + np.arange(lengths.sum())]
+
+    def history_of(self, codes):
+        """Historical qty per date summed over the series `codes`"""
+        rows = self._rows(self.history, self.history_offsets, codes)
+        if len(codes) == 1:
+            return rows
+        return rows.groupby('date')['qty'].sum().reset_index()
+
+    def forecast_of(self, codes):
+        """Forecast (with interval bounds) per date summed over the series `codes`"""
+        rows = self._rows(self.forecast, self.forecast_offsets, codes)
+        if len(codes) == 1:
+            return rows
+        return sum_with_intervals(rows, 'date')
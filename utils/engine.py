@@ -0,0 +1,762 @@
+import os
+import json
+import time
+import itertools
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.data_processor import DataProcessor
+from utils.forecaster import (
+    FleetForecaster, LOCAL_MODELS, INTERMITTENT_MODELS, GLOBAL_MODELS, AUTO_MODEL, ENSEMBLE_MODEL,
+    INTERVAL_LEVELS
+)
+from utils.hierarchy import HierarchicalForecaster, TemporalAggregator
+from utils.backtest import Backtester, ModelTournament, ModelEnsemble
+from utils.checkpoint import RunCheckpoint, RUNS_DIR, DEFAULT_BATCH_SIZE, data_fingerprint
+from utils.export import ExportManager
+from utils.cube import build_cubes
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: JSON configs only
+    tomllib = None
+
+
+# Settings of a headless run. A config file overrides them in its [defaults] table
+# and again per [[runs]] entry
+RUN_DEFAULTS = {
+    'timeframe': 'Daily',
+    'aggregation_level': 'Most Granular',
+    'horizon': 30,
+    'model': 'ets_weekly',
+    'use_timegpt': False,
+    'include_holidays': True,
+    'input_size': None,
+    'intermittent_model': None,
+    'auto_selection': 'series',
+    'auto_timegpt_sample': 0,
+    'ensemble_weighting': 'demand_class',
+    'levels': INTERVAL_LEVELS,
+    'hierarchical': False,
+    'reconciliation_method': 'mint',
+    'parent_level': None,
+    'proportion_method': 'historical',
+    'proportion_window': None,
+    'multi_resolution': False,
+    'reconcile_timeframes': False,
+    'filters': {},
+    'n_jobs': 0,
+    'checkpoint': True,
+    'batch_size': DEFAULT_BATCH_SIZE,
+    'checkpoint_dir': RUNS_DIR,
+    'exports': ['detailed_excel', 'summary_excel', 'detailed_csv', 'summary_csv']
+}
+
+# Export name -> (file name prefix, extension, ExportManager method)
+EXPORT_FORMATS = {
+    'detailed_excel': ('fleet_forecast_detailed', 'xlsx', 'export_detailed_excel'),
+    'summary_excel': ('fleet_forecast_summary', 'xlsx', 'export_summary_excel'),
+    'detailed_csv': ('fleet_forecast_detailed', 'csv', 'export_detailed_csv'),
+    'summary_csv': ('fleet_forecast_summary', 'csv', 'export_summary_csv')
+}
+
+TIMEGPT_MODELS = ['timegpt-1-long-horizon', 'timegpt-1']
+
+
+class PreparedInputs:
+    """Preprocessed inputs of one dataset, each built on first use and then shared
+
+    Runs that differ only in horizon, model or options reuse the same resampled,
+    aggregated and date-filled frames, holiday features and series keys. Every
+    artifact is built once under its own lock, so threads can share an instance.
+    Consumers must not modify the frames they get.
+    """
+
+    def __init__(self, processor, df, source_freq):
+        self.processor = processor
+        self.df = df
+        self.source_freq = source_freq
+        self.build_seconds = 0.0
+        self._artifacts = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get(self, key, build):
+        with self._lock:
+            if key in self._artifacts:
+                return self._artifacts[key]
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key not in self._artifacts:
+                # Only outermost builds are timed; nested ones are part of them
+                depth = getattr(self._local, 'depth', 0)
+                self._local.depth = depth + 1
+                started = time.perf_counter()
+                try:
+                    artifact = build()
+                finally:
+                    self._local.depth = depth
+                with self._lock:
+                    self._artifacts[key] = artifact
+                    if depth == 0:
+                        self.build_seconds += time.perf_counter() - started
+
+        return self._artifacts[key]
+
+    @property
+    def fingerprint(self):
+        """Hash of the input data, for checkpoints"""
+        return self._get('fingerprint', lambda: data_fingerprint(self.df))
+
+    def resampled(self, freq_code):
+        """Dimension-level data at `freq_code`"""
+        def build():
+            if freq_code == self.source_freq:
+                return self.df.copy()
+            return self.processor.resample_data(
+                self.df,
+                target_freq=freq_code,
+                aggregation_cols=DataProcessor.DIMENSION_COLS
+            )
+
+        return self._get(('resampled', freq_code), build)
+
+    def aggregated(self, freq_code, aggregation_level):
+        """(agg_df, agg_cols) of one aggregation level"""
+        return self._get(
+            ('aggregated', freq_code, aggregation_level),
+            lambda: self.processor.aggregate_data(self.resampled(freq_code), aggregation_level)
+        )
+
+    def series(self, freq_code, aggregation_level, include_holidays):
+        """(filled_df, agg_cols, timegpt_df, keys) ready to forecast one aggregation level
+
+        `keys` holds the dimensions of every series, for merging them back onto forecasts.
+        """
+        def build():
+            agg_df, agg_cols = self.aggregated(freq_code, aggregation_level)
+            filled_df = self.processor.fill_missing_dates(agg_df.copy(), freq=freq_code, aggregation_cols=agg_cols)
+            if include_holidays:
+                filled_df = self.processor.add_holiday_features(filled_df, freq=freq_code)
+            timegpt_df = self.processor.prepare_for_timegpt(filled_df, agg_cols)
+            keys = filled_df[agg_cols + ['province', 'region']].drop_duplicates()
+            return filled_df, agg_cols, timegpt_df, keys
+
+        return self._get(('series', freq_code, aggregation_level, bool(include_holidays)), build)
+
+
+def run_pipeline(processor, forecaster, df, source_freq, freq_code, horizon, aggregation_level,
+                 forecast_options, hierarchical_mode=False, reconciliation_method=None,
+                 parent_level=None, proportion_method='historical', proportion_window=None,
+                 progress_callback=None, inputs=None):
+    """Resample, aggregate, forecast and merge metadata
+
+    Preprocessing goes through `inputs` (PreparedInputs) when several runs share it.
+    Returns (levels, model_used, message) where levels maps each aggregation level
+    to its forecast frame (only the selected level unless hierarchical_mode is on).
+    """
+
+    def report(progress, message):
+        if progress_callback:
+            progress_callback(progress, message)
+
+    if inputs is None:
+        inputs = PreparedInputs(processor, df, source_freq)
+
+    if hierarchical_mode:
+        report(0.05, "Building hierarchy...")
+        hierarchy = HierarchicalForecaster(forecaster).build(inputs.resampled(freq_code), freq=freq_code)
+
+        return hierarchy.forecast(
+            horizon=horizon,
+            freq=freq_code,
+            method=reconciliation_method,
+            progress_callback=progress_callback,
+            **forecast_options
+        )
+
+    # Series of the level sent to the model: aggregated, date-filled, holiday features
+    report(0.05, "Aggregating data and filling missing dates...")
+    forecast_level = parent_level or aggregation_level
+    _, agg_cols, timegpt_df, keys = inputs.series(
+        freq_code, forecast_level, forecast_options.get('include_holidays')
+    )
+
+    forecast_result, model_used, message = forecaster.run_forecast(
+        df=timegpt_df,
+        horizon=horizon,
+        freq=freq_code,
+        progress_callback=progress_callback,
+        **forecast_options
+    )
+    if forecast_result is None:
+        return None, model_used, message
+
+    # Allocate parent forecasts down to the selected level
+    if parent_level:
+        report(0.95, f"Allocating forecasts to {aggregation_level}...")
+        parent_cols = agg_cols
+        child_df, agg_cols = inputs.aggregated(freq_code, aggregation_level)
+        keys = child_df
+        forecast_result = forecaster.disaggregate_forecast(
+            forecast_result,
+            child_df,
+            parent_cols,
+            agg_cols,
+            proportions=proportion_method,
+            window=proportion_window
+        )
+        model_used = f"{model_used} (top-down from {parent_level})"
+
+    # Merge with metadata
+    final_forecast = forecaster.merge_forecast_with_metadata(
+        forecast_result,
+        keys,
+        agg_cols
+    )
+
+    return {aggregation_level: final_forecast}, model_used, message
+
+
+def run_backtest(processor, forecaster, df, source_freq, freq_code, horizon, aggregation_level,
+                 models, n_folds=5, include_holidays=True, input_size=None,
+                 intermittent_model=None, progress_callback=None):
+    """Rolling-origin backtest of several models at one aggregation level
+
+    Returns (backtester, message); backtester is None if no model could be evaluated.
+    """
+    if freq_code != source_freq:
+        df = processor.resample_data(
+            df,
+            target_freq=freq_code,
+            aggregation_cols=DataProcessor.DIMENSION_COLS
+        )
+
+    # The forecaster's worker processes are shut down once the models are evaluated
+    with forecaster:
+        backtester = Backtester(forecaster, n_folds=n_folds, horizon=horizon).build(df, aggregation_level, freq=freq_code)
+
+        errors = []
+        for idx, model in enumerate(models):
+            def report(progress, message):
+                if progress_callback:
+                    progress_callback((idx + progress) / len(models), message)
+
+            use_timegpt = model.startswith('timegpt')
+            success, message = backtester.run(
+                model,
+                freq=freq_code,
+                use_timegpt=use_timegpt,
+                include_holidays=include_holidays,
+                input_size=input_size if use_timegpt else None,
+                intermittent_model=intermittent_model if model not in INTERMITTENT_MODELS else None,
+                progress_callback=report
+            )
+            if not success:
+                errors.append(f"{model}: {message}")
+
+    if not backtester.forecasts:
+        return None, "; ".join(errors) or "No models to backtest"
+
+    return backtester, ("; ".join(errors) if errors else "Success")
+
+
+def run_full_forecast(processor, forecaster, df, freq_code, freq_name, horizon, pipeline_options,
+                      multi_resolution=False, reconcile_timeframes=False, checkpoint=None,
+                      progress_callback=None, inputs=None):
+    """Complete forecast run: pipeline, temporal views, metadata
+
+    Never calls Streamlit, so it runs in background jobs and from the command line.
+    Every view gets its ResultsCube of totals for the results page and exports.
+    Returns the session state entries plus captions and warnings to show; raises
+    RuntimeError if the forecast fails.
+    """
+    aggregation_level = pipeline_options['aggregation_level']
+    forecast_options = pipeline_options['forecast_options']
+    warnings = []
+
+    def update_progress(progress, message):
+        if progress_callback:
+            progress_callback(progress, message)
+
+    if inputs is None:
+        inputs = PreparedInputs(processor, df, pipeline_options['source_freq'])
+
+    # The forecaster's worker processes are shut down once the models are fitted
+    with forecaster:
+        forecast_levels, model_used, message = run_pipeline(
+            processor, forecaster, df,
+            freq_code=freq_code,
+            horizon=horizon,
+            progress_callback=update_progress,
+            inputs=inputs,
+            **pipeline_options
+        )
+        if not forecast_levels:
+            raise RuntimeError(message)
+
+        # Views by timeframe, then by aggregation level
+        forecast_views = {freq_name: forecast_levels}
+
+        if multi_resolution:
+            aggregator = TemporalAggregator()
+            coarse_timeframes = {name: code for name, code in aggregator.TIMEFRAMES.items() if code != 'D'}
+
+            if reconcile_timeframes:
+                # Coarse forecasts covering the daily horizon
+                daily_dates = forecast_levels[aggregation_level]['date']
+                coarse_levels = {}
+                for name, code in coarse_timeframes.items():
+                    update_progress(0.95, f"Running {name.lower()} forecast for reconciliation...")
+                    n_buckets = aggregator.bucket_dates(pd.DatetimeIndex(daily_dates.unique()), code).nunique()
+                    levels, _, coarse_message = run_pipeline(
+                        processor, forecaster, df,
+                        freq_code=code,
+                        horizon=n_buckets,
+                        inputs=inputs,
+                        **pipeline_options
+                    )
+                    if levels:
+                        coarse_levels[code] = levels
+                    else:
+                        warnings.append(f"{name} forecast failed, skipping reconciliation with it: {coarse_message}")
+
+                if coarse_levels:
+                    forecast_levels = {
+                        level: aggregator.reconcile(
+                            frame, {code: levels[level] for code, levels in coarse_levels.items()}
+                        )
+                        for level, frame in forecast_levels.items()
+                    }
+                    forecast_views[freq_name] = forecast_levels
+                    model_used = f"{model_used} (temporally reconciled)"
+
+            for name, code in coarse_timeframes.items():
+                forecast_views[name] = {
+                    level: aggregator.aggregate(frame, code) for level, frame in forecast_levels.items()
+                }
+
+    final_forecast = forecast_levels[aggregation_level]
+    metadata = {
+        'model_used': model_used,
+        'aggregation_level': aggregation_level,
+        'aggregation_cols': DataProcessor.AGGREGATION_LEVELS[aggregation_level],
+        'horizon': horizon,
+        'freq': freq_name,
+        'freq_code': freq_code,
+        'include_holidays': forecast_options['include_holidays'],
+        'n_series': sum(frame['unique_id'].nunique() for frame in forecast_levels.values()),
+        'reconciliation': pipeline_options['reconciliation_method'],
+        'levels': forecast_options['levels'] or [],
+        'payload': forecaster.last_payload,
+        'demand_classes': (
+            forecaster.demand_classes.value_counts().to_dict()
+            if forecast_options['intermittent_model'] and forecaster.demand_classes is not None else None
+        )
+    }
+
+    # Notes shown with the result
+    captions = []
+    if checkpoint is not None:
+        checkpoint.mark_complete()
+        if checkpoint.error:
+            warnings.append(f"Progress could not be saved: {checkpoint.error}")
+        else:
+            captions.append(f"💾 {checkpoint.n_batches} batches saved in `{checkpoint.path}`")
+
+    if metadata['demand_classes']:
+        captions.append("🧩 Demand classes: " + ", ".join(
+            f"{name}: {count:,}" for name, count in sorted(metadata['demand_classes'].items())
+        ))
+
+    if forecaster.last_payload and model_used.startswith("TimeGPT"):
+        payload = forecaster.last_payload
+        captions.append(
+            f"📦 Uploaded {payload['rows_sent']:,} of {payload['rows_full']:,} rows "
+            f"(~{forecaster._format_bytes(payload['bytes_sent'])} instead of "
+            f"~{forecaster._format_bytes(payload['bytes_full'])}), "
+            f"last {payload['input_size']} periods per series"
+        )
+
+    if isinstance(forecaster.model_selection, ModelEnsemble):
+        timings = forecaster.model_selection.timings
+        if 'timegpt' in timings:
+            captions.append(
+                f"🧬 Local models took {timings['local']:.1f}s and TimeGPT {timings['timegpt']:.1f}s, "
+                f"run side by side: {timings['total']:.1f}s in total"
+            )
+        if message != "Success":
+            warnings.append(message)
+
+    update_progress(0.99, "Summarizing results...")
+    forecast_cubes = build_cubes(forecast_views, df)
+
+    update_progress(1.0, "Forecast completed!")
+
+    return {
+        'forecast_results': final_forecast,
+        'forecast_views': forecast_views,
+        'forecast_cubes': forecast_cubes,
+        'forecast_metadata': metadata,
+        'api_calls': forecaster.api_calls,
+        'captions': captions,
+        'warnings': forecaster.notices + warnings
+    }
+
+
+def load_config(path):
+    """Read a JSON or TOML run configuration"""
+    with open(path, 'rb') as f:
+        if path.endswith('.toml'):
+            if tomllib is None:
+                raise ValueError("TOML configs need Python 3.11 or later; use a JSON config instead")
+            return tomllib.load(f)
+        return json.load(f)
+
+
+def expand_runs(config):
+    """Settings of every run in a config: RUN_DEFAULTS < [defaults] < the run itself
+
+    A config without [[runs]] is a single run named 'forecast'. Raises ValueError on
+    unknown settings or values.
+    """
+    defaults = {**RUN_DEFAULTS, **config.get('defaults', {})}
+    runs = config.get('runs') or [{'name': 'forecast'}]
+
+    known_models = (
+        list(LOCAL_MODELS) + list(GLOBAL_MODELS) + TIMEGPT_MODELS + [AUTO_MODEL, ENSEMBLE_MODEL, 'ma6']
+    )
+    choices = {
+        'model': known_models,
+        'timeframe': list(TemporalAggregator.TIMEFRAMES),
+        'aggregation_level': list(DataProcessor.AGGREGATION_LEVELS),
+        'intermittent_model': INTERMITTENT_MODELS + [None],
+        'auto_selection': list(ModelTournament.SELECTION_MODES),
+        'ensemble_weighting': list(ModelEnsemble.WEIGHTING_MODES),
+        'reconciliation_method': list(HierarchicalForecaster.RECONCILIATION_METHODS),
+        'parent_level': list(DataProcessor.AGGREGATION_LEVELS) + [None],
+        'proportion_method': ['historical', 'recent']
+    }
+
+    expanded = []
+    for idx, run in enumerate(runs):
+        settings = {**defaults, **run}
+        name = settings.setdefault('name', f"run_{idx + 1}")
+
+        unknown = set(settings) - set(RUN_DEFAULTS) - {'name'}
+        if unknown:
+            raise ValueError(f"Run '{name}': unknown settings {', '.join(sorted(unknown))}")
+
+        for key, options in choices.items():
+            if settings[key] not in options:
+                raise ValueError(
+                    f"Run '{name}': {key} must be one of {', '.join(str(option) for option in options)}"
+                )
+
+        unknown_exports = set(settings['exports']) - set(EXPORT_FORMATS)
+        if unknown_exports:
+            raise ValueError(f"Run '{name}': unknown exports {', '.join(sorted(unknown_exports))}")
+
+        unknown_filters = set(settings['filters']) - set(DataProcessor.DIMENSION_COLS)
+        if unknown_filters:
+            raise ValueError(f"Run '{name}': cannot filter on {', '.join(sorted(unknown_filters))}")
+
+        expanded.append(settings)
+
+    return expanded
+
+
+def load_data(path, processor=None):
+    """Read and validate a CSV or Excel file in the upload page's format"""
+    processor = processor or DataProcessor()
+
+    if path.lower().endswith('.csv'):
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_excel(path)
+
+    parsed_df, message = processor.parse_uploaded_data(df)
+    if parsed_df is None:
+        raise ValueError(message)
+
+    return parsed_df
+
+
+def run_options(settings, source_freq, api_key=None):
+    """Forecast options, pipeline options and checkpoint config of one run's settings
+
+    Returns (freq_code, forecast_options, pipeline_options, run_config); raises
+    ValueError if the timeframe does not fit the data.
+    """
+    freq_name = settings['timeframe']
+    freq_code = TemporalAggregator.TIMEFRAMES[freq_name]
+    if source_freq != 'D' and freq_code != 'MS':
+        raise ValueError("Monthly data can only be forecast monthly")
+
+    model = settings['model']
+    use_timegpt = settings['use_timegpt'] if model == ENSEMBLE_MODEL else model in TIMEGPT_MODELS
+    hierarchical_mode = settings['hierarchical']
+    multi_resolution = settings['multi_resolution'] and source_freq == 'D' and freq_code == 'D'
+
+    forecast_options = dict(
+        model=model,
+        use_timegpt=use_timegpt,
+        include_holidays=settings['include_holidays'],
+        input_size=settings['input_size'] if use_timegpt else None,
+        intermittent_model=(
+            settings['intermittent_model']
+            if model not in INTERMITTENT_MODELS and model not in (AUTO_MODEL, ENSEMBLE_MODEL) else None
+        ),
+        auto_selection=settings['auto_selection'],
+        auto_timegpt_sample=settings['auto_timegpt_sample'] if model == AUTO_MODEL and api_key else 0,
+        ensemble_weighting=settings['ensemble_weighting'],
+        levels=sorted(settings['levels']) or None
+    )
+    pipeline_options = dict(
+        source_freq=source_freq,
+        aggregation_level=settings['aggregation_level'],
+        forecast_options=forecast_options,
+        hierarchical_mode=hierarchical_mode,
+        reconciliation_method=settings['reconciliation_method'] if hierarchical_mode else None,
+        parent_level=None if hierarchical_mode else settings['parent_level'],
+        proportion_method=settings['proportion_method'],
+        proportion_window=settings['proportion_window']
+    )
+    run_config = dict(
+        pipeline_options,
+        forecast_options=dict(forecast_options),
+        freq_code=freq_code,
+        horizon=settings['horizon'],
+        multi_resolution=multi_resolution,
+        reconcile_timeframes=settings['reconcile_timeframes'],
+        batch_size=settings['batch_size']
+    )
+
+    return freq_code, forecast_options, pipeline_options, run_config
+
+
+def filter_data(df, filters):
+    """Rows of `df` matching every {column: value or list of values} filter"""
+    for col, values in filters.items():
+        df = df[df[col].isin(values if isinstance(values, list) else [values])]
+    if df.empty:
+        raise ValueError("No data left after applying the filters")
+    return df
+
+
+def forecast_run(settings, inputs, api_key=None, n_jobs=None, progress_callback=None):
+    """Forecast one configured run from prepared inputs (see run_full_forecast)"""
+    freq_code, forecast_options, pipeline_options, run_config = run_options(
+        settings, inputs.source_freq, api_key=api_key
+    )
+
+    checkpoint = None
+    if settings['checkpoint']:
+        checkpoint = RunCheckpoint(
+            run_config, inputs.fingerprint, batch_size=settings['batch_size'], root=settings['checkpoint_dir']
+        )
+        forecast_options['checkpoint'] = checkpoint
+
+    forecaster = FleetForecaster(api_key=api_key, n_jobs=settings['n_jobs'] if n_jobs is None else n_jobs)
+    return run_full_forecast(
+        inputs.processor, forecaster, inputs.df,
+        freq_code=freq_code,
+        freq_name=settings['timeframe'],
+        horizon=settings['horizon'],
+        pipeline_options=pipeline_options,
+        multi_resolution=run_config['multi_resolution'],
+        reconcile_timeframes=settings['reconcile_timeframes'],
+        checkpoint=checkpoint,
+        progress_callback=progress_callback,
+        inputs=inputs
+    )
+
+
+def run_headless(settings, df, output_dir, api_key=None, progress_callback=None):
+    """Forecast and export one configured run (see expand_runs)
+
+    Returns a summary with the model used, exported files, TimeGPT calls and warnings;
+    raises on failure.
+    """
+    processor = DataProcessor()
+    df = filter_data(df, settings['filters'])
+    source_freq, _ = processor.detect_frequency(df)
+
+    result = forecast_run(
+        settings, PreparedInputs(processor, df, source_freq),
+        api_key=api_key, progress_callback=progress_callback
+    )
+
+    metadata = result['forecast_metadata']
+    return {
+        'name': settings['name'],
+        'model_used': metadata['model_used'],
+        'n_series': metadata['n_series'],
+        'api_calls': result['api_calls'],
+        'warnings': result['warnings'],
+        'files': export_forecast(result, settings['exports'], output_dir, settings['name'])
+    }
+
+
+def expand_grid(grid):
+    """Runs of every combination of a {setting: list of values} grid
+
+    Scalar values are fixed for every run. Each run is named after its grid values,
+    e.g. 'Weekly / 12 / theta'.
+    """
+    grid = {key: values if isinstance(values, list) else [values] for key, values in grid.items()}
+    varying = [key for key, values in grid.items() if len(values) > 1]
+
+    runs = []
+    for combination in itertools.product(*grid.values()):
+        run = dict(zip(grid, combination))
+        run['name'] = " / ".join(str(run[key]) for key in varying) or 'sweep'
+        runs.append(run)
+
+    return runs
+
+
+class ScenarioSweep:
+    """Forecasts many run configurations of one dataset, sharing their preprocessing
+
+    Parsing, resampling, aggregation, date filling and holiday features are done once
+    per distinct (timeframe, level, holidays) combination in a PreparedInputs that all
+    runs read from. Runs go to a thread pool and split `n_jobs` model workers between
+    them; the results are stacked into one frame with a `run_id` column plus an index
+    of the runs.
+    """
+
+    # Per-run columns of the sweep index
+    INDEX_COLS = [
+        'run_id', 'name', 'status', 'model_used', 'n_series', 'rows', 'api_calls', 'seconds',
+        'message', 'settings'
+    ]
+
+    def __init__(self, df, api_key=None, n_jobs=0, max_workers=None, processor=None):
+        self.processor = processor or DataProcessor()
+        self.source_freq, _ = self.processor.detect_frequency(df)
+        self.inputs = PreparedInputs(self.processor, df, self.source_freq)
+        self.api_key = api_key
+        self.n_jobs = n_jobs
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.results = {}
+        self.timings = {}
+
+    def _run_one(self, run_id, settings, n_jobs):
+        started = time.perf_counter()
+        entry = {
+            'run_id': run_id,
+            'name': settings['name'],
+            'settings': json.dumps(
+                {key: value for key, value in settings.items() if value != RUN_DEFAULTS.get(key) and key != 'name'},
+                sort_keys=True, default=str
+            )
+        }
+
+        try:
+            if settings['filters']:
+                raise ValueError("Per-run filters are not supported in a sweep; filter the data before the sweep")
+
+            result = forecast_run(settings, self.inputs, api_key=self.api_key, n_jobs=n_jobs)
+            metadata = result['forecast_metadata']
+            self.results[run_id] = result
+            entry.update(
+                status='done',
+                model_used=metadata['model_used'],
+                n_series=metadata['n_series'],
+                rows=len(result['forecast_results']),
+                api_calls=result['api_calls'],
+                message="; ".join(result['warnings'])
+            )
+        except Exception as e:
+            entry.update(status='failed', message=str(e))
+
+        entry['seconds'] = round(time.perf_counter() - started, 2)
+        return entry
+
+    def run(self, runs, progress_callback=None):
+        """Forecast every run's settings (see expand_runs)
+
+        Returns (index_df, results_df): one row per run, and the forecasts of every
+        successful run at its selected level and timeframe with their `run_id`.
+        """
+        started = time.perf_counter()
+        workers = max(1, min(self.max_workers, len(runs)))
+
+        # Split the model worker processes between the concurrent runs
+        total_jobs = self.n_jobs if self.n_jobs > 0 else (os.cpu_count() or 1)
+        run_jobs = max(1, total_jobs // workers)
+
+        entries = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sweep') as pool:
+            futures = [
+                pool.submit(self._run_one, f"run_{idx + 1:03d}", settings, run_jobs)
+                for idx, settings in enumerate(runs)
+            ]
+            for future in futures:
+                entries.append(future.result())
+                if progress_callback:
+                    progress_callback(len(entries) / len(runs), f"Finished {entries[-1]['name']}")
+
+        index_df = pd.DataFrame(entries).reindex(columns=self.INDEX_COLS)
+
+        frames = [
+            self.results[entry['run_id']]['forecast_results'].assign(run_id=entry['run_id'])
+            for entry in entries if entry['status'] == 'done'
+        ]
+        results_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['run_id'])
+        results_df = results_df[['run_id'] + [col for col in results_df.columns if col != 'run_id']]
+
+        self.timings = {
+            'preprocessing': self.inputs.build_seconds,
+            'total': time.perf_counter() - started
+        }
+
+        return index_df, results_df
+
+
+def export_forecast(result, exports, output_dir, name):
+    """Write the selected level of every timeframe view in the requested formats
+
+    Returns the paths written.
+    """
+    exporter = ExportManager()
+    metadata = result['forecast_metadata']
+    stamp = datetime.now().strftime('%Y%m%d_%H%M')
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = []
+    for timeframe, levels in result['forecast_views'].items():
+        forecast_df = levels[metadata['aggregation_level']]
+        cube = result['forecast_cubes'][timeframe][metadata['aggregation_level']]
+        export_metadata = exporter.create_metadata_dict(
+            forecast_df,
+            model_used=metadata['model_used'],
+            aggregation_level=metadata['aggregation_level'],
+            horizon=metadata['horizon'],
+            freq=TemporalAggregator.TIMEFRAMES.get(timeframe, metadata['freq_code']),
+            include_holidays=metadata['include_holidays'],
+            cube=cube
+        )
+        suffix = name if timeframe == metadata['freq'] else f"{name}_{timeframe.lower()}"
+
+        for export in exports:
+            prefix, extension, method = EXPORT_FORMATS[export]
+            if extension == 'xlsx':
+                content = getattr(exporter, method)(forecast_df, metadata=export_metadata, cube=cube).getvalue()
+            elif method == 'export_summary_csv':
+                content = exporter.export_summary_csv(forecast_df, cube=cube)
+            else:
+                content = getattr(exporter, method)(forecast_df)
+
+            path = os.path.join(output_dir, f"{prefix}_{suffix}_{stamp}.{extension}")
+            with open(path, 'wb') as f:
+                f.write(content)
+            paths.append(path)
+
+    return paths
@@ -0,0 +1,129 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+class ExplorerIndex:
+    """Sorted-code indexes of an upload for the Data Explorer filters and charts
+
+    Built once per upload. Every dimension is dictionary-encoded (sorted values,
+    one integer code per row) and the filter dimensions also keep their rows
+    grouped by code, so the rows of any set of values are a few contiguous slices.
+    A filter starts from its most selective dimension and narrows the rows with
+    code lookups on the others; the chart totals are then one bincount each over
+    the selected rows, without copying or regrouping the data.
+    """
+
+    FILTER_COLS = ['company', 'origin', 'fleet_type']
+    GROUP_COLS = ['fleet_type', 'region', 'route']
+
+    # Label of missing dimension values, which are encoded like any other value
+    MISSING_LABEL = 'Unknown'
+
+    def __init__(self, df):
+        # Identity of the upload in caches shared across sessions (e.g. FIGURE_CACHE)
+        self.key = uuid.uuid4().hex
+        self.n_rows = len(df)
+        self.qty = df['qty'].to_numpy(dtype=float)
+
+        date_codes, dates = pd.factorize(df['date'], sort=True)
+        self.date_codes = date_codes
+        self.dates = pd.DatetimeIndex(dates)
+
+        self.codes = {}
+        self.values = {}
+        for col in ['company', 'origin', 'fleet_type', 'region']:
+            codes, values = pd.factorize(df[col].fillna(self.MISSING_LABEL), sort=True)
+            self.codes[col] = codes
+            self.values[col] = np.asarray(values)
+
+        # Routes are encoded through the codes of their origin and destination
+        destination_codes, destinations = pd.factorize(df['destination'].fillna(self.MISSING_LABEL), sort=True)
+        pairs = self.codes['origin'].astype(np.int64) * len(destinations) + destination_codes
+        route_codes, route_pairs = pd.factorize(pairs, sort=True)
+        origins = self.values['origin'][route_pairs // len(destinations)]
+        self.codes['route'] = route_codes
+        self.values['route'] = np.asarray(
+            [f"{origin} → {destination}" for origin, destination in zip(origins, destinations[route_pairs % len(destinations)])]
+        )
+
+        # Rows of each filter dimension grouped by code: rows of code c are order[offsets[c]:offsets[c + 1]]
+        self.postings = {}
+        for col in self.FILTER_COLS:
+            codes = self.codes[col]
+            order = np.argsort(codes, kind='stable')
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self.values[col])))])
+            self.postings[col] = (order, offsets)
+
+    def options(self, col):
+        """Sorted distinct values of a dimension"""
+        return self.values[col].tolist()
+
+    def _value_codes(self, col, selected):
+        return np.flatnonzero(np.isin(self.values[col], list(selected)))
+
+    def select(self, filters=None, date_range=None):
+        """Sorted positions of the rows matching every filter, or None for all rows
+
+        `filters` maps FILTER_COLS to selected values (empty selections are ignored);
+        `date_range` is an inclusive (start, end).
+        """
+        active = {col: self._value_codes(col, values) for col, values in (filters or {}).items() if len(values)}
+
+        date_bounds = None
+        if date_range is not None:
+            start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+            first, last = self.dates.searchsorted(start, 'left'), self.dates.searchsorted(end, 'right')
+            if first > 0 or last < len(self.dates):
+                date_bounds = (first, last)
+
+        if not active and date_bounds is None:
+            return None
+
+        positions = None
+        if active:
+            # Start from the dimension selecting the fewest rows
+            def n_selected(col):
+                _, offsets = self.postings[col]
+                return int((offsets[active[col] + 1] - offsets[active[col]]).sum())
+
+            first_col = min(active, key=n_selected)
+            order, offsets = self.postings[first_col]
+            positions = np.sort(np.concatenate(
+                [order[offsets[code]:offsets[code + 1]] for code in active.pop(first_col)]
+            ))
+
+            for col, value_codes in active.items():
+                keep = np.zeros(len(self.values[col]), dtype=bool)
+                keep[value_codes] = True
+                positions = positions[keep[self.codes[col][positions]]]
+
+        if date_bounds is not None:
+            first, last = date_bounds
+            if positions is None:
+                positions = np.flatnonzero((self.date_codes >= first) & (self.date_codes < last))
+            else:
+                codes = self.date_codes[positions]
+                positions = positions[(codes >= first) & (codes < last)]
+
+        return positions
+
+    def _totals(self, codes, n_values, positions):
+        """(qty total, row count) per code over the selected rows"""
+        if positions is not None:
+            codes = codes[positions]
+        qty = self.qty if positions is None else self.qty[positions]
+        return np.bincount(codes, weights=qty, minlength=n_values), np.bincount(codes, minlength=n_values)
+
+    def daily_totals(self, positions=None):
+        """Total qty per date with at least one selected row"""
+        totals, counts = self._totals(self.date_codes, len(self.dates), positions)
+        present = counts > 0
+        return pd.DataFrame({'date': self.dates[present], 'qty': totals[present]})
+
+    def totals_by(self, col, positions=None):
+        """Total qty per value of a GROUP_COLS dimension with at least one selected row"""
+        totals, counts = self._totals(self.codes[col], len(self.values[col]), positions)
+        present = counts > 0
+        return pd.DataFrame({col: self.values[col][present], 'qty': totals[present]})
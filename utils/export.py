@@ -4,6 +4,23 @@ import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
 from datetime import datetime
+from utils.forecaster import sum_with_intervals
+
+# Dates are datetime64 throughout the app and become text only in tables and exports
+DATE_FORMAT = '%d/%m/%Y'
+
+
+def format_dates(frame, date_format=DATE_FORMAT):
+    """Copy of `frame` with its datetime columns as dd/mm/yyyy text, for display and export"""
+    date_cols = [col for col in frame.columns if pd.api.types.is_datetime64_any_dtype(frame[col])]
+    if not date_cols:
+        return frame
+    
+    frame = frame.copy()
+    for col in date_cols:
+        frame[col] = frame[col].dt.strftime(date_format)
+    return frame
+
 
 class ExportManager:
     """Handles data export functionality"""
@@ -11,8 +28,24 @@ class ExportManager:
     def __init__(self):
         self.brand_color = '2E7D32'  # Green
     
-    def export_detailed_excel(self, forecast_df, historical_df=None, metadata=None):
-        """Export detailed forecast to Excel with multiple sheets"""
+    def _interval_cols(self, forecast_df):
+        """Interval bound columns of a forecast frame (forecast_qty_lo_80, forecast_qty_hi_80, ...)"""
+        return [col for col in forecast_df.columns if col.startswith(('forecast_qty_lo_', 'forecast_qty_hi_'))]
+    
+    def _summary_by_date(self, forecast_df, cube=None):
+        """Total forecast per date, with interval bounds as 'Lower 80%' / 'Upper 80%' columns"""
+        summary = cube.by_date if cube is not None else sum_with_intervals(forecast_df, 'date')
+        labels = {'date': 'Date', 'forecast_qty': 'Total Forecast'}
+        for col in self._interval_cols(forecast_df):
+            side, level = col.rsplit('_', 2)[1:]
+            labels[col] = f"{'Lower' if side == 'lo' else 'Upper'} {level}%"
+        return format_dates(summary[list(labels)]).rename(columns=labels)
+    
+    def export_detailed_excel(self, forecast_df, historical_df=None, metadata=None, cube=None):
+        """Export detailed forecast to Excel with multiple sheets
+        
+        Summary sheets are read from `cube` (ResultsCube) when given.
+        """
         
         output = BytesIO()
         
@@ -22,38 +55,45 @@ class ExportManager:
             
             # Select and order columns
             export_cols = ['date', 'company', 'origin', 'destination', 
-                          'province', 'region', 'fleet_type', 'forecast_qty']
+                          'province', 'region', 'fleet_type', 'forecast_qty'] + self._interval_cols(forecast_df)
             
             # Ensure all columns exist
             for col in export_cols:
                 if col not in forecast_export.columns:
                     forecast_export[col] = 'All'
             
-            forecast_export = forecast_export[export_cols]
+            forecast_export = format_dates(forecast_export[export_cols])
             forecast_export.to_excel(writer, sheet_name='Detailed Forecast', index=False)
             
             # Sheet 2: Summary by Date
-            summary_by_date = forecast_df.groupby('date')['forecast_qty'].sum().reset_index()
-            summary_by_date.columns = ['Date', 'Total Forecast']
+            summary_by_date = self._summary_by_date(forecast_df, cube)
             summary_by_date.to_excel(writer, sheet_name='Summary by Date', index=False)
             
+            def totals(keys):
+                if cube is not None:
+                    return cube.by_dimension['route' if len(keys) > 1 else keys[0]][keys + ['forecast_qty']]
+                return forecast_df.groupby(keys)['forecast_qty'].sum().reset_index()
+            
+            def n_values(col):
+                return cube.cardinality.get(col, 0) if cube is not None else forecast_df[col].nunique()
+            
             # Sheet 3: Summary by Fleet Type
             if 'fleet_type' in forecast_df.columns:
-                summary_by_fleet = forecast_df.groupby('fleet_type')['forecast_qty'].sum().reset_index()
+                summary_by_fleet = totals(['fleet_type'])
                 summary_by_fleet.columns = ['Fleet Type', 'Total Forecast']
                 summary_by_fleet = summary_by_fleet.sort_values('Total Forecast', ascending=False)
                 summary_by_fleet.to_excel(writer, sheet_name='Summary by Fleet Type', index=False)
             
             # Sheet 4: Summary by Region
-            if 'region' in forecast_df.columns and forecast_df['region'].nunique() > 1:
-                summary_by_region = forecast_df.groupby('region')['forecast_qty'].sum().reset_index()
+            if 'region' in forecast_df.columns and n_values('region') > 1:
+                summary_by_region = totals(['region'])
                 summary_by_region.columns = ['Region', 'Total Forecast']
                 summary_by_region = summary_by_region.sort_values('Total Forecast', ascending=False)
                 summary_by_region.to_excel(writer, sheet_name='Summary by Region', index=False)
             
             # Sheet 5: Summary by Route
             if 'origin' in forecast_df.columns and 'destination' in forecast_df.columns:
-                route_summary = forecast_df.groupby(['origin', 'destination'])['forecast_qty'].sum().reset_index()
+                route_summary = totals(['origin', 'destination'])
                 route_summary.columns = ['Origin', 'Destination', 'Total Forecast']
                 route_summary = route_summary.sort_values('Total Forecast', ascending=False)
                 route_summary.to_excel(writer, sheet_name='Summary by Route', index=False)
@@ -116,19 +156,23 @@ class ExportManager:
         
         return output
     
-    def export_summary_excel(self, forecast_df, metadata=None):
+    def export_summary_excel(self, forecast_df, metadata=None, cube=None):
         """Export summary forecast to Excel"""
         
         output = BytesIO()
         
         with pd.ExcelWriter(output, engine='openpyxl') as writer:
             # Summary by date
-            summary_by_date = forecast_df.groupby('date')['forecast_qty'].sum().reset_index()
-            summary_by_date.columns = ['Date', 'Total Forecast']
+            summary_by_date = self._summary_by_date(forecast_df, cube)
             summary_by_date.to_excel(writer, sheet_name='Summary', index=False)
             
             # Optional: Add fleet type breakdown
-            if 'fleet_type' in forecast_df.columns and forecast_df['fleet_type'].nunique() > 1:
+            if cube is not None:
+                if cube.has('fleet_type'):
+                    fleet_pivot = cube.pivot('fleet_type')
+                    fleet_pivot.index = fleet_pivot.index.strftime(DATE_FORMAT)
+                    fleet_pivot.to_excel(writer, sheet_name='By Fleet Type')
+            elif 'fleet_type' in forecast_df.columns and forecast_df['fleet_type'].nunique() > 1:
                 fleet_pivot = forecast_df.pivot_table(
                     index='date',
                     columns='fleet_type',
@@ -136,6 +180,7 @@ class ExportManager:
                     aggfunc='sum',
                     fill_value=0
                 )
+                fleet_pivot.index = fleet_pivot.index.strftime(DATE_FORMAT)
                 fleet_pivot.to_excel(writer, sheet_name='By Fleet Type')
             
             # Metadata
@@ -186,40 +231,47 @@ class ExportManager:
         """Export detailed forecast to CSV"""
         
         export_cols = ['date', 'company', 'origin', 'destination', 
-                      'province', 'region', 'fleet_type', 'forecast_qty']
+                      'province', 'region', 'fleet_type', 'forecast_qty'] + self._interval_cols(forecast_df)
         
         # Ensure all columns exist
         for col in export_cols:
             if col not in forecast_df.columns:
                 forecast_df[col] = 'All'
         
-        forecast_export = forecast_df[export_cols].copy()
+        forecast_export = format_dates(forecast_df[export_cols])
         
         return forecast_export.to_csv(index=False).encode('utf-8')
     
-    def export_summary_csv(self, forecast_df):
+    def export_summary_csv(self, forecast_df, cube=None):
         """Export summary forecast to CSV"""
         
-        summary_by_date = forecast_df.groupby('date')['forecast_qty'].sum().reset_index()
-        summary_by_date.columns = ['date', 'total_forecast']
+        summary_by_date = format_dates(cube.by_date if cube is not None else sum_with_intervals(forecast_df, 'date'))
+        summary_by_date = summary_by_date.rename(columns=lambda col: col.replace('forecast_qty', 'total_forecast'))
         
         return summary_by_date.to_csv(index=False).encode('utf-8')
     
     def create_metadata_dict(self, forecast_df, model_used, aggregation_level, 
-                            horizon, freq, include_holidays):
+                            horizon, freq, include_holidays, cube=None):
         """Create metadata dictionary for export"""
         
+        if cube is not None:
+            n_periods, n_series, total, mean = cube.n_periods, cube.n_series, cube.total, cube.mean
+        else:
+            n_periods = len(forecast_df['date'].unique())
+            n_series = forecast_df['unique_id'].nunique() if 'unique_id' in forecast_df.columns else 1
+            total, mean = forecast_df['forecast_qty'].sum(), forecast_df['forecast_qty'].mean()
+        
         metadata = {
             'Export Date': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
             'Model Used': model_used,
             'Aggregation Level': aggregation_level,
             'Forecast Horizon': horizon,
-            'Frequency': 'Daily' if freq == 'D' else 'Monthly',
+            'Frequency': 'Daily' if freq == 'D' else ('Weekly' if 'W' in freq else 'Monthly'),
             'Holidays Included': 'Yes' if include_holidays else 'No',
-            'Total Forecast Periods': len(forecast_df['date'].unique()),
-            'Total Series Forecasted': forecast_df['unique_id'].nunique() if 'unique_id' in forecast_df.columns else 1,
-            'Total Forecasted Quantity': int(forecast_df['forecast_qty'].sum()),
-            'Average Daily Forecast': int(forecast_df['forecast_qty'].mean())
+            'Total Forecast Periods': n_periods,
+            'Total Series Forecasted': n_series,
+            'Total Forecasted Quantity': int(total),
+            'Average Daily Forecast': int(mean)
         }
         
         return metadata
@@ -1,24 +1,453 @@
 import pandas as pd
 import numpy as np
+import threading
 from datetime import datetime, timedelta
-import streamlit as st
+from functools import partial
+from utils.parallel import ParallelBackend
+from utils.data_processor import DataProcessor
+
+
+# ---------------------------------------------------------------------------
+# Local statistical models
+#
+# Every model takes the full panel Y (n_series x n_periods, float) and returns
+# an (n_series x horizon) forecast matrix. Parameters are chosen per series by
+# evaluating a small grid of smoothing constants for all series at once, so the
+# only Python loop is over time.
+# ---------------------------------------------------------------------------
+
+SMOOTHING_GRID = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+TREND_GRID = np.array([0.01, 0.05, 0.1, 0.2])
+SEASONAL_GRID = np.array([0.01, 0.05, 0.1, 0.3])
+
+
+def _effective_season(Y, season_length):
+    """Disable seasonality when there are fewer than two full cycles"""
+    if season_length is None or season_length < 2 or Y.shape[1] < 2 * season_length:
+        return 1
+    return season_length
+
+
+def _seasonal_naive(Y, horizon, season_length=7):
+    """Repeat the last observed seasonal cycle"""
+    m = _effective_season(Y, season_length)
+    n_periods = Y.shape[1]
+    
+    steps = np.arange(horizon)
+    return Y[:, n_periods - m + (steps % m)]
+
+
+def _ses_fit(Y, alphas):
+    """Run simple exponential smoothing for every alpha; returns (levels, sse) of shape (A, N)"""
+    a = alphas[:, None]
+    level = np.repeat(Y[None, :, 0], len(alphas), axis=0)
+    sse = np.zeros_like(level)
+    
+    for t in range(1, Y.shape[1]):
+        error = Y[None, :, t] - level
+        sse += error ** 2
+        level = level + a * error
+    
+    return level, sse
+
+
+def _ses(Y, horizon, season_length=None):
+    """Simple exponential smoothing with per-series alpha"""
+    level, sse = _ses_fit(Y, SMOOTHING_GRID)
+    best = sse.argmin(axis=0)
+    
+    final_level = level[best, np.arange(Y.shape[0])]
+    return np.repeat(final_level[:, None], horizon, axis=1)
+
+
+def _holt(Y, horizon, season_length=None):
+    """Holt's linear trend method with per-series alpha and beta"""
+    # Flatten the alpha x beta grid into one candidate axis
+    alphas = np.repeat(SMOOTHING_GRID, len(TREND_GRID))[:, None]
+    betas = np.tile(TREND_GRID, len(SMOOTHING_GRID))[:, None]
+    
+    n_candidates = len(alphas)
+    level = np.repeat(Y[None, :, 0], n_candidates, axis=0)
+    trend = np.zeros_like(level)
+    if Y.shape[1] > 1:
+        trend += Y[None, :, 1] - Y[None, :, 0]
+    sse = np.zeros_like(level)
+    
+    for t in range(1, Y.shape[1]):
+        fitted = level + trend
+        error = Y[None, :, t] - fitted
+        sse += error ** 2
+        level = fitted + alphas * error
+        trend = trend + alphas * betas * error
+    
+    best = sse.argmin(axis=0)
+    rows = np.arange(Y.shape[0])
+    steps = np.arange(1, horizon + 1)
+    return level[best, rows][:, None] + trend[best, rows][:, None] * steps[None, :]
+
+
+def _seasonal_indices(Y, m):
+    """Additive seasonal index for each position in the cycle, shape (N, m)"""
+    n_periods = Y.shape[1]
+    n_cycles = n_periods // m
+    
+    # Use whole cycles aligned to the end of the series
+    cycles = Y[:, n_periods - n_cycles * m:].reshape(Y.shape[0], n_cycles, m)
+    indices = cycles.mean(axis=1)
+    return indices - indices.mean(axis=1, keepdims=True)
+
+
+def _theta(Y, horizon, season_length=7):
+    """Theta method (SES with half the linear drift) on seasonally adjusted data"""
+    n_series, n_periods = Y.shape
+    m = _effective_season(Y, season_length)
+    
+    # Additive seasonal adjustment; the index of period t is at (t - offset) % m
+    offset = n_periods % m
+    if m > 1:
+        indices = _seasonal_indices(Y, m)
+        positions = (np.arange(n_periods) - offset) % m
+        adjusted = Y - indices[:, positions]
+    else:
+        indices = np.zeros((n_series, 1))
+        adjusted = Y
+    
+    # Slope of the linear trend (theta = 0 line), vectorized OLS
+    t = np.arange(n_periods, dtype=float)
+    t_centered = t - t.mean()
+    slope = (adjusted * t_centered).sum(axis=1) / max((t_centered ** 2).sum(), 1e-12)
+    
+    level, sse = _ses_fit(adjusted, SMOOTHING_GRID)
+    best = sse.argmin(axis=0)
+    rows = np.arange(n_series)
+    final_level = level[best, rows]
+    alpha = SMOOTHING_GRID[best]
+    
+    steps = np.arange(1, horizon + 1)
+    drift = (steps[None, :] - 1 + 1 / alpha[:, None]
+             - ((1 - alpha[:, None]) ** n_periods) / alpha[:, None])
+    forecast = final_level[:, None] + 0.5 * slope[:, None] * drift
+    
+    future_positions = (n_periods + steps - 1 - offset) % m
+    return forecast + indices[:, future_positions]
+
+
+def _ets_seasonal(Y, horizon, season_length=7):
+    """Additive seasonal ETS(A,N,A) with per-series alpha and gamma"""
+    n_series, n_periods = Y.shape
+    m = _effective_season(Y, season_length)
+    if m == 1:
+        return _ses(Y, horizon)
+    
+    alphas = np.repeat(SMOOTHING_GRID, len(SEASONAL_GRID))[:, None]
+    gammas = np.tile(SEASONAL_GRID, len(SMOOTHING_GRID))[:, None]
+    n_candidates = len(alphas)
+    
+    # Initialise from the first cycle
+    first_cycle = Y[:, :m]
+    level = np.repeat(first_cycle.mean(axis=1)[None, :], n_candidates, axis=0)
+    seasonal = np.repeat((first_cycle - first_cycle.mean(axis=1, keepdims=True))[None, :, :],
+                         n_candidates, axis=0)
+    sse = np.zeros_like(level)
+    
+    for t in range(m, n_periods):
+        position = t % m
+        error = Y[None, :, t] - (level + seasonal[:, :, position])
+        sse += error ** 2
+        level = level + alphas * error
+        seasonal[:, :, position] += gammas * error
+    
+    best = sse.argmin(axis=0)
+    rows = np.arange(n_series)
+    future_positions = (n_periods + np.arange(horizon)) % m
+    return level[best, rows][:, None] + seasonal[best, rows][:, future_positions]
+
+
+# ---------------------------------------------------------------------------
+# Intermittent demand
+# ---------------------------------------------------------------------------
+
+# Syntetos-Boylan cut-off values
+ADI_THRESHOLD = 1.32
+CV2_THRESHOLD = 0.49
+INTERMITTENT_ALPHA = 0.1
+
+
+def classify_demand(Y, adi_threshold=ADI_THRESHOLD, cv2_threshold=CV2_THRESHOLD):
+    """Classify every series as smooth, erratic, intermittent or lumpy
+    
+    ADI is the average number of periods per non-zero demand and CV² the squared
+    coefficient of variation of the non-zero demand sizes.
+    Returns (classes, adi, cv2) arrays of length n_series.
+    """
+    nonzero = Y > 0
+    n_nonzero = nonzero.sum(axis=1)
+    safe_count = np.maximum(n_nonzero, 1)
+    
+    adi = np.where(n_nonzero > 0, Y.shape[1] / safe_count, np.inf)
+    
+    mean_size = np.where(nonzero, Y, 0).sum(axis=1) / safe_count
+    var_size = np.where(nonzero, (Y - mean_size[:, None]) ** 2, 0).sum(axis=1) / safe_count
+    cv2 = np.where(mean_size > 0, var_size / np.maximum(mean_size, 1e-12) ** 2, 0.0)
+    
+    frequent = adi < adi_threshold
+    stable = cv2 < cv2_threshold
+    classes = np.select(
+        [frequent & stable, frequent & ~stable, ~frequent & stable],
+        ['smooth', 'erratic', 'intermittent'],
+        default='lumpy'
+    )
+    
+    return classes, adi, cv2
+
+
+def _croston_states(Y, alpha=INTERMITTENT_ALPHA):
+    """Smoothed demand size and inter-demand interval at the end of each series"""
+    nonzero = Y > 0
+    n_nonzero = nonzero.sum(axis=1)
+    safe_count = np.maximum(n_nonzero, 1)
+    
+    # Initialise with the average size and interval
+    size = np.where(nonzero, Y, 0).sum(axis=1) / safe_count
+    interval = Y.shape[1] / safe_count
+    periods_since = np.zeros(Y.shape[0])
+    
+    for t in range(Y.shape[1]):
+        periods_since += 1
+        demand = nonzero[:, t]
+        size = np.where(demand, size + alpha * (Y[:, t] - size), size)
+        interval = np.where(demand, interval + alpha * (periods_since - interval), interval)
+        periods_since = np.where(demand, 0, periods_since)
+    
+    return size, interval
+
+
+def _croston(Y, horizon, season_length=None):
+    """Croston's method: smoothed size over smoothed interval"""
+    size, interval = _croston_states(Y)
+    rate = size / np.maximum(interval, 1)
+    return np.repeat(rate[:, None], horizon, axis=1)
+
+
+def _sba(Y, horizon, season_length=None, alpha=INTERMITTENT_ALPHA):
+    """Syntetos-Boylan approximation (bias-corrected Croston)"""
+    return (1 - alpha / 2) * _croston(Y, horizon)
+
+
+def _tsb(Y, horizon, season_length=None, alpha=INTERMITTENT_ALPHA, beta=INTERMITTENT_ALPHA):
+    """Teunter-Syntetos-Babai: smoothed demand probability times smoothed size"""
+    nonzero = Y > 0
+    n_nonzero = nonzero.sum(axis=1)
+    
+    probability = n_nonzero / Y.shape[1]
+    size = np.where(nonzero, Y, 0).sum(axis=1) / np.maximum(n_nonzero, 1)
+    
+    for t in range(Y.shape[1]):
+        demand = nonzero[:, t]
+        probability = probability + beta * (demand - probability)
+        size = np.where(demand, size + alpha * (Y[:, t] - size), size)
+    
+    return np.repeat((probability * size)[:, None], horizon, axis=1)
+
+
+# Registry of local models: key -> (display name, panel function)
+LOCAL_MODELS = {
+    'seasonal_naive': ('Seasonal Naive', _seasonal_naive),
+    'ses': ('Simple Exponential Smoothing', _ses),
+    'holt': ("Holt's Linear Trend", _holt),
+    'theta': ('Theta', _theta),
+    'ets_weekly': ('ETS (Weekly Seasonal)', _ets_seasonal),
+    'croston': ('Croston', _croston),
+    'sba': ('Croston SBA', _sba),
+    'tsb': ('TSB', _tsb)
+}
+
+# Models suited to sparse (intermittent or lumpy) series
+INTERMITTENT_MODELS = ['croston', 'sba', 'tsb']
+SPARSE_DEMAND_CLASSES = ['intermittent', 'lumpy']
+
+
+def _moving_average(Y, horizon, season_length=None, window=6):
+    """Flat forecast at the mean of the last `window` periods (panel form of MA-6)"""
+    return np.repeat(Y[:, -window:].mean(axis=1)[:, None], horizon, axis=1)
+
+
+# ---------------------------------------------------------------------------
+# Prediction intervals
+# ---------------------------------------------------------------------------
+
+# Default interval coverage levels (%)
+INTERVAL_LEVELS = [80, 95]
+
+# Rolling origins whose out-of-sample errors calibrate the intervals
+CONFORMAL_WINDOWS = 3
+
+
+def interval_columns(levels, prefix='forecast'):
+    """Lower and upper bound column names for each level"""
+    return [f"{prefix}_{side}_{level}" for level in levels for side in ('lo', 'hi')]
+
+
+def sum_with_intervals(frame, by, value_col='forecast_qty'):
+    """Sum a forecast frame over series per `by` group, with its interval bounds
+    
+    Errors of different series are taken as independent: half-widths add in
+    quadrature around the summed forecast.
+    """
+    value_cols = [col for col in frame.columns if col.startswith(value_col)]
+    point = frame[value_col].to_numpy(dtype=float)
+    
+    parts = pd.DataFrame({value_col: point}, index=frame.index)
+    for col in value_cols:
+        if col != value_col:
+            parts[col] = (frame[col].to_numpy(dtype=float) - point) ** 2
+    
+    keys = [frame[col] for col in ([by] if isinstance(by, str) else by)]
+    summed = parts.groupby(keys).sum()
+    
+    total = summed[value_col].to_numpy()
+    for col in value_cols:
+        if col == value_col:
+            continue
+        width = np.sqrt(summed[col].to_numpy())
+        if '_lo_' in col:
+            summed[col] = np.clip(np.round(total - width), 0, None)
+        else:
+            summed[col] = np.round(total + width)
+    
+    return summed.reset_index()
+
+
+def conformal_half_widths(errors, horizon, levels):
+    """Interval half-widths per series and step from calibration errors
+    
+    `errors` is (n_series, n_windows, n_steps). Errors are divided by each series'
+    mean absolute error so the quantile of every step can be pooled over the whole
+    panel, then scaled back per series. Steps beyond the calibrated ones reuse the
+    last step. Returns {level: (n_series, horizon) array}.
+    """
+    abs_errors = np.abs(errors)
+    n_series, _, n_steps = abs_errors.shape
+    scale = abs_errors.mean(axis=(1, 2))
+    
+    # Series with no calibration error carry no information about the spread
+    informative = scale > 0
+    scores = (abs_errors[informative] / scale[informative, None, None]).reshape(-1, n_steps)
+    
+    half_widths = {}
+    for level in levels:
+        if len(scores):
+            quantile = np.quantile(scores, level / 100, axis=0)
+        else:
+            quantile = np.zeros(n_steps)
+        quantile = np.concatenate([quantile, np.full(max(horizon - n_steps, 0), quantile[-1])])[:horizon]
+        half_widths[level] = scale[:, None] * quantile[None, :]
+    
+    return half_widths
+
+
+# ---------------------------------------------------------------------------
+# Global model: one regressor trained on all series
+# ---------------------------------------------------------------------------
+
+GLOBAL_MODELS = {'global_gbm': 'Global Gradient Boosting'}
+
+# Best model per series, picked by a holdout tournament (utils.backtest.ModelTournament)
+AUTO_MODEL = 'auto'
+
+# Weighted blend of local models and optionally TimeGPT (utils.backtest.ModelEnsemble)
+ENSEMBLE_MODEL = 'ensemble'
+
+# Lags and rolling-mean windows (in periods) per frequency key
+GLOBAL_LAGS = {
+    'D': [1, 2, 3, 4, 5, 6, 7, 14, 21, 28],
+    'W': [1, 2, 3, 4, 8, 13, 26, 52],
+    'M': [1, 2, 3, 6, 12]
+}
+GLOBAL_WINDOWS = {'D': [7, 28], 'W': [4, 13], 'M': [3, 12]}
+GLOBAL_MAX_TRAIN_ROWS = 2_000_000
+
+
+def _lag_features(Y, t_index, lags, windows):
+    """Lag and rolling-mean features for target periods `t_index`
+    
+    Returns an array of shape (N, len(t_index), n_features). Rolling means use a
+    cumulative sum over the span the windows touch only.
+    """
+    features = [Y[:, t_index - lag] for lag in lags]
+    
+    if windows:
+        start = t_index.min() - max(windows)
+        span = Y[:, start:t_index.max()]
+        cumsum = np.concatenate([np.zeros((Y.shape[0], 1)), np.cumsum(span, axis=1)], axis=1)
+        for window in windows:
+            features.append((cumsum[:, t_index - start] - cumsum[:, t_index - window - start]) / window)
+    
+    return np.stack(features, axis=-1)
+
+
+def _make_regressor():
+    """LightGBM if installed, otherwise scikit-learn's HistGradientBoosting"""
+    try:
+        from lightgbm import LGBMRegressor
+        return LGBMRegressor(n_estimators=300, learning_rate=0.05, num_leaves=63, verbose=-1)
+    except ImportError:
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05, max_leaf_nodes=63)
+
 
 class FleetForecaster:
     """Handles forecasting using TimeGPT and fallback methods"""
     
-    def __init__(self, api_key=None):
+    # Seasonal and yearly cycle length (in periods) for each supported frequency
+    SEASON_LENGTHS = {'D': 7, 'W': 52, 'M': 12}
+    YEAR_LENGTHS = {'D': 365, 'W': 52, 'M': 12}
+    
+    # Context window policy per TimeGPT model: the history sent is the largest of
+    # `min_seasons` seasonal cycles, `horizon_multiple` x horizon and (optionally)
+    # one full year plus the horizon
+    INPUT_SIZE_POLICY = {
+        'timegpt-1': {'min_seasons': 8, 'horizon_multiple': 3, 'include_year': False},
+        'timegpt-1-long-horizon': {'min_seasons': 16, 'horizon_multiple': 5, 'include_year': True}
+    }
+    
+    def __init__(self, api_key=None, n_jobs=1):
         self.api_key = api_key
         self.nixtla_client = None
+        self.last_payload = None
+        self.demand_classes = None
+        self.model_selection = None
+        
+        # Successful TimeGPT calls and user-facing notices; the caller (page or command
+        # line) reports them, so the forecaster never depends on Streamlit. The ensemble
+        # sends TimeGPT requests from several threads, hence the lock.
+        self.api_calls = 0
+        self.notices = []
+        self._lock = threading.Lock()
+        self._thread = threading.local()
+        
+        # Local models are sharded across `n_jobs` processes (1 = serial, 0 = all cores)
+        self.backend = ParallelBackend(n_workers=n_jobs)
         
         if api_key:
             try:
                 from nixtla import NixtlaClient
                 self.nixtla_client = NixtlaClient(api_key=api_key)
             except ImportError:
-                st.error("nixtla package not installed. Please install: pip install nixtla")
+                self.add_notice("nixtla package not installed. Please install: pip install nixtla")
             except Exception as e:
-                st.error(f"Error initializing TimeGPT client: {str(e)}")
-    
+                self.add_notice(f"Error initializing TimeGPT client: {str(e)}")
+
+    def close(self):
+        """Shut down the worker processes of the parallel backend"""
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def validate_api_key(self):
         """Validate if API key is working"""
         if not self.nixtla_client:
@@ -53,9 +482,152 @@ class FleetForecaster:
             else:
                 return False, f"API validation error: {str(e)}"
     
+    def _freq_key(self, freq):
+        """Map a pandas frequency string to a key of SEASON_LENGTHS"""
+        if 'W' in freq:
+            return 'W'
+        if 'M' in freq:
+            return 'M'
+        return 'D'
+    
+    def _future_dates(self, last_date, horizon, freq='D'):
+        """Dates of the `horizon` periods following `last_date`"""
+        if freq == 'D':
+            start_date = last_date + pd.Timedelta(days=1)
+        elif 'W' in freq:
+            start_date = last_date + pd.Timedelta(weeks=1)
+        elif 'M' in freq:
+            # For monthly, use month start
+            start_date = last_date + pd.DateOffset(months=1)
+            freq = 'MS'
+        else:
+            # Fallback
+            start_date = last_date + pd.Timedelta(days=1)
+        
+        return pd.date_range(start=start_date, periods=horizon, freq=freq)
+    
+    def to_panel(self, df):
+        """Pivot a long (unique_id, ds, y) frame into a series x time matrix
+        
+        Returns (unique_ids, dates, Y). Missing cells are filled with 0.
+        """
+        id_codes, unique_ids = pd.factorize(df['unique_id'], sort=True)
+        date_codes, dates = pd.factorize(df['ds'], sort=True)
+        
+        Y = np.zeros((len(unique_ids), len(dates)), dtype=float)
+        np.add.at(Y, (id_codes, date_codes), df['y'].to_numpy(dtype=float))
+        
+        return np.asarray(unique_ids), pd.DatetimeIndex(dates), Y
+    
+    def from_panel(self, unique_ids, future_dates, forecast):
+        """Convert an (n_series x horizon) forecast matrix to a long frame"""
+        return pd.DataFrame({
+            'unique_id': np.repeat(unique_ids, len(future_dates)),
+            'ds': np.tile(future_dates.values, len(unique_ids)),
+            'forecast': np.clip(np.round(forecast.ravel()), 0, None).astype(int)
+        })
+    
+    def calibration_errors(self, Y, horizon, forecast_folds, n_windows=CONFORMAL_WINDOWS, min_history=14):
+        """Out-of-sample errors over the last windows of the history
+        
+        `forecast_folds(cutoffs, steps)` returns (n_folds, n_series, steps) forecasts,
+        each from the first `cutoff` periods. Up to `n_windows` windows of `horizon`
+        steps are used, fewer (or shorter) ones when the history is short.
+        Returns (n_series, n_windows, steps), or None without enough history.
+        """
+        n_periods = Y.shape[1]
+        steps = min(horizon, n_periods - min_history)
+        if steps < 1:
+            return None
+        
+        n_windows = max(1, min(n_windows, (n_periods - min_history) // steps))
+        cutoffs = n_periods - steps * np.arange(n_windows, 0, -1)
+        
+        forecast = np.transpose(forecast_folds(cutoffs, steps), (1, 0, 2))
+        actual = Y[:, cutoffs[:, None] + np.arange(steps)]
+        return forecast - actual
+    
+    def panel_intervals(self, Y, horizon, model_func, season_length, levels):
+        """Conformal interval half-widths of a local panel model, {level: (n_series, horizon)}"""
+        errors = self.calibration_errors(
+            Y, horizon,
+            lambda cutoffs, steps: self.backend.map_folds(model_func, Y, steps, cutoffs, season_length)
+        )
+        if errors is None:
+            return None
+        return conformal_half_widths(errors, horizon, levels)
+    
+    def attach_intervals(self, result, unique_ids, half_widths):
+        """Add forecast_lo_<level> / forecast_hi_<level> columns to a long forecast frame
+        
+        `half_widths` maps each level to an (n_series, horizon) array in `unique_ids`
+        order. Bounds are rounded like the forecast, never negative and always contain it.
+        """
+        if not half_widths:
+            return result
+        
+        result = result.sort_values(['unique_id', 'ds']).reset_index(drop=True)
+        rows = pd.Index(unique_ids).get_indexer(result['unique_id'])
+        steps = result.groupby('unique_id', sort=False).cumcount().to_numpy()
+        forecast = result['forecast'].to_numpy(dtype=float)
+        
+        for level, widths in half_widths.items():
+            width = widths[rows, np.minimum(steps, widths.shape[1] - 1)]
+            result[f'forecast_lo_{level}'] = np.clip(np.round(forecast - width), 0, forecast).astype(int)
+            result[f'forecast_hi_{level}'] = np.maximum(np.round(forecast + width), forecast).astype(int)
+        
+        return result
+    
+    def get_input_size(self, model, horizon, freq='D'):
+        """Number of most recent observations per series needed by a TimeGPT model"""
+        policy = self.INPUT_SIZE_POLICY.get(model)
+        if policy is None:
+            # Unknown model: be conservative and fall back to the long-horizon policy
+            policy = self.INPUT_SIZE_POLICY['timegpt-1-long-horizon']
+        
+        freq_key = self._freq_key(freq)
+        input_size = max(
+            policy['min_seasons'] * self.SEASON_LENGTHS[freq_key],
+            policy['horizon_multiple'] * horizon
+        )
+        if policy['include_year']:
+            input_size = max(input_size, self.YEAR_LENGTHS[freq_key] + horizon)
+        
+        return int(input_size)
+    
+    def trim_to_input_size(self, df, input_size):
+        """Keep only the last `input_size` observations of every series"""
+        if input_size is None or input_size <= 0:
+            return df
+        
+        # Position counted from the end of each series (0 = most recent)
+        position_from_end = df.groupby('unique_id', sort=False)['ds'].rank(method='first', ascending=False)
+        return df[position_from_end <= input_size]
+    
+    def _estimate_payload_bytes(self, df, sample_size=2000):
+        """Estimate the JSON size of a dataframe from a sample of its rows"""
+        if df is None or len(df) == 0:
+            return 0
+        
+        sample = df.head(sample_size)
+        sample_bytes = len(sample.to_json(orient='values', date_format='iso'))
+        return int(sample_bytes * len(df) / len(sample))
+    
+    def _format_bytes(self, n_bytes):
+        """Human readable byte count"""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if n_bytes < 1024 or unit == 'GB':
+                return f"{n_bytes:,.1f} {unit}"
+            n_bytes /= 1024
+    
     def forecast_timegpt(self, df, horizon, freq='D', model='timegpt-1-long-horizon', 
-                        exog_df=None, progress_callback=None):
-        """Forecast using TimeGPT"""
+                        exog_df=None, progress_callback=None, input_size=None, levels=None):
+        """Forecast using TimeGPT
+        
+        Each series is trimmed to the last `input_size` observations before upload.
+        If `input_size` is None it is derived from the model name and horizon.
+        TimeGPT's own prediction intervals are requested for `levels`.
+        """
         
         if not self.nixtla_client:
             return None, "TimeGPT client not initialized"
@@ -69,26 +641,58 @@ class FleetForecaster:
             if 'unique_id' not in forecast_df.columns:
                 return None, "Missing 'unique_id' column"
             
+            # Trim history to the context window the model actually uses
+            if input_size is None:
+                input_size = self.get_input_size(model, horizon, freq)
+            
+            rows_full = len(forecast_df)
+            forecast_df = self.trim_to_input_size(forecast_df, input_size)
+            
+            # Only the future values of the exogenous features are sent
+            X_df = None
+            if exog_df is not None:
+                exog_cols = [col for col in forecast_df.columns if col not in ('unique_id', 'ds', 'y')]
+                if exog_cols and all(col in exog_df.columns for col in exog_cols):
+                    X_df = exog_df.loc[exog_df['ds'] > forecast_df['ds'].max(), ['unique_id', 'ds'] + exog_cols]
+            
+            # Report the upload size
+            history_bytes = self._estimate_payload_bytes(forecast_df)
+            exog_bytes = self._estimate_payload_bytes(X_df)
+            bytes_sent = history_bytes + exog_bytes
+            bytes_full = int(history_bytes * rows_full / max(len(forecast_df), 1)) + exog_bytes
+            self.last_payload = self._thread.payload = {
+                'input_size': input_size,
+                'rows_full': rows_full,
+                'rows_sent': len(forecast_df),
+                'bytes_full': bytes_full,
+                'bytes_sent': bytes_sent
+            }
+            
             # Get number of unique series
             n_series = forecast_df['unique_id'].nunique()
             
             if progress_callback:
-                progress_callback(0.5, f"Forecasting {n_series} series with TimeGPT...")
+                progress_callback(
+                    0.5,
+                    f"Forecasting {n_series} series with TimeGPT "
+                    f"(last {input_size} periods, ~{self._format_bytes(bytes_sent)} upload)..."
+                )
             
             # Call TimeGPT API
             result = self.nixtla_client.forecast(
                 df=forecast_df,
                 h=horizon,
                 freq=freq,
-                model=model
+                model=model,
+                X_df=X_df,
+                level=list(levels) if levels else None
             )
             
             if progress_callback:
                 progress_callback(0.9, "Processing forecast results...")
             
-            # Rename forecast column to 'forecast'
-            if 'TimeGPT' in result.columns:
-                result = result.rename(columns={'TimeGPT': 'forecast'})
+            # Rename forecast columns to 'forecast' and 'forecast_lo_80' etc.
+            result = result.rename(columns=lambda col: col.replace('TimeGPT', 'forecast').replace('-', '_'))
             
             # Round forecasts to integers (can't have fractional fleets)
             result['forecast'] = result['forecast'].round().astype(int)
@@ -96,6 +700,11 @@ class FleetForecaster:
             # Ensure no negative forecasts
             result['forecast'] = result['forecast'].clip(lower=0)
             
+            # Bounds are rounded the same way and always contain the forecast
+            for level in levels or []:
+                result[f'forecast_lo_{level}'] = result[f'forecast_lo_{level}'].round().clip(lower=0).clip(upper=result['forecast']).astype(int)
+                result[f'forecast_hi_{level}'] = result[f'forecast_hi_{level}'].round().clip(lower=result['forecast']).astype(int)
+            
             if progress_callback:
                 progress_callback(1.0, "Forecast completed!")
             
@@ -108,69 +717,23 @@ class FleetForecaster:
             else:
                 return None, f"TimeGPT error: {str(e)}"
     
-    def forecast_moving_average(self, df, horizon, window=6, progress_callback=None):
-        """Fallback: Simple Moving Average forecast"""
+    def forecast_moving_average(self, df, horizon, freq='D', window=6, progress_callback=None, levels=None):
+        """Fallback: Simple Moving Average forecast of all series at once"""
         
         try:
             if progress_callback:
                 progress_callback(0.3, "Calculating moving averages...")
             
-            forecast_results = []
+            unique_ids, dates, Y = self.to_panel(df)
+            model_func = partial(_moving_average, window=window)
+            forecast = self.backend.map_panel(model_func, Y, horizon, None)
             
-            unique_ids = df['unique_id'].unique()
-            total_series = len(unique_ids)
-            
-            for idx, unique_id in enumerate(unique_ids):
-                series_data = df[df['unique_id'] == unique_id].copy()
-                series_data = series_data.sort_values('ds')
-                
-                # Calculate MA-6
-                ma_value = series_data['y'].tail(window).mean()
-                
-                # If not enough data, use overall mean
-                if pd.isna(ma_value) or len(series_data) < window:
-                    ma_value = series_data['y'].mean()
-                
-                # Create future dates
-                last_date = series_data['ds'].max()
-                
-                # Use current frequency from data if possible, otherwise fallback to daily
-                try:
-                    inferred_freq = pd.infer_freq(series_data['ds'])
-                    if inferred_freq is None:
-                        inferred_freq = freq
-                except:
-                    inferred_freq = freq
-                
-                # Small adjustment for future date start based on freq
-                if 'W' in inferred_freq:
-                    start_date = last_date + pd.Timedelta(weeks=1)
-                elif 'M' in inferred_freq:
-                    start_date = last_date + pd.DateOffset(months=1)
-                else:
-                    start_date = last_date + pd.Timedelta(days=1)
-
-                future_dates = pd.date_range(
-                    start=start_date,
-                    periods=horizon,
-                    freq=inferred_freq
-                )
-                
-                # Create forecast dataframe
-                forecast_df = pd.DataFrame({
-                    'unique_id': unique_id,
-                    'ds': future_dates,
-                    'forecast': int(round(ma_value))
-                })
-                
-                forecast_results.append(forecast_df)
-                
-                # Update progress
-                if progress_callback and (idx + 1) % 10 == 0:
-                    progress = 0.3 + 0.6 * (idx + 1) / total_series
-                    progress_callback(progress, f"Processing series {idx + 1}/{total_series}")
+            future_dates = self._future_dates(dates.max(), horizon, freq)
+            result = self.from_panel(unique_ids, future_dates, forecast)
             
-            result = pd.concat(forecast_results, ignore_index=True)
+            if levels:
+                half_widths = self.panel_intervals(Y, horizon, model_func, None, levels)
+                result = self.attach_intervals(result, unique_ids, half_widths)
             
             if progress_callback:
                 progress_callback(1.0, "Moving Average forecast completed!")
@@ -180,133 +743,555 @@ class FleetForecaster:
         except Exception as e:
             return None, f"Moving Average error: {str(e)}"
     
-    def prepare_exogenous_features(self, historical_df, forecast_horizon, freq='D'):
-        """Prepare exogenous features (holidays) for both historical and forecast period"""
+    def classify_series(self, df):
+        """Demand class of every series as a Series indexed by unique_id"""
+        unique_ids, _, Y = self.to_panel(df)
+        classes, _, _ = classify_demand(Y)
+        return pd.Series(classes, index=unique_ids, name='demand_class')
+    
+    def forecast_local(self, df, horizon, freq='D', model='ets_weekly', progress_callback=None, levels=None):
+        """Forecast all series at once with a local statistical model
+        
+        Prediction intervals for `levels` are calibrated on rolling-origin errors.
+        """
+        
+        if model not in LOCAL_MODELS:
+            return None, f"Unknown local model: {model}"
+        
+        model_name, model_func = LOCAL_MODELS[model]
+        
+        try:
+            if progress_callback:
+                progress_callback(0.3, "Building series matrix...")
+            
+            unique_ids, dates, Y = self.to_panel(df)
+            
+            if progress_callback:
+                progress_callback(0.5, f"Fitting {model_name} on {len(unique_ids)} series...")
+            
+            season_length = self.SEASON_LENGTHS[self._freq_key(freq)]
+            forecast = self.backend.map_panel(model_func, Y, horizon, season_length)
+            
+            future_dates = self._future_dates(dates.max(), horizon, freq)
+            result = self.from_panel(unique_ids, future_dates, forecast)
+            
+            if levels:
+                if progress_callback:
+                    progress_callback(0.8, "Calibrating prediction intervals...")
+                half_widths = self.panel_intervals(Y, horizon, model_func, season_length, levels)
+                result = self.attach_intervals(result, unique_ids, half_widths)
+            
+            if progress_callback:
+                progress_callback(1.0, f"{model_name} forecast completed!")
+            
+            return result, "Success"
+            
+        except Exception as e:
+            return None, f"{model_name} error: {str(e)}"
+    
+    def forecast_global(self, df, horizon, freq='D', include_holidays=True, progress_callback=None, levels=None):
+        """Forecast all series with a single gradient-boosted model
+        
+        Lag, rolling-mean and calendar features are built on the series x time
+        matrix; the horizon is forecast recursively, one period for all series at a time.
+        Prediction intervals are calibrated on one refit that holds out the last horizon.
+        """
+        
+        try:
+            _make_regressor()
+        except ImportError:
+            return None, "scikit-learn package not installed. Please install: pip install scikit-learn"
+        
+        try:
+            unique_ids, dates, Y = self.to_panel(df)
+            forecast = self._fit_global(Y, dates, horizon, freq, include_holidays, progress_callback)
+            
+            future_dates = self._future_dates(dates.max(), horizon, freq)
+            result = self.from_panel(unique_ids, future_dates, forecast)
+            
+            if levels:
+                if progress_callback:
+                    progress_callback(0.9, "Calibrating prediction intervals...")
+                errors = self.calibration_errors(
+                    Y, horizon,
+                    lambda cutoffs, steps: np.stack([
+                        self._fit_global(Y[:, :cutoff], dates[:cutoff], steps, freq, include_holidays)
+                        for cutoff in cutoffs
+                    ]),
+                    n_windows=1
+                )
+                if errors is not None:
+                    result = self.attach_intervals(result, unique_ids, conformal_half_widths(errors, horizon, levels))
+            
+            if progress_callback:
+                progress_callback(1.0, "Global model forecast completed!")
+            
+            return result, "Success"
+            
+        except Exception as e:
+            return None, f"Global model error: {str(e)}"
+    
+    def _fit_global(self, Y, dates, horizon, freq='D', include_holidays=True, progress_callback=None):
+        """Train the global model on panel Y and return its (n_series x horizon) forecast"""
+        regressor = _make_regressor()
+        
+        if progress_callback:
+            progress_callback(0.3, "Building lag features...")
+        
+        n_series, n_periods = Y.shape
+        freq_key = self._freq_key(freq)
+        
+        # Keep the lags the history can support
+        lags = [lag for lag in GLOBAL_LAGS[freq_key] if lag <= n_periods // 2]
+        windows = [window for window in GLOBAL_WINDOWS[freq_key] if window <= n_periods // 2]
+        if not lags:
+            raise ValueError("Not enough history for the global model")
+        max_lag = max(lags + windows)
+        
+        # Scale every series by its mean so one model fits all volumes
+        scale = Y.mean(axis=1)
+        scale = np.where(scale > 0, scale, 1.0)
+        
+        # Room for the recursive forecast at the end of the matrix
+        Y_ext = np.zeros((n_series, n_periods + horizon))
+        Y_ext[:, :n_periods] = Y / scale[:, None]
+        
+        # Calendar features for history and horizon
+        future_dates = self._future_dates(dates.max(), horizon, freq)
+        all_dates = dates.append(future_dates)
+        calendar = pd.DataFrame({'date': all_dates})
+        if include_holidays:
+            calendar = DataProcessor().add_holiday_features(calendar, freq=freq)
+        calendar['month'] = all_dates.month
+        calendar['day_of_week'] = all_dates.dayofweek
+        calendar = calendar.drop(columns='date').to_numpy(dtype=float)
+        
+        # Training targets: the most recent periods that fit the row budget
+        n_train_periods = max(1, min(n_periods - max_lag, GLOBAL_MAX_TRAIN_ROWS // n_series))
+        t_train = np.arange(n_periods - n_train_periods, n_periods)
+        
+        lag_block = _lag_features(Y_ext, t_train, lags, windows)
+        
+        def assemble(lag_features, t_index):
+            """Stack lag, series-level and calendar features into a 2D matrix"""
+            n_t = len(t_index)
+            return np.concatenate([
+                lag_features.reshape(n_series * n_t, -1),
+                np.repeat(np.log1p(scale), n_t)[:, None],
+                np.tile(calendar[t_index], (n_series, 1))
+            ], axis=1)
+        
+        X_train = assemble(lag_block, t_train)
+        y_train = Y_ext[:, t_train].reshape(-1)
+        
+        if progress_callback:
+            progress_callback(0.5, f"Training one model on {len(y_train):,} rows from {n_series} series...")
+        
+        regressor.fit(X_train, y_train)
+        
+        if progress_callback:
+            progress_callback(0.8, "Forecasting recursively...")
+        
+        for step in range(horizon):
+            t = n_periods + step
+            t_index = np.array([t])
+            X_step = assemble(_lag_features(Y_ext, t_index, lags, windows), t_index)
+            Y_ext[:, t] = np.clip(regressor.predict(X_step), 0, None)
+        
+        return Y_ext[:, n_periods:] * scale[:, None]
+    
+    def prepare_exogenous_features(self, historical_df, forecast_horizon, freq='D', input_size=None):
+        """Prepare exogenous features (holidays) for both historical and forecast period
+        
+        Only the last `input_size` historical dates are included when it is given.
+        """
         
         try:
             import holidays
             
             # Get the historical dates
-            min_date = historical_df['ds'].min()
             last_date = historical_df['ds'].max()
             
             # Create future dates for forecast
-            if freq == 'D':
-                future_dates = pd.date_range(
-                    start=last_date + pd.Timedelta(days=1),
-                    periods=forecast_horizon,
-                    freq='D'
-                )
-            elif 'W' in freq:
-                future_dates = pd.date_range(
-                    start=last_date + pd.Timedelta(weeks=1),
-                    periods=forecast_horizon,
-                    freq=freq
-                )
-            elif 'M' in freq:
-                # For monthly, use month start
-                future_dates = pd.date_range(
-                    start=last_date + pd.DateOffset(months=1),
-                    periods=forecast_horizon,
-                    freq='MS'
-                )
-            else:
-                # Fallback
-                future_dates = pd.date_range(
-                    start=last_date + pd.Timedelta(days=1),
-                    periods=forecast_horizon,
-                    freq=freq
-                )
+            future_dates = self._future_dates(last_date, forecast_horizon, freq)
             
-            # Get all historical dates
-            historical_dates = historical_df['ds'].sort_values().unique()
+            # Get all historical dates, trimmed to the context window
+            historical_dates = pd.DatetimeIndex(historical_df['ds'].sort_values().unique())
+            if input_size:
+                historical_dates = historical_dates[-input_size:]
             
             # Combine historical and future dates
-            all_dates = list(historical_dates) + list(future_dates)
+            all_dates = historical_dates.append(future_dates)
             
-            # Get Indonesian holidays (2022-2026)
-            years = list(range(2022, 2027))
+            # Get Indonesian holidays for the covered years
+            years = list(range(all_dates.min().year, all_dates.max().year + 1))
             id_holidays = holidays.Indonesia(years=years)
+            holiday_dates = pd.DatetimeIndex(list(id_holidays.keys()))
             
             # Get all unique_ids
             unique_ids = historical_df['unique_id'].unique()
             
-            # Create exogenous dataframe
-            exog_data = []
-            for uid in unique_ids:
-                for date in all_dates:
-                    exog_data.append({
-                        'unique_id': uid,
-                        'ds': pd.Timestamp(date),
-                        'is_holiday': 1 if pd.Timestamp(date) in id_holidays else 0,
-                        'is_weekend': 1 if pd.Timestamp(date).dayofweek >= 5 else 0,
-                        'month': pd.Timestamp(date).month
-                    })
-            
-            exog_df = pd.DataFrame(exog_data)
+            # Create exogenous dataframe (every series x every date)
+            n_dates = len(all_dates)
+            exog_df = pd.DataFrame({
+                'unique_id': np.repeat(unique_ids, n_dates),
+                'ds': np.tile(all_dates.values, len(unique_ids)),
+                'is_holiday': np.tile(all_dates.isin(holiday_dates).astype(int), len(unique_ids)),
+                'day_of_week': np.tile(all_dates.dayofweek, len(unique_ids)),
+                'is_weekend': np.tile((all_dates.dayofweek >= 5).astype(int), len(unique_ids)),
+                'month': np.tile(all_dates.month, len(unique_ids))
+            })
             
             return exog_df
             
         except Exception as e:
-            st.warning(f"Could not prepare holiday features: {str(e)}")
+            self.add_notice(f"Could not prepare holiday features: {str(e)}")
             return None
     
+    def add_exogenous_features(self, df, horizon, freq='D', input_size=None):
+        """Holiday features for a TimeGPT request
+        
+        Returns (df, exog_df): the history with the feature columns added and the
+        features over history and horizon, or (df, None) if they are unavailable.
+        """
+        exog_df = self.prepare_exogenous_features(df, horizon, freq, input_size=input_size)
+        
+        # Need to add holiday features to historical data too
+        if exog_df is not None:
+            import holidays
+            years = df['ds'].dt.year.unique().tolist()
+            id_holidays = holidays.Indonesia(years=years)
+            holiday_dates = pd.DatetimeIndex(list(id_holidays.keys()))
+            
+            df = df.copy()
+            df['is_holiday'] = df['ds'].isin(holiday_dates).astype(int)
+            df['day_of_week'] = df['ds'].dt.dayofweek
+            df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
+            
+            if freq == 'MS':
+                df['month'] = df['ds'].dt.month
+        
+        return df, exog_df
+    
+    def count_api_calls(self, n_calls=1):
+        """Record successful TimeGPT calls; the page adds them to the session's counter"""
+        with self._lock:
+            self.api_calls += n_calls
+    
+    def add_notice(self, message):
+        """Record a user-facing notice"""
+        with self._lock:
+            self.notices.append(message)
+    
+    def thread_payload(self, reset=False):
+        """Upload summary of the last TimeGPT request sent from the calling thread
+        
+        With `reset` it is cleared instead, before a request whose payload is wanted.
+        """
+        if reset:
+            self._thread.payload = None
+        return getattr(self._thread, 'payload', None)
+    
     def run_forecast(self, df, horizon, freq='D', model='timegpt-1-long-horizon',
-                     use_timegpt=True, include_holidays=True, progress_callback=None):
-        """Main forecast method with fallback logic"""
+                     use_timegpt=True, include_holidays=True, progress_callback=None,
+                     input_size=None, intermittent_model=None, auto_selection='series',
+                     auto_timegpt_sample=0, levels=None, ensemble_weighting='demand_class',
+                     checkpoint=None):
+        """Main forecast method with fallback logic
+        
+        `levels` (e.g. [80, 95]) adds forecast_lo_<level> / forecast_hi_<level> columns:
+        TimeGPT's native intervals, conformal intervals for every other model.
+        `input_size` overrides the TimeGPT context window derived from the model name.
+        When `intermittent_model` is set, intermittent and lumpy series are forecast
+        with that model and only smooth/erratic series go to `model`.
+        With model='auto' every series gets the winner of a holdout tournament, picked
+        per series or per demand class (`auto_selection`); TimeGPT competes on
+        `auto_timegpt_sample` series when a client is configured.
+        With model='ensemble' local models (plus TimeGPT when `use_timegpt`) are blended
+        with inverse-error weights per demand class or per series (`ensemble_weighting`).
+        With a `checkpoint` (utils.checkpoint.RunCheckpoint) the series are forecast in
+        batches that are saved as they finish, and batches saved by an earlier run are reused.
+        """
+        
+        if checkpoint is not None:
+            return self._run_checkpointed(
+                df, horizon, checkpoint, progress_callback,
+                freq=freq, model=model, use_timegpt=use_timegpt, include_holidays=include_holidays,
+                input_size=input_size, intermittent_model=intermittent_model,
+                auto_selection=auto_selection, auto_timegpt_sample=auto_timegpt_sample,
+                levels=levels, ensemble_weighting=ensemble_weighting
+            )
         
         if progress_callback:
             progress_callback(0.1, "Starting forecast...")
         
+        if intermittent_model and intermittent_model != model:
+            return self._run_with_intermittent_routing(
+                df, horizon, freq, model, use_timegpt, include_holidays,
+                progress_callback, input_size, intermittent_model, levels
+            )
+        
+        if model == AUTO_MODEL:
+            from utils.backtest import ModelTournament
+            
+            tournament = ModelTournament(
+                self, selection=auto_selection, timegpt_sample=auto_timegpt_sample
+            )
+            self.model_selection = tournament
+            return tournament.run(df, horizon, freq, include_holidays, input_size, progress_callback, levels)
+        
+        if model == ENSEMBLE_MODEL:
+            from utils.backtest import ModelEnsemble
+            
+            ensemble = ModelEnsemble(self, weighting=ensemble_weighting)
+            self.model_selection = ensemble
+            return ensemble.run(
+                df, horizon, freq, use_timegpt, include_holidays, input_size, progress_callback, levels
+            )
+        
+        if use_timegpt and input_size is None:
+            input_size = self.get_input_size(model, horizon, freq)
+        
         # Prepare exogenous features if requested
         exog_df = None
         if include_holidays and use_timegpt:
-            exog_df = self.prepare_exogenous_features(df, horizon, freq)
-            
-            # Need to add holiday features to historical data too
-            if exog_df is not None:
-                import holidays
-                years = df['ds'].dt.year.unique().tolist()
-                id_holidays = holidays.Indonesia(years=years)
-                
-                df = df.copy()
-                df['is_holiday'] = df['ds'].apply(lambda x: 1 if x in id_holidays else 0)
-                df['day_of_week'] = df['ds'].dt.dayofweek
-                df['is_weekend'] = df['day_of_week'].apply(lambda x: 1 if x >= 5 else 0)
-                
-                if freq == 'MS':
-                    df['month'] = df['ds'].dt.month
+            df, exog_df = self.add_exogenous_features(df, horizon, freq, input_size)
         
         # Try TimeGPT first if requested
         if use_timegpt and self.nixtla_client:
             result, message = self.forecast_timegpt(
-                df, horizon, freq, model, exog_df, progress_callback
+                df, horizon, freq, model, exog_df, progress_callback, input_size=input_size, levels=levels
             )
             
             if result is not None:
-                # Increment API call counter
-                st.session_state.api_calls_count += 1
+                self.count_api_calls()
                 return result, "TimeGPT", message
             else:
                 # Check if it's an API limit error
                 if "API_LIMIT" in message:
-                    st.warning(f"⚠️ {message}")
-                    st.info("Switching to Moving Average (MA-6) fallback method...")
+                    self.add_notice(f"{message} - switched to Moving Average (MA-6) fallback")
                     # Fall through to MA forecast
                 else:
                     return None, "TimeGPT", message
         
+        # Global gradient-boosted model
+        if not use_timegpt and model in GLOBAL_MODELS:
+            result, message = self.forecast_global(df, horizon, freq, include_holidays, progress_callback, levels)
+            
+            if result is not None:
+                return result, GLOBAL_MODELS[model], message
+            else:
+                return None, "Failed", message
+        
+        # Local statistical models
+        if not use_timegpt and model in LOCAL_MODELS:
+            result, message = self.forecast_local(df, horizon, freq, model, progress_callback, levels)
+            
+            if result is not None:
+                return result, LOCAL_MODELS[model][0], message
+            else:
+                return None, "Failed", message
+        
         # Fallback to Moving Average
         if progress_callback:
             progress_callback(0.2, "Using Moving Average fallback...")
         
-        result, message = self.forecast_moving_average(df, horizon, window=6, progress_callback=progress_callback)
+        result, message = self.forecast_moving_average(
+            df, horizon, freq, window=6, progress_callback=progress_callback, levels=levels
+        )
         
         if result is not None:
             return result, "Moving Average (MA-6)", message
         else:
             return None, "Failed", message
     
+    def _run_checkpointed(self, df, horizon, checkpoint, progress_callback=None, **options):
+        """Forecast the series batch by batch, saving each batch and reusing saved ones
+        
+        Global models learn across series, so they run as a single batch. A batch where
+        TimeGPT was requested (directly, in an ensemble or in the auto tournament) but
+        not used is not saved, so a rerun asks TimeGPT again. The message lists every
+        distinct batch message other than "Success".
+        """
+        timegpt_requested = options['use_timegpt'] or options['auto_timegpt_sample'] > 0
+        
+        unique_ids = np.sort(df['unique_id'].unique())
+        batch_size = len(unique_ids) if options['model'] in GLOBAL_MODELS else checkpoint.batch_size
+        n_batches = max(1, int(np.ceil(len(unique_ids) / batch_size)))
+        
+        # Rows grouped by batch once, instead of one scan of the frame per batch
+        row_batch = pd.Index(unique_ids).get_indexer(df['unique_id']) // batch_size
+        order = np.argsort(row_batch, kind='stable')
+        bounds = np.searchsorted(row_batch[order], np.arange(n_batches + 1))
+        
+        results = []
+        names = []
+        messages = []
+        payload = None
+        self.last_payload = None
+        
+        for idx in range(n_batches):
+            batch_ids = unique_ids[idx * batch_size:(idx + 1) * batch_size]
+            batch_df = df.iloc[order[bounds[idx]:bounds[idx + 1]]]
+            
+            # The tournament's TimeGPT sample is shared out across the batches
+            batch_options = dict(options)
+            if options['auto_timegpt_sample']:
+                batch_options['auto_timegpt_sample'] = max(
+                    1, round(options['auto_timegpt_sample'] * len(batch_ids) / len(unique_ids))
+                )
+            
+            key = checkpoint.batch_key(batch_df, dict(batch_options, horizon=horizon))
+            saved = checkpoint.load_batch(key)
+            
+            if saved is not None:
+                result, model_used, message = saved
+                if progress_callback:
+                    progress_callback((idx + 1) / n_batches, f"Batch {idx + 1}/{n_batches} loaded from checkpoint")
+            else:
+                def report(progress, text, idx=idx):
+                    if progress_callback:
+                        progress_callback((idx + progress) / n_batches, f"Batch {idx + 1}/{n_batches}: {text}")
+                
+                self.last_payload = None
+                result, model_used, message = self.run_forecast(
+                    batch_df, horizon, progress_callback=report, **batch_options
+                )
+                if result is None:
+                    return None, model_used, (
+                        f"Batch {idx + 1}/{n_batches} failed: {message}. "
+                        f"{checkpoint.n_batches} finished batches are saved; run again with the same settings to resume."
+                    )
+                
+                if timegpt_requested and self.last_payload:
+                    payload = payload or dict.fromkeys(self.last_payload, 0)
+                    for field, value in self.last_payload.items():
+                        payload[field] = value if field == 'input_size' else payload[field] + value
+                
+                timegpt_skipped = timegpt_requested and (
+                    message != "Success" or model_used.startswith("Moving Average")
+                )
+                if not timegpt_skipped:
+                    checkpoint.save_batch(key, result, model_used, message, len(batch_ids))
+            
+            results.append(result)
+            names.append(model_used)
+            if message != "Success":
+                messages.append(message)
+        
+        # Per-batch details (weights, winners) do not add up across batches
+        model_names = list(dict.fromkeys(names))
+        if len(model_names) > 1:
+            model_names = list(dict.fromkeys(name.split(' (')[0] for name in names))
+        
+        if options['intermittent_model']:
+            self.demand_classes = self.classify_series(df)
+        if n_batches > 1:
+            self.model_selection = None
+        self.last_payload = payload
+        
+        message = "; ".join(dict.fromkeys(messages)) or "Success"
+        return pd.concat(results, ignore_index=True), " / ".join(model_names), message
+    
+    def _run_with_intermittent_routing(self, df, horizon, freq, model, use_timegpt,
+                                       include_holidays, progress_callback, input_size,
+                                       intermittent_model, levels=None):
+        """Send sparse series to a cheap intermittent model and the rest to `model`"""
+        
+        if progress_callback:
+            progress_callback(0.15, "Classifying demand patterns...")
+        
+        self.demand_classes = self.classify_series(df)
+        sparse_ids = self.demand_classes.index[self.demand_classes.isin(SPARSE_DEMAND_CLASSES)]
+        is_sparse = df['unique_id'].isin(sparse_ids)
+        
+        results = []
+        model_used = None
+        message = "Success"
+        
+        # Smooth and erratic series go to the requested model
+        if (~is_sparse).any():
+            result, model_used, message = self.run_forecast(
+                df[~is_sparse], horizon, freq, model, use_timegpt, include_holidays,
+                progress_callback, input_size, intermittent_model=None, levels=levels
+            )
+            if result is None:
+                return None, model_used, message
+            results.append(result[['unique_id', 'ds'] + [col for col in result.columns if col.startswith('forecast')]])
+        
+        # Intermittent and lumpy series go to the batch intermittent model
+        if is_sparse.any():
+            result, sparse_message = self.forecast_local(
+                df[is_sparse], horizon, freq, intermittent_model, progress_callback, levels
+            )
+            if result is None:
+                return None, "Failed", sparse_message
+            results.append(result)
+        
+        sparse_name = LOCAL_MODELS[intermittent_model][0]
+        if model_used is None:
+            model_used = sparse_name
+        else:
+            model_used = f"{model_used} + {sparse_name} (intermittent)"
+        
+        return pd.concat(results, ignore_index=True), model_used, message
+    
+    def disaggregate_forecast(self, parent_forecast, child_df, parent_cols, child_cols,
+                              proportions='historical', window=None):
+        """Split parent-level forecasts down to child series
+        
+        Each child gets its share of its parent's total qty in `child_df`, over the
+        whole history ('historical') or the last `window` periods ('recent').
+        Shares are rounded so each parent's integer forecast is preserved.
+        """
+        
+        history = child_df
+        if proportions == 'recent' and window:
+            recent_dates = np.sort(child_df['date'].unique())[-window:]
+            history = child_df[child_df['date'].isin(recent_dates)]
+        
+        # Child totals keyed by child id, with the parent id of each child
+        children = child_df[child_cols].drop_duplicates().copy()
+        children['unique_id'] = children[child_cols].astype(str).agg('_'.join, axis=1)
+        children['parent_id'] = children[parent_cols].astype(str).agg('_'.join, axis=1)
+        
+        history_ids = history[child_cols].astype(str).agg('_'.join, axis=1)
+        child_totals = history['qty'].groupby(history_ids).sum()
+        children['total'] = children['unique_id'].map(child_totals).fillna(0).clip(lower=0)
+        
+        # Shares within each parent; parents without history split evenly
+        parent_totals = children.groupby('parent_id')['total'].transform('sum')
+        n_siblings = children.groupby('parent_id')['total'].transform('size')
+        children['share'] = np.where(parent_totals > 0, children['total'] / parent_totals.where(parent_totals > 0, 1), 1 / n_siblings)
+        
+        # Allocate every parent forecast to its children
+        allocated = parent_forecast[['unique_id', 'ds', 'forecast']].rename(columns={'unique_id': 'parent_id'}).merge(
+            children[['parent_id', 'unique_id', 'share']], on='parent_id', how='inner'
+        )
+        raw = allocated['forecast'].to_numpy(dtype=float) * allocated['share'].to_numpy()
+        
+        # Largest-remainder rounding within each parent and period
+        floored = np.floor(raw)
+        allocated['remainder'] = raw - floored
+        group = [allocated['parent_id'], allocated['ds']]
+        shortfall = (allocated['forecast'] - pd.Series(floored, index=allocated.index).groupby(group).transform('sum'))
+        rank = allocated.groupby(['parent_id', 'ds'])['remainder'].rank(method='first', ascending=False)
+        allocated['forecast'] = (floored + (rank <= shortfall)).astype(int)
+        
+        # Interval bounds are split by the same shares
+        bound_cols = [col for col in parent_forecast.columns if col.startswith(('forecast_lo_', 'forecast_hi_'))]
+        if bound_cols:
+            parent_bounds = parent_forecast.set_index(['unique_id', 'ds'])[bound_cols]
+            bounds = parent_bounds.reindex(pd.MultiIndex.from_arrays([allocated['parent_id'], allocated['ds']])).to_numpy(dtype=float)
+            bounds = np.round(bounds * allocated['share'].to_numpy()[:, None])
+            for idx, col in enumerate(bound_cols):
+                if col.startswith('forecast_lo_'):
+                    allocated[col] = np.minimum(bounds[:, idx], allocated['forecast']).astype(int)
+                else:
+                    allocated[col] = np.maximum(bounds[:, idx], allocated['forecast']).astype(int)
+        
+        return allocated[['unique_id', 'ds', 'forecast'] + bound_cols]
+    
     def merge_forecast_with_metadata(self, forecast_df, original_df, aggregation_cols):
         """Merge forecast results with original metadata"""
         
@@ -319,15 +1304,21 @@ class FleetForecaster:
         # Merge
         result = forecast_df.merge(metadata, on='unique_id', how='left')
         
+        return self.format_forecast_output(result)
+    
+    def format_forecast_output(self, result):
+        """Fill missing dimensions, rename columns and format dates of a forecast frame"""
+        
         # Fill missing metadata with 'All'
         for col in ['company', 'origin', 'destination', 'province', 'region', 'fleet_type']:
             if col in result.columns:
                 result[col] = result[col].fillna('All')
         
-        # Rename columns
-        result = result.rename(columns={'ds': 'date', 'forecast': 'forecast_qty'})
+        # Rename columns (interval bounds become forecast_qty_lo_80 etc.)
+        result = result.rename(columns={'ds': 'date'})
+        result = result.rename(columns=lambda col: col.replace('forecast', 'forecast_qty', 1) if col.startswith('forecast') and not col.startswith('forecast_qty') else col)
         
-        # Format date as dd/mm/yyyy
-        result['date'] = pd.to_datetime(result['date']).dt.strftime('%d/%m/%Y')
+        # Dates stay datetime64; they are formatted only for the data table and exports
+        result['date'] = pd.to_datetime(result['date'])
         
         return result
@@ -0,0 +1,416 @@
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, cg
+from utils.data_processor import DataProcessor
+
+
+class HierarchicalForecaster:
+    """Forecasts every aggregation level at once and reconciles them
+
+    The bottom level is every company/origin/destination/fleet_type/province/region
+    combination. Each aggregation level in DataProcessor.AGGREGATION_LEVELS, plus
+    the grand total, is a set of sums of bottom series described by the sparse
+    summing matrix S (n_nodes x n_bottom).
+    """
+
+    RECONCILIATION_METHODS = {
+        'bottom_up': 'Bottom-up',
+        'top_down': 'Top-down (historical proportions)',
+        'mint': 'MinT (diagonal variance weights)'
+    }
+
+    TOTAL_LEVEL = 'Total'
+
+    # Above this many bottom series MinT is solved iteratively instead of densely
+    DENSE_SOLVE_LIMIT = 2000
+
+    def __init__(self, forecaster, levels=None):
+        self.forecaster = forecaster
+        self.levels = levels or DataProcessor.AGGREGATION_LEVELS
+        self.dimension_cols = DataProcessor.DIMENSION_COLS
+
+        self.bottom_keys = None
+        self.dates = None
+        self.Y_bottom = None
+        self.S = None
+        self.nodes = None
+
+    def build(self, df, freq='D'):
+        """Build the bottom panel and the summing matrix from dimension-level data"""
+
+        # Bottom series: one per combination of all dimensions
+        bottom = df.groupby(self.dimension_cols + ['date'], sort=False)['qty'].sum().reset_index()
+        grouped = bottom.groupby(self.dimension_cols, sort=True, dropna=False)
+        bottom_codes = grouped.ngroup().to_numpy()
+        self.bottom_keys = grouped.size().reset_index()[self.dimension_cols]
+
+        # Complete date grid, missing periods are zero (as fill_missing_dates does)
+        self.dates = pd.date_range(start=df['date'].min(), end=df['date'].max(), freq=freq)
+        date_codes = self.dates.get_indexer(bottom['date'])
+        valid = date_codes >= 0
+
+        self.Y_bottom = np.zeros((len(self.bottom_keys), len(self.dates)))
+        np.add.at(self.Y_bottom, (bottom_codes[valid], date_codes[valid]), bottom['qty'].to_numpy(dtype=float)[valid])
+
+        self._build_summing_matrix()
+        return self
+
+    def _build_summing_matrix(self):
+        """Stack one block of rows per level into the sparse summing matrix"""
+        n_bottom = len(self.bottom_keys)
+        columns = np.arange(n_bottom)
+
+        rows, cols, node_frames = [], [], []
+        offset = 0
+
+        levels = dict(self.levels)
+        levels[self.TOTAL_LEVEL] = []
+
+        for level, level_cols in levels.items():
+            if level_cols:
+                grouped = self.bottom_keys.groupby(level_cols, sort=True, dropna=False)
+                codes = grouped.ngroup().to_numpy()
+                nodes = grouped.size().reset_index()[level_cols]
+                
+                # Keep other dimensions that are constant within a node (e.g. region of a route)
+                for col in self.dimension_cols:
+                    if col not in level_cols:
+                        values = grouped[col].agg(['nunique', 'first']).reset_index(drop=True)
+                        nodes[col] = values['first'].where(values['nunique'] == 1, 'All').to_numpy()
+                nodes['unique_id'] = nodes[level_cols].astype(str).agg('_'.join, axis=1)
+            else:
+                codes = np.zeros(n_bottom, dtype=int)
+                nodes = pd.DataFrame({'unique_id': ['Total']})
+
+            nodes['level'] = level
+            node_frames.append(nodes)
+
+            rows.append(codes + offset)
+            cols.append(columns)
+            offset += len(nodes)
+
+        self.nodes = pd.concat(node_frames, ignore_index=True)
+        rows = np.concatenate(rows)
+        self.S = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, np.concatenate(cols))),
+            shape=(offset, n_bottom)
+        )
+
+    def _node_ids(self, mask=None):
+        """Internal ids that are unique across levels"""
+        nodes = self.nodes if mask is None else self.nodes[mask]
+        return (nodes['level'] + '|' + nodes['unique_id']).to_numpy()
+
+    def _long_frame(self, Y, node_ids):
+        """Long (unique_id, ds, y) frame for the given node panel"""
+        return pd.DataFrame({
+            'unique_id': np.repeat(node_ids, len(self.dates)),
+            'ds': np.tile(self.dates.values, len(node_ids)),
+            'y': Y.ravel()
+        })
+
+    def forecast(self, horizon, freq='D', method='mint', progress_callback=None, **forecast_kwargs):
+        """Forecast the hierarchy in one model run and reconcile it
+
+        Returns (frames, model_used, message) where frames maps each level to a
+        forecast frame with the same schema as a single-level run.
+        """
+        if method not in self.RECONCILIATION_METHODS:
+            return None, "Failed", f"Unknown reconciliation method: {method}"
+
+        # Only the series the method needs get a base forecast
+        if method == 'bottom_up':
+            base_rows = None
+        elif method == 'top_down':
+            base_rows = np.flatnonzero((self.nodes['level'] == self.TOTAL_LEVEL).to_numpy())
+        else:
+            base_rows = np.arange(len(self.nodes))
+
+        if base_rows is None:
+            # Bottom-up: forecast the bottom series directly
+            node_ids = np.array([f"bottom|{i}" for i in range(len(self.bottom_keys))])
+            Y_base = self.Y_bottom
+        else:
+            node_ids = self._node_ids()[base_rows]
+            Y_base = np.asarray(self.S[base_rows] @ self.Y_bottom)
+
+        result, model_used, message = self.forecaster.run_forecast(
+            df=self._long_frame(Y_base, node_ids),
+            horizon=horizon,
+            freq=freq,
+            progress_callback=progress_callback,
+            **forecast_kwargs
+        )
+        if result is None:
+            return None, model_used, message
+
+        # Base forecasts back into matrix form, in node order
+        forecast_long = result[['unique_id', 'ds', 'forecast']].rename(columns={'forecast': 'y'})
+        forecast_ids, future_dates, F_base = self.forecaster.to_panel(forecast_long)
+        order = pd.Index(forecast_ids).get_indexer(node_ids)
+        F_base = F_base[order]
+
+        # Half-widths of the base prediction intervals, per bound column
+        base_widths = {}
+        for col in [col for col in result.columns if col.startswith(('forecast_lo_', 'forecast_hi_'))]:
+            _, _, bound = self.forecaster.to_panel(result[['unique_id', 'ds', col]].rename(columns={col: 'y'}))
+            base_widths[col] = np.abs(bound[order] - F_base)
+
+        if progress_callback:
+            progress_callback(0.95, f"Reconciling {len(self.nodes):,} series ({self.RECONCILIATION_METHODS[method]})...")
+
+        if method == 'bottom_up':
+            F_bottom = F_base
+        elif method == 'top_down':
+            F_bottom = self.top_down_proportions()[:, None] * F_base[0][None, :]
+        else:
+            F_bottom = self._mint_bottom(F_base)
+
+        # Integer bottom forecasts summed up the hierarchy stay exactly coherent
+        F_bottom = self._round_preserving_totals(np.clip(F_bottom, 0, None))
+        F_all = np.asarray(self.S @ F_bottom)
+
+        bounds = self._reconciled_bounds(F_all, base_widths, method)
+        frames = self._level_frames(F_all, future_dates, bounds)
+        return frames, f"{model_used} ({self.RECONCILIATION_METHODS[method]})", message
+
+    def _round_preserving_totals(self, F):
+        """Round to integers while keeping each period's rounded total (largest remainder)"""
+        floored = np.floor(F)
+        remainders = F - floored
+        shortfall = (np.round(F.sum(axis=0)) - floored.sum(axis=0)).astype(int)
+        
+        # Rank of each remainder within its period, largest first
+        order = np.argsort(-remainders, axis=0, kind='stable')
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(F.shape[0])[:, None], axis=0)
+        
+        return floored + (ranks < shortfall[None, :])
+    
+    def top_down_proportions(self):
+        """Share of each bottom series in the historical total"""
+        totals = self.Y_bottom.sum(axis=1)
+        grand_total = totals.sum()
+        if grand_total <= 0:
+            return np.full(len(totals), 1 / max(len(totals), 1))
+        return totals / grand_total
+
+    def _mint_bottom(self, F_all):
+        """Bottom-level MinT solution with W = diag(one-step naive residual variances)"""
+        Y_all = np.asarray(self.S @ self.Y_bottom)
+        if Y_all.shape[1] > 1:
+            variances = np.diff(Y_all, axis=1).var(axis=1)
+        else:
+            variances = np.ones(Y_all.shape[0])
+        # Guard zero-variance (constant) nodes
+        floor = max(variances[variances > 0].min() if (variances > 0).any() else 1.0, 1e-8)
+        w_inv = 1 / np.maximum(variances, floor)
+
+        S = self.S
+        St_Winv = S.T.multiply(w_inv[None, :]).tocsr()
+        rhs = St_Winv @ F_all
+        n_bottom = S.shape[1]
+
+        if n_bottom <= self.DENSE_SOLVE_LIMIT:
+            A = (St_Winv @ S).toarray()
+            return np.linalg.solve(A, rhs)
+
+        # Large hierarchies: conjugate gradient with a matrix-free operator
+        operator = LinearOperator(
+            (n_bottom, n_bottom),
+            matvec=lambda x: St_Winv @ (S @ x),
+            dtype=float
+        )
+        solution = np.zeros_like(rhs)
+        for step in range(rhs.shape[1]):
+            solution[:, step], _ = cg(operator, rhs[:, step])
+        return solution
+
+    def _reconciled_bounds(self, F_all, base_widths, method):
+        """Interval bounds around the reconciled forecast of every node
+
+        MinT keeps each node's base half-width, top-down splits the total's width by
+        historical shares and bottom-up adds bottom widths in quadrature (independent errors).
+        """
+        bounds = {}
+        for col, widths in base_widths.items():
+            if method == 'mint':
+                node_widths = widths
+            elif method == 'top_down':
+                node_widths = np.asarray(self.S @ (self.top_down_proportions()[:, None] * widths[0][None, :]))
+            else:
+                node_widths = np.sqrt(np.asarray(self.S @ widths ** 2))
+
+            if col.startswith('forecast_lo_'):
+                bounds[col] = np.clip(np.round(F_all - node_widths), 0, F_all)
+            else:
+                bounds[col] = np.maximum(np.round(F_all + node_widths), F_all)
+
+        return bounds
+
+    def _level_frames(self, F_all, future_dates, bounds=None):
+        """Split the reconciled node matrix into one output frame per level"""
+        frames = {}
+        for level, nodes in self.nodes.groupby('level', sort=False):
+            rows = nodes.index.to_numpy()
+            n_dates = len(future_dates)
+
+            frame = pd.DataFrame({
+                'unique_id': np.repeat(nodes['unique_id'].to_numpy(), n_dates),
+                'ds': np.tile(future_dates.values, len(rows)),
+                'forecast': F_all[rows].ravel().astype(int)
+            })
+            for col, values in (bounds or {}).items():
+                frame[col] = values[rows].ravel().astype(int)
+            for col in self.dimension_cols:
+                if col in nodes.columns:
+                    frame[col] = np.repeat(nodes[col].to_numpy(), n_dates)
+                else:
+                    frame[col] = 'All'
+
+            frames[level] = self.forecaster.format_forecast_output(frame)
+
+        return frames
+
+
+class TemporalAggregator:
+    """Derives weekly and monthly forecasts from a daily forecast
+
+    Buckets use the same labels as DataProcessor.resample_data: weeks end on
+    (and are labelled by) Monday for 'W-MON', months are labelled by their first day.
+    """
+
+    TIMEFRAMES = {'Daily': 'D', 'Weekly': 'W-MON', 'Monthly': 'MS'}
+
+    # Weight of the coarse model forecast when combining it with the bucketed daily forecast
+    COARSE_WEIGHT = 0.5
+
+    def __init__(self, date_col='date', value_col='forecast_qty'):
+        self.date_col = date_col
+        self.value_col = value_col
+
+    def _dates(self, frame):
+        """Forecast dates as a DatetimeIndex (dates are formatted only on export)"""
+        dates = frame[self.date_col]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            raise ValueError(f"Column '{self.date_col}' must hold datetime64 values, not {dates.dtype}")
+        return pd.DatetimeIndex(dates)
+
+    def bucket_dates(self, dates, freq):
+        """Label of the period each date falls into"""
+        if freq == 'D':
+            return dates
+        if 'W' in freq:
+            # Days until the next Monday (0 for Mondays)
+            return dates + pd.to_timedelta((0 - dates.dayofweek) % 7, unit='D')
+        if 'M' in freq:
+            return dates - pd.to_timedelta(dates.day - 1, unit='D')
+        raise ValueError(f"Unsupported timeframe: {freq}")
+
+    def bucket_lengths(self, buckets, freq):
+        """Number of days in each complete bucket"""
+        if 'W' in freq:
+            return np.full(len(buckets), 7)
+        return buckets.days_in_month.to_numpy()
+
+    def _value_cols(self, frame):
+        """The forecast column and its interval bounds (e.g. forecast_qty_lo_80)"""
+        return [col for col in frame.columns if col.startswith(self.value_col)]
+
+    def _key_cols(self, frame):
+        """Columns identifying a series (everything except date and values)"""
+        value_cols = self._value_cols(frame)
+        return [col for col in frame.columns if col != self.date_col and col not in value_cols]
+
+    def aggregate(self, frame, freq):
+        """Sum a daily forecast frame into `freq` buckets, keeping its schema
+
+        Interval bounds are summed too: errors of one series on consecutive days
+        are strongly correlated, so summed bounds are a conservative interval.
+        """
+        if freq == 'D':
+            return frame
+
+        dates = self._dates(frame)
+        key_cols = self._key_cols(frame)
+        value_cols = self._value_cols(frame)
+
+        bucketed = frame[key_cols].copy()
+        bucketed['_bucket'] = self.bucket_dates(dates, freq)
+        for col in value_cols:
+            bucketed[col] = frame[col].to_numpy()
+
+        result = bucketed.groupby(key_cols + ['_bucket'], sort=False)[value_cols].sum().reset_index()
+        result = result.sort_values(['unique_id', '_bucket']).reset_index(drop=True)
+        result[self.date_col] = result.pop('_bucket')
+
+        return result[list(frame.columns)]
+
+    def reconcile(self, daily_frame, coarse_frames, n_iterations=10):
+        """Adjust a daily forecast towards coarser model forecasts
+
+        For every complete week/month bucket the target is a weighted combination of
+        the bucketed daily forecast and the coarse forecast (`coarse_frames` maps a
+        freq to its forecast frame), fixed before iterating. Daily values are scaled
+        proportionally to the targets, alternating between timeframes, and rounded
+        at the end.
+        """
+        dates = self._dates(daily_frame)
+        values = daily_frame[self.value_col].to_numpy(dtype=float)
+        ids = daily_frame['unique_id'].to_numpy()
+
+        targets = []
+        for freq, coarse in coarse_frames.items():
+            buckets = self.bucket_dates(dates, freq)
+            keys = pd.MultiIndex.from_arrays([ids, buckets])
+            codes, unique_keys = pd.factorize(keys)
+
+            # Only buckets fully covered by the daily horizon can be compared
+            days_seen = np.bincount(codes)
+            bucket_starts = unique_keys.get_level_values(1)
+            complete = days_seen == self.bucket_lengths(pd.DatetimeIndex(bucket_starts), freq)
+
+            coarse_keys = pd.MultiIndex.from_arrays([
+                coarse['unique_id'].to_numpy(), self._dates(coarse)
+            ])
+            coarse_values = pd.Series(coarse[self.value_col].to_numpy(dtype=float), index=coarse_keys)
+            coarse_values = coarse_values[~coarse_values.index.duplicated()]
+            coarse_for_bucket = coarse_values.reindex(unique_keys).to_numpy()
+
+            usable = complete & ~np.isnan(coarse_for_bucket)
+
+            # Blended once from the original daily forecast; the iterations only fit to it
+            bucket_sums = np.bincount(codes, weights=values, minlength=len(unique_keys))
+            target = (1 - self.COARSE_WEIGHT) * bucket_sums + self.COARSE_WEIGHT * np.nan_to_num(coarse_for_bucket)
+            targets.append((codes, usable, target, len(unique_keys)))
+
+        for _ in range(n_iterations):
+            for codes, usable, target, n_buckets in targets:
+                bucket_sums = np.bincount(codes, weights=values, minlength=n_buckets)
+
+                # Scale proportionally; spread evenly inside buckets with no daily volume
+                scale = np.where(bucket_sums > 0, target / np.where(bucket_sums > 0, bucket_sums, 1), 1.0)
+                spread = np.where(bucket_sums > 0, 0.0, target / np.maximum(np.bincount(codes, minlength=n_buckets), 1))
+
+                adjusted = values * scale[codes] + spread[codes]
+                values = np.where(usable[codes], adjusted, values)
+
+        result = daily_frame.copy()
+        result[self.value_col] = np.clip(np.round(values), 0, None).astype(int)
+
+        # Move interval bounds with their forecast: same scale factor, or the same shift from zero
+        original = daily_frame[self.value_col].to_numpy(dtype=float)
+        ratio = np.where(original > 0, values / np.where(original > 0, original, 1), 1.0)
+        shift = np.where(original > 0, 0.0, values)
+        forecast = result[self.value_col].to_numpy()
+        for col in self._value_cols(daily_frame):
+            if col == self.value_col:
+                continue
+            bound = np.round(daily_frame[col].to_numpy(dtype=float) * ratio + shift)
+            if '_lo_' in col:
+                result[col] = np.clip(bound, 0, forecast).astype(int)
+            else:
+                result[col] = np.maximum(bound, forecast).astype(int)
+
+        return result
@@ -0,0 +1,140 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Forecast jobs running at the same time across all sessions of the server
+MAX_CONCURRENT_JOBS = 4
+
+# Finished jobs nobody collected are dropped after this many seconds
+JOB_TTL = 3600
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next progress report once it has been cancelled"""
+
+
+class Job:
+    """One background run: status, latest progress event and, when finished, its result"""
+
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex[:8]
+        self.label = label
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a free worker..."
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel_requested = False
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def elapsed(self):
+        """Seconds spent running so far (or in total once finished)"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def update(self, progress, message):
+        """Progress callback handed to the job function"""
+        if self._cancel_requested:
+            raise JobCancelled("Cancelled by user")
+
+        with self._lock:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+            self.message = message
+
+    def cancel(self):
+        """Ask the job to stop; it does so at its next progress report"""
+        self._cancel_requested = True
+
+    def snapshot(self):
+        """Consistent (status, progress, message) for display"""
+        with self._lock:
+            return self.status, self.progress, self.message
+
+
+class JobManager:
+    """Runs functions on a thread pool and tracks them by job ID
+
+    The function is called as func(*args, progress_callback=job.update, **kwargs)
+    and must not touch Streamlit: pages poll the job and collect its result.
+    """
+
+    def __init__(self, max_workers=MAX_CONCURRENT_JOBS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='forecast-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, label, func, *args, **kwargs):
+        """Queue `func` and return its Job"""
+        self._prune()
+
+        job = Job(label)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job._cancel_requested:
+            job.status = CANCELLED
+            job.finished = time.time()
+            return
+
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            job.result = func(*args, progress_callback=job.update, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = CANCELLED if job._cancel_requested else FAILED
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def forget(self, job_id):
+        """Drop a job (and its result) once it has been collected"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self):
+        """Drop finished jobs older than JOB_TTL"""
+        cutoff = time.time() - JOB_TTL
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if not job.active and job.finished and job.finished < cutoff]:
+                del self._jobs[job_id]
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Process-wide JobManager shared by every session"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -0,0 +1,181 @@
+import os
+import logging
+import threading
+import numpy as np
+from multiprocessing import get_all_start_methods, get_context, shared_memory
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+
+def _pool_context():
+    """Start method of the worker processes: never fork the (multi-threaded) app process"""
+    return get_context('forkserver' if 'forkserver' in get_all_start_methods() else 'spawn')
+
+
+def _attach_shared_memory(name):
+    """Attach to an existing shared memory block without taking ownership of it"""
+    try:
+        # Python 3.13+: do not register the block with the resource tracker
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Older versions: workers share the parent's tracker, where the block is
+        # already registered, and the parent unlinks it when done
+        return shared_memory.SharedMemory(name=name)
+
+
+def _panel_worker(func, input_name, input_shape, output_name, output_shape,
+                  start, stop, horizon, args, fold=0, cutoff=None):
+    """Run `func` on rows [start, stop) of the shared panel and write into the shared output
+
+    Only the first `cutoff` periods are used, and the forecast goes to output block `fold`.
+    """
+    input_shm = _attach_shared_memory(input_name)
+    output_shm = _attach_shared_memory(output_name)
+
+    try:
+        Y = np.ndarray(input_shape, dtype=np.float64, buffer=input_shm.buf)
+        out = np.ndarray(output_shape, dtype=np.float64, buffer=output_shm.buf)
+        out[fold, start:stop] = func(Y[start:stop, :cutoff], horizon, *args)
+        # Drop the views before closing the buffers
+        del Y, out
+    finally:
+        input_shm.close()
+        output_shm.close()
+
+    return stop - start
+
+
+class ParallelBackend:
+    """Runs panel models over a process pool, sharding the series across workers
+
+    The series x time matrix and the forecast matrix live in shared memory, so
+    workers only receive the block names and their row range. The pool is started
+    on the first parallel call and reused by later ones until close().
+    """
+
+    def __init__(self, n_workers=1, min_series_per_worker=250):
+        if n_workers is None or n_workers <= 0:
+            n_workers = os.cpu_count() or 1
+
+        self.n_workers = int(n_workers)
+        self.min_series_per_worker = min_series_per_worker
+        self.last_mode = 'serial'
+        self.last_error = None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=_pool_context())
+            return self._pool
+
+    def close(self):
+        """Shut down the worker processes (a later parallel call starts new ones)"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _n_shards(self, n_series):
+        """Number of workers worth starting for `n_series` series"""
+        return max(1, min(self.n_workers, n_series // self.min_series_per_worker))
+
+    def map_panel(self, func, Y, horizon, *args):
+        """Apply a panel model `func(Y, horizon, *args)` to Y, in parallel when worthwhile
+
+        Falls back to a serial call if the pool cannot be used (see map_folds).
+        """
+        Y = np.ascontiguousarray(Y, dtype=np.float64)
+        return self.map_folds(func, Y, horizon, [Y.shape[1]], *args)[0]
+
+    def map_folds(self, func, Y, horizon, cutoffs, *args):
+        """Forecast `horizon` periods after every cutoff with a panel model
+
+        Each fold sees the first `cutoff` periods of Y. All (fold, shard) tasks share
+        one pool and one copy of Y, so folds run concurrently. Returns an array of
+        shape (n_folds, n_series, horizon).
+
+        If the pool fails, the folds are rerun in-process; the error is logged and
+        kept in `last_error`, and `last_mode` says 'serial (fallback)'.
+        """
+        Y = np.ascontiguousarray(Y, dtype=np.float64)
+        n_series = Y.shape[0]
+        n_shards = self._n_shards(n_series)
+        cutoffs = [int(cutoff) for cutoff in cutoffs]
+        output_shape = (len(cutoffs), n_series, horizon)
+
+        def run_serial():
+            forecast = np.empty(output_shape)
+            for fold, cutoff in enumerate(cutoffs):
+                forecast[fold] = func(Y[:, :cutoff], horizon, *args)
+            return forecast
+
+        # One worker per fold is worthwhile once the folds hold enough series in total
+        n_tasks = n_shards * len(cutoffs)
+        if self.n_workers <= 1 or n_tasks <= 1 or n_series * len(cutoffs) < 2 * self.min_series_per_worker:
+            self.last_mode = 'serial'
+            return run_serial()
+
+        input_shm = None
+        output_shm = None
+        shared_Y = None
+        try:
+            input_shm = shared_memory.SharedMemory(create=True, size=max(Y.nbytes, 1))
+            shared_Y = np.ndarray(Y.shape, dtype=np.float64, buffer=input_shm.buf)
+            shared_Y[:] = Y
+
+            output_shm = shared_memory.SharedMemory(
+                create=True, size=max(int(np.prod(output_shape)) * 8, 1)
+            )
+
+            bounds = np.linspace(0, n_series, n_shards + 1).astype(int)
+            pool = self._get_pool()
+            futures = [
+                pool.submit(
+                    _panel_worker, func, input_shm.name, Y.shape,
+                    output_shm.name, output_shape, start, stop, horizon, args,
+                    fold, cutoff
+                )
+                for fold, cutoff in enumerate(cutoffs)
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                # Never release the shared blocks under tasks that are still running
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+
+            forecast = np.ndarray(output_shape, dtype=np.float64, buffer=output_shm.buf).copy()
+
+            self.last_mode = f'parallel ({min(self.n_workers, n_tasks)} workers)'
+            return forecast
+
+        except Exception as e:
+            # Pool unavailable (sandboxed host, pickling issue, crashed worker) or a
+            # failing model: rerun in-process, where a model bug raises again
+            self.last_error = e
+            self.last_mode = 'serial (fallback)'
+            logger.warning("Parallel run of %s failed, running serially: %r", getattr(func, '__name__', func), e, exc_info=True)
+            if isinstance(e, BrokenProcessPool):
+                self.close()
+            return run_serial()
+
+        finally:
+            # Release the view on the input block before closing it
+            shared_Y = None
+            for shm in (input_shm, output_shm):
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
@@ -0,0 +1,141 @@
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.export import DATE_FORMAT
+
+
+# A query term: optional `field:` prefix, then a "quoted phrase" or a single word
+QUERY_TERM = re.compile(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))')
+
+# Words of a value or a query term: runs of letters and digits, split on whitespace and punctuation
+WORD = re.compile(r'[^\W_]+')
+
+
+def parse_query(query):
+    """[(field or None, text), ...] of a search query like `origin:Jakarta "PT A"`"""
+    terms = []
+    for field, phrase, word in QUERY_TERM.findall(query):
+        text = phrase if phrase else word
+        if text:
+            terms.append((field.lower() or None, text))
+    return terms
+
+
+def tokenize(text):
+    """Lowercase words of `text`"""
+    return WORD.findall(text.lower())
+
+
+class SearchIndex:
+    """Word-prefix search over the text columns and dates of a forecast frame
+
+    The searchable columns (text dimensions and dates as displayed; quantities are
+    not searched) are dictionary-encoded once into row codes plus a vocabulary of
+    distinct values, and every value is split into words on whitespace and
+    punctuation. A sorted word list maps each word to the vocabulary entries that
+    contain it, so a query word is resolved by a binary search for the words it
+    prefixes, and the matching entries are turned into rows with one lookup over
+    the codes of their column. A term of several words (`"PT A"`, `2024-01`) needs
+    every word in the same value. Terms are ANDed; `field:text` restricts a term
+    to one column.
+    """
+
+    CACHE_SIZE = 16
+
+    def __init__(self, frame, date_format=DATE_FORMAT):
+        self.n_rows = len(frame)
+        self.fields = [col for col in frame.columns if self._searchable(frame[col])]
+        self.codes = []
+        self.n_values = []
+
+        vocabulary_fields, vocabulary_codes = [], []
+        entries_of = {}
+        for idx, col in enumerate(self.fields):
+            codes, uniques = pd.factorize(frame[col])
+            if pd.api.types.is_datetime64_any_dtype(uniques):
+                text = pd.DatetimeIndex(uniques).strftime(date_format)
+            else:
+                text = pd.Index(uniques).astype(str)
+
+            first_entry = sum(self.n_values)
+            for code, value in enumerate(text):
+                for word in set(tokenize(value)):
+                    entries_of.setdefault(word, []).append(first_entry + code)
+
+            self.codes.append(codes)
+            self.n_values.append(len(uniques))
+            vocabulary_fields.append(np.full(len(uniques), idx))
+            vocabulary_codes.append(np.arange(len(uniques)))
+
+        self.vocabulary_fields = np.concatenate(vocabulary_fields) if self.fields else np.zeros(0, dtype=int)
+        self.vocabulary_codes = np.concatenate(vocabulary_codes) if self.fields else np.zeros(0, dtype=int)
+        self.words = sorted(entries_of)
+        self.word_entries = [np.array(entries_of[word]) for word in self.words]
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def _searchable(values):
+        """Text and date columns; numbers (quantities, bounds) are not searched"""
+        return pd.api.types.is_datetime64_any_dtype(values) or not (
+            pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)
+        )
+
+    def _field_index(self, field):
+        lookup = {col.lower(): idx for idx, col in enumerate(self.fields)}
+        if field not in lookup:
+            raise ValueError(f"Unknown field '{field}'; search one of: {', '.join(self.fields)}")
+        return lookup[field]
+
+    def _prefix_entries(self, prefix):
+        """Vocabulary entries with a word starting with `prefix`"""
+        start = bisect_left(self.words, prefix)
+        stop = bisect_left(self.words, prefix + '\U0010ffff', lo=start)
+        if start == stop:
+            return np.zeros(0, dtype=int)
+        return np.concatenate(self.word_entries[start:stop])
+
+    def _term_mask(self, field, text):
+        """Rows with every word of `text` prefixing a word of one value of `field` (any column if None)"""
+        words = tokenize(text)
+        if not words:
+            # Punctuation only: nothing to match on, so the term does not filter
+            return np.ones(self.n_rows, dtype=bool)
+
+        hits = np.ones(len(self.vocabulary_fields), dtype=bool)
+        if field is not None:
+            hits &= self.vocabulary_fields == self._field_index(field)
+        for word in words:
+            word_hits = np.zeros(len(hits), dtype=bool)
+            word_hits[self._prefix_entries(word)] = True
+            hits &= word_hits
+
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for idx in np.unique(self.vocabulary_fields[hits]):
+            # One extra slot for code -1 (missing values), which never matches
+            matched = np.zeros(self.n_values[idx] + 1, dtype=bool)
+            matched[self.vocabulary_codes[hits & (self.vocabulary_fields == idx)]] = True
+            mask |= matched[self.codes[idx]]
+        return mask
+
+    def search(self, query):
+        """Boolean row mask of the rows matching every term of `query`
+
+        Raises ValueError for a field that is not a column.
+        """
+        key = query.strip()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        mask = np.ones(self.n_rows, dtype=bool)
+        for field, text in parse_query(key):
+            mask &= self._term_mask(field, text)
+
+        self._cache[key] = mask
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return mask
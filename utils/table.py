@@ -0,0 +1,50 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Rows per page offered by paginated tables
+PAGE_SIZES = [50, 100, 250, 500]
+
+
+class TablePages:
+    """Server-side sorting and paging of a large frame
+
+    Only the requested page is ever sliced out and sent to the browser. The row
+    order of every sort column is computed once and reused by later pages and by
+    filtered views (a filter keeps the sorted order of its matching rows).
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._orders = {}
+
+    def order(self, column, ascending=True):
+        """Row positions sorted by `column`; missing values last, ties in frame order"""
+        key = (column, ascending)
+        if key not in self._orders:
+            codes, _ = pd.factorize(self.frame[column], sort=True)
+            if ascending:
+                sort_key = np.where(codes < 0, codes.max() + 1, codes)
+            else:
+                sort_key = np.where(codes < 0, 1, -codes)
+            self._orders[key] = np.argsort(sort_key, kind='stable')
+
+        return self._orders[key]
+
+    def page(self, mask=None, sort_by=None, ascending=True, page=1, page_size=100):
+        """(rows of `page`, number of matching rows, number of pages)
+
+        `mask` is a boolean row filter (e.g. from a SearchIndex); pages count from 1.
+        """
+        positions = self.order(sort_by, ascending) if sort_by else np.arange(len(self.frame))
+        if mask is not None:
+            positions = positions[mask[positions]]
+
+        n_rows = len(positions)
+        n_pages = max(1, math.ceil(n_rows / page_size))
+        page = min(max(int(page), 1), n_pages)
+        start = (page - 1) * page_size
+
+        return self.frame.iloc[positions[start:start + page_size]], n_rows, n_pages
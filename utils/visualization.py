@@ -1,7 +1,165 @@
+import json
+import threading
+from collections import OrderedDict
+from functools import wraps
+
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 import numpy as np
+from utils.forecaster import sum_with_intervals
+
+# Points per line trace sent to the browser: about two per pixel of a wide chart
+MAX_CHART_POINTS = 2000
+
+# Line traces with more points are drawn without markers
+MARKER_THRESHOLD = 200
+
+# Line traces with more points are rendered with WebGL (Scattergl) instead of SVG
+WEBGL_THRESHOLD = 1000
+
+# Figures kept by the figure cache (least recently used are evicted first)
+FIGURE_CACHE_SIZE = 64
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+    
+    The first and last points are always kept; every bucket in between keeps the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves peaks and the shape of the line.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        indices[i + 1] = previous
+    
+    return indices
+
+
+def minmax_indices(y, n_out):
+    """Indices of the minimum and maximum of each of n_out / 2 buckets, in order
+    
+    Cheaper than LTTB and keeps every spike, at the cost of a noisier line.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(int)
+    indices = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = y[start:end]
+        indices.extend(sorted({start + int(bucket.argmin()), start + int(bucket.argmax())}))
+    
+    return np.asarray(indices)
+
+
+def downsample_indices(x, y, max_points=MAX_CHART_POINTS, method='lttb'):
+    """Indices of at most `max_points` points of a line (x must be sorted)"""
+    if len(y) <= max_points:
+        return np.arange(len(y))
+    
+    if method == 'minmax':
+        return minmax_indices(y, max_points)
+    
+    x = pd.Series(x)
+    x = x.astype('int64') if pd.api.types.is_datetime64_any_dtype(x) else x
+    return lttb_indices(x.to_numpy(), y, max_points)
+
+
+class FigureCache:
+    """LRU cache of figures as JSON, keyed by chart, view identity and parameters
+    
+    Shared by every session: a view (a ResultsCube, an upload's ExplorerIndex) has
+    a unique key, so the same key always means the same figure. A hit rebuilds the
+    figure from its JSON without validating it again, which is much cheaper than
+    regrouping the data and building the traces.
+    """
+    
+    def __init__(self, max_size=FIGURE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_or_build(self, key, build):
+        """Cached figure of `key`, or the figure from `build()` (then cached)"""
+        with self._lock:
+            spec = self._figures.get(key)
+            if spec is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+        
+        if spec is not None:
+            # The JSON came from a validated figure
+            return go.Figure(json.loads(spec), _validate=False)
+        
+        fig = build()
+        spec = fig.to_json()
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = spec
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_size:
+                self._figures.popitem(last=False)
+        return fig
+    
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+FIGURE_CACHE = FigureCache()
+
+
+def _parameter_key(value):
+    """Hashable key of a figure builder argument: data frames are identified by `cache_key`"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return None
+    if isinstance(value, (list, tuple)):
+        return tuple(_parameter_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((name, _parameter_key(item)) for name, item in value.items()))
+    return value
+
+
+def cached_figure(build):
+    """Serve the figures of a Visualizer method from FIGURE_CACHE
+    
+    The caller passes `cache_key`, the identity of the view the data comes from
+    (e.g. the cube key and a date range); the data is never hashed. Without it the
+    figure is built every time.
+    """
+    @wraps(build)
+    def cached(self, *args, cache_key=None, **kwargs):
+        if cache_key is None:
+            return build(self, *args, **kwargs)
+        key = (build.__name__, cache_key, _parameter_key(args), _parameter_key(kwargs))
+        return FIGURE_CACHE.get_or_build(key, lambda: build(self, *args, **kwargs))
+    return cached
+
 
 class Visualizer:
     """Handles all visualizations for the app"""
@@ -16,19 +174,42 @@ class Visualizer:
             'forecast': '#FF6B6B'
         }
     
+    def line_trace(self, x, y, marker_size=6, indices=None, **kwargs):
+        """Line trace sized for the browser
+        
+        Long lines are downsampled to MAX_CHART_POINTS (or to `indices`, so bands can
+        share the points of their line), lose their markers above MARKER_THRESHOLD
+        points and are rendered with WebGL above WEBGL_THRESHOLD points.
+        """
+        x = pd.Series(x).reset_index(drop=True)
+        y = pd.Series(y).reset_index(drop=True)
+        if indices is None:
+            indices = downsample_indices(x, y.to_numpy(dtype=float))
+        x, y = x.iloc[indices], y.iloc[indices]
+        
+        mode = kwargs.pop('mode', 'lines+markers')
+        if len(x) > MARKER_THRESHOLD:
+            mode = 'lines'
+        if mode != 'lines':
+            kwargs['marker'] = dict(size=marker_size)
+        if 'customdata' in kwargs:
+            kwargs['customdata'] = pd.Series(kwargs['customdata']).reset_index(drop=True).iloc[indices]
+        
+        trace = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+        return trace(x=x, y=y, mode=mode, **kwargs)
+    
+    @cached_figure
     def plot_time_series(self, df, date_col='date', value_col='qty', 
                         title='Time Series', height=400):
         """Plot basic time series"""
         
         fig = go.Figure()
         
-        fig.add_trace(go.Scatter(
-            x=df[date_col],
-            y=df[value_col],
-            mode='lines+markers',
+        fig.add_trace(self.line_trace(
+            df[date_col],
+            df[value_col],
             name='Historical',
             line=dict(color=self.color_scheme['historical'], width=2),
-            marker=dict(size=6),
             hovertemplate='<b>Date:</b> %{x|%d/%m/%Y}<br><b>Qty:</b> %{y}<extra></extra>'
         ))
         
@@ -72,55 +253,119 @@ class Visualizer:
         return fig
     
     def plot_historical_vs_forecast(self, historical_df, forecast_df, 
-                                    aggregation='total', height=500):
-        """Plot historical data with forecast"""
+                                    aggregation='total', height=500, cube=None, date_range=None):
+        """Plot historical data with forecast (totals are read from `cube` when given)
         
-        fig = go.Figure()
+        `date_range` = (start, end) limits the chart to those dates, which are then
+        downsampled on their own, showing more detail than the full range.
+        """
+        
+        hist_agg = forecast_agg = None
         
         # Prepare historical data
         if aggregation == 'total':
-            hist_agg = historical_df.groupby('date')['qty'].sum().reset_index()
-            hist_agg['date'] = pd.to_datetime(hist_agg['date'], format='%d/%m/%Y', errors='coerce')
+            if cube is not None and cube.history_by_date is not None:
+                hist_agg = cube.history_by_date
+            else:
+                hist_agg = historical_df.groupby('date')['qty'].sum().reset_index()
             
             # Filter out zeros (auto-filled missing dates)
             hist_agg = hist_agg[hist_agg['qty'] > 0]
             
             # Sort by date
             hist_agg = hist_agg.sort_values('date')
+            if date_range is not None:
+                hist_agg = hist_agg[hist_agg['date'].between(*date_range)]
+            
+            # Prepare forecast data (with interval bounds when present)
+            forecast_agg = cube.by_date if cube is not None else sum_with_intervals(forecast_df, 'date')
             
+            # Sort by date
+            forecast_agg = forecast_agg.sort_values('date')
+            if date_range is not None:
+                forecast_agg = forecast_agg[forecast_agg['date'].between(*date_range)]
+        
+        return self._history_forecast_figure(
+            hist_agg, forecast_agg,
+            title='Historical Data vs Forecast',
+            yaxis_title='Total Fleet Quantity',
+            height=height,
+            cache_key=(cube.key, aggregation, date_range) if cube is not None else None
+        )
+    
+    def plot_series(self, history, forecast, title='Historical Data vs Forecast', height=450, cache_key=None):
+        """Plot the history and forecast of one series or slice (date-sorted frames)"""
+        return self._history_forecast_figure(
+            history, forecast,
+            title=title,
+            yaxis_title='Fleet Quantity',
+            height=height,
+            cache_key=cache_key
+        )
+    
+    @cached_figure
+    def _history_forecast_figure(self, hist_agg, forecast_agg, title, yaxis_title, height):
+        """History line, forecast line and interval bands of date-sorted frames"""
+        
+        fig = go.Figure()
+        
+        if hist_agg is not None:
             # Historical line
-            fig.add_trace(go.Scatter(
-                x=hist_agg['date'],
-                y=hist_agg['qty'],
-                mode='lines+markers',
+            fig.add_trace(self.line_trace(
+                hist_agg['date'],
+                hist_agg['qty'],
                 name='Historical',
                 line=dict(color=self.color_scheme['historical'], width=2),
-                marker=dict(size=6),
                 hovertemplate='<b>Date:</b> %{x|%d/%m/%Y}<br><b>Qty:</b> %{y}<extra></extra>'
             ))
+        
+        if forecast_agg is not None:
+            # Bands reuse the points kept for the forecast line
+            indices = downsample_indices(forecast_agg['date'], forecast_agg['forecast_qty'].to_numpy(dtype=float))
             
-            # Prepare forecast data
-            forecast_agg = forecast_df.groupby('date')['forecast_qty'].sum().reset_index()
-            forecast_agg['date'] = pd.to_datetime(forecast_agg['date'], format='%d/%m/%Y', errors='coerce')
-            
-            # Sort by date
-            forecast_agg = forecast_agg.sort_values('date')
+            # Prediction interval bands, widest first so narrower ones draw on top
+            levels = sorted(
+                (int(col.rsplit('_', 1)[1]) for col in forecast_agg.columns if col.startswith('forecast_qty_lo_')),
+                reverse=True
+            )
+            for idx, level in enumerate(levels):
+                fig.add_trace(self.line_trace(
+                    forecast_agg['date'],
+                    forecast_agg[f'forecast_qty_hi_{level}'],
+                    indices=indices,
+                    mode='lines',
+                    line=dict(width=0),
+                    showlegend=False,
+                    hoverinfo='skip'
+                ))
+                fig.add_trace(self.line_trace(
+                    forecast_agg['date'],
+                    forecast_agg[f'forecast_qty_lo_{level}'],
+                    indices=indices,
+                    mode='lines',
+                    line=dict(width=0),
+                    fill='tonexty',
+                    fillcolor=f'rgba(255, 107, 107, {0.15 + 0.15 * idx})',
+                    name=f'{level}% interval',
+                    customdata=forecast_agg[f'forecast_qty_hi_{level}'],
+                    hovertemplate=f'<b>{level}% interval:</b> %{{y}} - %{{customdata}}<extra></extra>'
+                ))
             
             # Forecast line
-            fig.add_trace(go.Scatter(
-                x=forecast_agg['date'],
-                y=forecast_agg['forecast_qty'],
-                mode='lines+markers',
+            fig.add_trace(self.line_trace(
+                forecast_agg['date'],
+                forecast_agg['forecast_qty'],
+                indices=indices,
+                marker_size=8,
                 name='Forecast',
                 line=dict(color=self.color_scheme['forecast'], width=2, dash='dash'),
-                marker=dict(size=8),
                 hovertemplate='<b>Date:</b> %{x|%d/%m/%Y}<br><b>Forecast:</b> %{y}<extra></extra>'
             ))
         
         fig.update_layout(
-            title='Historical Data vs Forecast',
+            title=title,
             xaxis_title='Date',
-            yaxis_title='Total Fleet Quantity',
+            yaxis_title=yaxis_title,
             hovermode='x unified',
             height=height,
             plot_bgcolor='white',
@@ -156,11 +401,12 @@ class Visualizer:
         
         return fig
     
-    def plot_by_dimension(self, forecast_df, dimension='fleet_type', top_n=10, height=500):
+    def plot_by_dimension(self, forecast_df, dimension='fleet_type', top_n=10, height=500, cube=None):
         """Plot forecast by a specific dimension"""
         
         # Check if dimension exists
-        if dimension not in forecast_df.columns:
+        available = dimension in cube.by_dimension if cube is not None else dimension in forecast_df.columns
+        if not available:
             # Return empty figure
             fig = go.Figure()
             fig.add_annotation(
@@ -173,9 +419,20 @@ class Visualizer:
             return fig
         
         # Aggregate by dimension
-        agg_df = forecast_df.groupby(dimension)['forecast_qty'].sum().reset_index()
+        if cube is not None:
+            agg_df = cube.by_dimension[dimension][[dimension, 'forecast_qty']]
+        else:
+            agg_df = forecast_df.groupby(dimension)['forecast_qty'].sum().reset_index()
         agg_df = agg_df.sort_values('forecast_qty', ascending=False).head(top_n)
         
+        return self._dimension_figure(
+            agg_df, dimension, top_n, height, cache_key=cube.key if cube is not None else None
+        )
+    
+    @cached_figure
+    def _dimension_figure(self, agg_df, dimension, top_n, height):
+        """Bar chart of the top `dimension` totals"""
+        
         fig = go.Figure()
         
         fig.add_trace(go.Bar(
@@ -220,16 +477,27 @@ class Visualizer:
         
         return fig
     
-    def plot_forecast_distribution(self, forecast_df, height=400):
+    def plot_forecast_distribution(self, forecast_df, height=400, cube=None):
         """Plot distribution of forecasts"""
         
         # Aggregate by date
-        daily_forecast = forecast_df.groupby('date')['forecast_qty'].sum().reset_index()
+        if cube is not None:
+            daily_forecast = cube.by_date
+        else:
+            daily_forecast = forecast_df.groupby('date')['forecast_qty'].sum().reset_index()
+        
+        return self._distribution_figure(
+            daily_forecast['forecast_qty'], height, cache_key=cube.key if cube is not None else None
+        )
+    
+    @cached_figure
+    def _distribution_figure(self, values, height):
+        """Box plot of the forecast totals by date"""
         
         fig = go.Figure()
         
         fig.add_trace(go.Box(
-            y=daily_forecast['forecast_qty'],
+            y=values,
             name='Forecast Distribution',
             marker=dict(color=self.color_scheme['primary']),
             boxmean='sd'
@@ -256,11 +524,15 @@ class Visualizer:
         
         return fig
     
-    def plot_top_routes(self, forecast_df, top_n=10, height=500):
+    def plot_top_routes(self, forecast_df, top_n=10, height=500, cube=None):
         """Plot top routes by forecast volume"""
         
         # Check if origin and destination exist
-        if 'origin' not in forecast_df.columns or 'destination' not in forecast_df.columns:
+        if cube is not None:
+            available = 'route' in cube.by_dimension
+        else:
+            available = 'origin' in forecast_df.columns and 'destination' in forecast_df.columns
+        if not available:
             fig = go.Figure()
             fig.add_annotation(
                 text="Route data not available",
@@ -271,14 +543,23 @@ class Visualizer:
             fig.update_layout(height=height)
             return fig
         
-        # Create route column
-        forecast_df_copy = forecast_df.copy()
-        forecast_df_copy['route'] = forecast_df_copy['origin'] + ' → ' + forecast_df_copy['destination']
-        
         # Aggregate by route
-        route_agg = forecast_df_copy.groupby('route')['forecast_qty'].sum().reset_index()
+        if cube is not None:
+            route_agg = cube.by_dimension['route'][['route', 'forecast_qty']]
+        else:
+            forecast_df_copy = forecast_df.copy()
+            forecast_df_copy['route'] = forecast_df_copy['origin'] + ' → ' + forecast_df_copy['destination']
+            route_agg = forecast_df_copy.groupby('route')['forecast_qty'].sum().reset_index()
         route_agg = route_agg.sort_values('forecast_qty', ascending=True).tail(top_n)
         
+        return self._top_routes_figure(
+            route_agg, top_n, height, cache_key=cube.key if cube is not None else None
+        )
+    
+    @cached_figure
+    def _top_routes_figure(self, route_agg, top_n, height):
+        """Horizontal bar chart of the top route totals"""
+        
         fig = go.Figure()
         
         fig.add_trace(go.Bar(